@@ -0,0 +1,152 @@
+import os
+import time
+import threading
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Cosine similarity a new query needs to reuse a cached answer
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "500"))  # entries per feature
+# Comma-separated features that must never be served from cache, e.g. "general"
+ANSWER_CACHE_DISABLED = {f.strip() for f in os.getenv("ANSWER_CACHE_DISABLED", "").split(",") if f.strip()}
+# upload.py touches this file after re-ingesting; every worker drops its cache when it changes
+KB_VERSION_PATH = os.getenv("KB_VERSION_PATH", "kb_version.txt")
+
+
+class _FeatureCache:
+    """LRU of (normalized query vector, answer) pairs searched with one matrix product."""
+
+    def __init__(self):
+        self.entries = OrderedDict()  # entry_id -> {"vector", "answer", "context_key", "created_at"}
+        self.next_id = 0
+        self._ids = []
+        self._matrix = None
+
+    def _search_matrix(self):
+        if self._matrix is None:
+            self._ids = list(self.entries.keys())
+            self._matrix = np.vstack([self.entries[i]["vector"] for i in self._ids]) if self._ids else None
+        return self._matrix
+
+    def expire(self, now):
+        expired = [i for i, e in self.entries.items() if now - e["created_at"] > ANSWER_CACHE_TTL]
+        for i in expired:
+            del self.entries[i]
+        if expired:
+            self._matrix = None
+
+    def lookup(self, vector, context_key):
+        matrix = self._search_matrix()
+        if matrix is None:
+            return None
+        scores = matrix @ vector
+        for pos in np.argsort(-scores):
+            if scores[pos] < ANSWER_CACHE_THRESHOLD:
+                break
+            entry_id = self._ids[pos]
+            if self.entries[entry_id]["context_key"] == context_key:
+                self.entries.move_to_end(entry_id)
+                return self.entries[entry_id]["answer"]
+        return None
+
+    def store(self, vector, context_key, answer, now):
+        self.entries[self.next_id] = {
+            "vector": vector,
+            "answer": answer,
+            "context_key": context_key,
+            "created_at": now,
+        }
+        self.next_id += 1
+        while len(self.entries) > ANSWER_CACHE_SIZE:
+            self.entries.popitem(last=False)
+        self._matrix = None
+
+
+_caches = {}
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+_UNCHECKED = object()
+_kb_version = _UNCHECKED
+
+
+def _normalize(vector):
+    vec = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vec)
+    return vec / norm if norm else vec
+
+
+def _current_kb_version():
+    try:
+        return os.path.getmtime(KB_VERSION_PATH)
+    except OSError:
+        return None
+
+
+def _check_kb_version():
+    """Drop every cached answer once the knowledge base has been re-uploaded."""
+    global _kb_version
+    version = _current_kb_version()
+    if version != _kb_version:
+        if _kb_version is not _UNCHECKED:
+            _caches.clear()
+        _kb_version = version
+
+
+def is_enabled(feature):
+    return feature not in ANSWER_CACHE_DISABLED
+
+
+def lookup(feature, query_vector, context_key=None):
+    """
+    Return a cached answer for a semantically equivalent earlier input, or None.
+    context_key must match exactly (e.g. poster/date/platform for the content checker).
+    """
+    if not is_enabled(feature):
+        return None
+    with _lock:
+        _check_kb_version()
+        cache = _caches.get(feature)
+        answer = None
+        if cache:
+            cache.expire(time.time())
+            answer = cache.lookup(_normalize(query_vector), context_key)
+        _stats["hits" if answer is not None else "misses"] += 1
+        return answer
+
+
+def store(feature, query_vector, answer, context_key=None):
+    # query_vector is None when retrieval was lexical-only (no embedding was made)
+    if query_vector is None or not is_enabled(feature) or not answer or answer.startswith("Error"):
+        return
+    with _lock:
+        _check_kb_version()
+        cache = _caches.setdefault(feature, _FeatureCache())
+        cache.store(_normalize(query_vector), context_key, answer, time.time())
+
+
+def invalidate(feature=None):
+    """Clear one feature's cache, or all of them."""
+    with _lock:
+        if feature is None:
+            _caches.clear()
+        else:
+            _caches.pop(feature, None)
+
+
+def mark_kb_updated():
+    """Called by upload.py after ingestion so serving workers invalidate their caches."""
+    with open(KB_VERSION_PATH, "w", encoding="utf-8") as f:
+        f.write(str(time.time()))
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["entries"] = {feature: len(cache.entries) for feature, cache in _caches.items()}
+    stats["threshold"] = ANSWER_CACHE_THRESHOLD
+    stats["disabled"] = sorted(ANSWER_CACHE_DISABLED)
+    return stats
@@ -0,0 +1,273 @@
+# Async serving mode: the same routes as main.py on Quart (Flask's async twin).
+# Every upstream call is awaited, so one worker keeps hundreds of chats in flight
+# instead of being pinned for a whole completion. Run with:
+#   hypercorn asgi:app --bind 0.0.0.0:$PORT
+import json
+import asyncio
+from quart import Quart, request, jsonify, render_template, Response
+from rag import get_scenario_questions, summarize_conversation, chat_messages
+from rag import OTHERS_FIRST_QUESTION, others_final_prompt
+from rag import batch_posts, CONTENT_CHECK_BATCH_MAX
+from async_rag import aai_only, aai_with_messages, astream_with_messages, aretrieve_context
+from async_rag import aanalyze_scenario_responses, astream_scenario_analysis
+from async_rag import aothers_next_question, aprefetch_others_question, arecord_scenario_answers
+from async_rag import acontent_check_batch, acontent_check_result, astream_content_check
+from embedding_cache import cache_stats
+from clients import circuit_stats, usage_stats
+import answer_cache
+import history_store
+import quiz_bank
+import tip_store
+import reputation
+import prefetch_store
+import followup_cache
+
+app = Quart(__name__)
+
+
+@app.after_request
+async def allow_cors(response):
+    # Same policy as flask_cors' CORS(app) in main.py
+    response.headers["Access-Control-Allow-Origin"] = "*"
+    response.headers["Access-Control-Allow-Headers"] = "Content-Type"
+    response.headers["Access-Control-Allow-Methods"] = "GET, POST, OPTIONS"
+    return response
+
+@app.route("/")
+async def home():
+    return await render_template("index.html")
+
+@app.route("/chat")
+async def chat_page():
+    return await render_template("chat.html")
+
+@app.route("/content-check")
+async def content_checker_page():
+    return await render_template("contentChecker.html")
+
+@app.route("/scenario/start")
+async def scenario_simulation_page():
+    return await render_template("scenarioSimulation.html")
+
+@app.route("/generate-quiz")
+async def interactive_quiz_page():
+    return await render_template("interactiveQuiz.html")
+
+def sse_response(chunks, on_complete=None):
+    """Async version of main.sse_response; chunks is an async iterator of text."""
+    async def events():
+        parts = []
+        async for chunk in chunks:
+            parts.append(chunk)
+            yield f"data: {json.dumps({'delta': chunk}, ensure_ascii=False)}\n\n"
+        if on_complete:
+            await on_complete("".join(parts).strip())
+        yield f"data: {json.dumps({'done': True})}\n\n"
+
+    return Response(
+        events(),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+async def build_chat_messages(session_id, user_message):
+    # History loading and embedding + retrieval are independent: run them concurrently
+    history, chunks = await asyncio.gather(
+        asyncio.to_thread(history_store.load, session_id),
+        aretrieve_context(user_message, top_k=3),
+    )
+    return chat_messages(history_store.prompt_messages(history), chunks, user_message)
+
+async def remember_turn(session_id, user_message, bot_reply):
+    await asyncio.to_thread(
+        history_store.append,
+        session_id,
+        [{"role": "user", "content": user_message}, {"role": "assistant", "content": bot_reply}],
+        summarize_conversation,
+    )
+
+@app.route("/chat", methods=["POST"])
+async def chat():
+    data = await request.get_json()
+    user_message = data.get("message", "")
+    session_id = data.get("session_id") or history_store.new_session_id()
+    messages = await build_chat_messages(session_id, user_message)
+
+    bot_reply = await aai_with_messages(messages, feature="chat")
+    await remember_turn(session_id, user_message, bot_reply)
+
+    return jsonify({"reply": bot_reply, "session_id": session_id})
+
+@app.route("/chat/stream", methods=["POST"])
+async def chat_stream():
+    data = await request.get_json()
+    user_message = data.get("message", "")
+    session_id = data.get("session_id") or history_store.new_session_id()
+    messages = await build_chat_messages(session_id, user_message)
+
+    async def remember_reply(bot_reply):
+        if not bot_reply.startswith("Error"):
+            await remember_turn(session_id, user_message, bot_reply)
+
+    async def chunks():
+        try:
+            async for delta in astream_with_messages(messages, feature="chat"):
+                yield delta
+        except Exception as e:
+            yield f"Error in GPT response: {str(e)}"
+
+    response = sse_response(chunks(), on_complete=remember_reply)
+    response.headers["X-Session-Id"] = session_id
+    return response
+
+@app.route("/content-check", methods=["POST"])
+async def content_check():
+    data = await request.get_json()
+    return jsonify(await acontent_check_result(
+        data.get("content", ""), data.get("poster", ""), data.get("date", ""), data.get("platform", "")
+    ))
+
+@app.route("/content-check/stream", methods=["POST"])
+async def content_check_stream():
+    data = await request.get_json()
+    check = await astream_content_check(
+        data.get("content", ""), data.get("poster", ""), data.get("date", ""), data.get("platform", "")
+    )
+    response = sse_response(check["stream"])
+    response.headers["X-Content-Check-Path"] = check["path"]
+    return response
+
+@app.route("/content-check/batch", methods=["POST"])
+async def content_check_batch_route():
+    """Same contract as main.content_check_batch_route."""
+    data = await request.get_json() or {}
+    items = data.get("posts") or []
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "No posts provided"}), 400
+    if len(items) > CONTENT_CHECK_BATCH_MAX:
+        return jsonify({"error": f"At most {CONTENT_CHECK_BATCH_MAX} posts per batch"}), 400
+    posts = batch_posts(items)
+
+    if data.get("stream"):
+        async def events():
+            async for index, result, path in acontent_check_batch(posts):
+                event = {"index": index, "result": result, "path": path}
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'done': True})}\n\n"
+
+        return Response(
+            events(),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    results, paths = [None] * len(posts), [None] * len(posts)
+    async for index, result, path in acontent_check_batch(posts):
+        results[index], paths[index] = result, path
+    return jsonify({"results": results, "paths": paths})
+
+@app.route("/scenario/start", methods=["POST"])
+async def scenario_start():
+    data = await request.get_json()
+    topic = data.get("topic", "others")
+    questions = await asyncio.to_thread(get_scenario_questions, topic, 1)
+    session_id = data.get("session_id") or history_store.new_session_id()
+    return jsonify({"topic": topic, "questions": questions, "session_id": session_id})
+
+@app.route("/scenario/answer", methods=["POST"])
+async def scenario_answer():
+    data = await request.get_json()
+    session_id = data.get("session_id")
+    if not session_id:
+        return jsonify({"error": "No session_id provided"}), 400
+    state = await arecord_scenario_answers(session_id, data.get("topic"), data.get("answers", {}))
+    return jsonify({"session_id": session_id, "answered": len(state["answers"])})
+
+@app.route("/scenario/next", methods=["POST"])
+async def scenario_next():
+    data = await request.get_json()
+    topic = data.get("topic", "others")
+    first_answers = data.get("answers", {})
+    session_id = data.get("session_id")
+    if session_id:
+        await arecord_scenario_answers(session_id, topic, first_answers, complete=True)
+    questions = await asyncio.to_thread(get_scenario_questions, topic, 2, first_answers)
+    return jsonify({"topic": topic, "questions": questions, "session_id": session_id})
+
+@app.route("/scenario/analyze", methods=["POST"])
+async def scenario_analyze():
+    data = await request.get_json()
+    result = await aanalyze_scenario_responses(
+        data.get("topic", "others"), data.get("answers", {}), data.get("session_id")
+    )
+    return jsonify({"result": result})
+
+@app.route("/scenario/analyze/stream", methods=["POST"])
+async def scenario_analyze_stream():
+    data = await request.get_json()
+    return sse_response(astream_scenario_analysis(
+        data.get("topic", "others"), data.get("answers", {}), data.get("session_id")
+    ))
+
+@app.route("/scenario/others", methods=["POST"])
+async def scenario_others():
+    data = await request.get_json()
+    history = data.get("history", [])
+    step = data.get("step", 0)
+    has_session = bool(data.get("session_id"))
+    session_id = data.get("session_id") or history_store.new_session_id()
+
+    if step == 0:
+        return jsonify({"question": OTHERS_FIRST_QUESTION, "step": 1, "done": False, "history": [], "session_id": session_id})
+
+    # The new answer's retrieval runs alongside the next question
+    recording = [arecord_scenario_answers(session_id, "others", {h["q"]: h["a"] for h in history}, complete=True)] if has_session and history else []
+
+    if step < 10:
+        next_q = (await asyncio.gather(aothers_next_question(history, session_id), *recording))[0].strip()
+        if step + 1 < 10:
+            aprefetch_others_question(session_id, history, next_q)
+        return jsonify({"question": next_q, "step": step + 1, "done": False, "history": history, "session_id": session_id})
+
+    await asyncio.gather(*recording)
+    if has_session:
+        return jsonify({"done": True, "history": history, "session_id": session_id})
+
+    result = await aai_only(others_final_prompt(history), max_tokens=800, feature="scenario_others")
+    return jsonify({"done": True, "result": result, "history": history})
+
+@app.route("/generate-quiz", methods=["POST"])
+async def generate_quiz():
+    data = await request.get_json()
+    topic = data.get("topic")
+    if not topic:
+        return jsonify({"error": "No topic provided"}), 400
+
+    questions = await asyncio.to_thread(quiz_bank.get_quiz, topic, data.get("difficulty"))
+    if not questions:
+        return jsonify({"error": "Failed to generate quiz"}), 500
+
+    return jsonify({"questions": questions})
+
+@app.route("/random-tip")
+async def random_tip():
+    return jsonify(await asyncio.to_thread(tip_store.random_tip))
+
+@app.route("/stats")
+async def stats():
+    return jsonify({
+        "embedding_cache": cache_stats(),
+        "answer_cache": answer_cache.cache_stats(),
+        "upstream_circuits": circuit_stats(),
+        "quiz_bank": await asyncio.to_thread(quiz_bank.bank_stats),
+        "tip_store": tip_store.tip_stats(),
+        "token_usage": usage_stats(),
+        "reputation": reputation.reputation_stats(),
+        "prefetch": prefetch_store.prefetch_stats(),
+        "followup_cache": await asyncio.to_thread(followup_cache.cache_stats),
+    })
+
+if __name__ == "__main__":
+    import os
+    port = int(os.environ.get("PORT", 5000))
+    app.run(host="0.0.0.0", port=port, debug=True)
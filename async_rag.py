@@ -0,0 +1,248 @@
+# Async counterparts of the rag.py entry points, used by the ASGI app (asgi.py).
+# Prompt building is shared with rag.py; only the upstream I/O differs
+# (AsyncOpenAI and the vector store's aquery). Local blocking work (SQLite caches,
+# BM25, prescreen, reputation lookups) runs in asyncio.to_thread, off the event loop.
+import asyncio
+from dotenv import load_dotenv
+import answer_cache
+import reputation
+import prefetch_store
+import scenario_store
+from embedding_cache import aembed, aembed_many
+from clients import achat_completion
+from rag import index, _content_check_plan, _scenario_messages
+from rag import _scenario_pending, _scenario_query, _scenario_retrieved, SCENARIO_TOP_K
+from rag import _lexical_candidates, _candidate_count, _fuse, _chunks, _query_result_chunks
+from rag import _unique_posts, _content_check_batch_lookup, _content_check_batch_plans, CONTENT_CHECK_BATCH_CONCURRENCY
+from rag import _prescreen_plan, _embedding_failed, _content_check_cache_context, others_next_question_prompt
+from context_builder import assemble_context
+
+load_dotenv()
+
+async def aai_only(prompt: str, max_tokens=600, feature="other"):
+    try:
+        return await aai_with_messages([{"role": "user", "content": prompt}], max_tokens=max_tokens, feature=feature)
+    except Exception as e:
+        return f"Error in ai_only: {str(e)}"
+
+
+async def aai_with_messages(messages, max_tokens=800, temperature=0.7, feature="other"):
+    chat_resp = await achat_completion(
+        feature=feature,
+        model="gpt-5-chat-latest",
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    return chat_resp.choices[0].message.content.strip()
+
+
+async def astream_with_messages(messages, max_tokens=800, temperature=0.7, feature="other"):
+    stream = await achat_completion(
+        feature=feature,
+        model="gpt-5-chat-latest",
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    async for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+
+async def _aretrieve(query_vector, top_k=3):
+    try:
+        matches = await index.aquery(query_vector, top_k=top_k)
+    except Exception as e:
+        print(f"Warning: vector query failed: {str(e)}")
+        return []
+    return _chunks(matches)
+
+
+async def _aretrieve_many(query_vectors, top_k=3):
+    try:
+        results = await index.aquery_many(query_vectors, top_k=top_k)
+    except Exception as e:
+        print(f"Warning: vector query failed: {str(e)}")
+        return [[] for _ in query_vectors]
+    return [_query_result_chunks(result) for result in results]
+
+
+async def aretrieve_context(user_input, top_k=3):
+    """Async rag.retrieve_context."""
+    lexical, lexical_only = await asyncio.to_thread(_lexical_candidates, user_input, top_k)
+    if lexical_only:
+        return lexical[:top_k]
+    try:
+        query_vector = await aembed(user_input)
+    except Exception as e:
+        print(f"Warning: embedding failed: {str(e)}")
+        return lexical[:top_k]
+    return _fuse(await _aretrieve(query_vector, _candidate_count(lexical, top_k)), lexical, top_k)
+
+
+async def _aprepare_content_check(content, poster, date, platform, top_k=3):
+    plan = await asyncio.to_thread(_prescreen_plan, content)
+    if plan is not None:
+        return plan
+
+    try:
+        query_vector = await aembed(content)
+    except Exception as e:
+        return {"answer": f"Error creating embedding: {str(e)}", "path": "error"}
+
+    hits = await asyncio.to_thread(reputation.check, content)
+    cache_context = _content_check_cache_context(poster, date, platform, top_k, hits)
+    cached_answer = await asyncio.to_thread(
+        answer_cache.lookup, "content_checker", query_vector, context_key=cache_context
+    )
+    if cached_answer is not None:
+        return {"answer": cached_answer, "path": "cache"}
+
+    context_texts = assemble_context(await _aretrieve(query_vector, top_k), "content_checker")
+    return _content_check_plan(content, query_vector, cache_context, context_texts, reputation.facts(hits))
+
+
+async def _aprepare_content_checks(posts, top_k=3):
+    plans = await asyncio.to_thread(lambda: [_prescreen_plan(post["content"]) for post in posts])
+    to_embed = [i for i, plan in enumerate(plans) if plan is None]
+    try:
+        query_vectors = await aembed_many([posts[i]["content"] for i in to_embed]) if to_embed else []
+    except Exception as e:
+        return _embedding_failed(plans, e)
+    batch = await asyncio.to_thread(_content_check_batch_lookup, posts, plans, to_embed, query_vectors, top_k)
+    retrieved = await _aretrieve_many([batch["query_vectors"][i] for i in batch["pending"]], top_k)
+    return _content_check_batch_plans(batch, retrieved)
+
+
+async def acontent_check_batch(posts, top_k=3, concurrency=CONTENT_CHECK_BATCH_CONCURRENCY):
+    """Async rag.content_check_batch: yields (position, result, path) as each verdict finishes."""
+    unique, positions = _unique_posts(posts, top_k)
+    plans = await _aprepare_content_checks(unique, top_k)
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def check(i, plan):
+        async with semaphore:
+            return i, await _aanswer_plan(plan)
+
+    for finished in asyncio.as_completed([check(i, plan) for i, plan in enumerate(plans)]):
+        i, result = await finished
+        for position in positions[i]:
+            yield position, result, plans[i]["path"]
+
+
+async def _aanswer_plan(plan):
+    if "answer" in plan:
+        return plan["answer"]
+    try:
+        answer = await aai_with_messages(plan["messages"], temperature=plan["temperature"], feature=plan["feature"])
+    except Exception as e:
+        return f"Error in GPT response: {str(e)}"
+
+    await asyncio.to_thread(
+        answer_cache.store, plan["feature"], plan["query_vector"], answer, context_key=plan["cache_context"]
+    )
+    return answer
+
+
+async def _astream_plan(plan):
+    if "answer" in plan:
+        yield plan["answer"]
+        return
+    parts = []
+    try:
+        async for delta in astream_with_messages(plan["messages"], temperature=plan["temperature"], feature=plan["feature"]):
+            parts.append(delta)
+            yield delta
+    except Exception as e:
+        yield f"Error in GPT response: {str(e)}"
+        return
+
+    await asyncio.to_thread(
+        answer_cache.store, plan["feature"], plan["query_vector"], "".join(parts).strip(), context_key=plan["cache_context"]
+    )
+
+
+async def acontent_check_result(content, poster, date, platform, top_k=3):
+    """Async rag.content_check_result."""
+    plan = await _aprepare_content_check(content, poster, date, platform, top_k)
+    return {"result": await _aanswer_plan(plan), "path": plan["path"]}
+
+
+async def astream_content_check(content, poster, date, platform, top_k=3):
+    """Async rag.stream_content_check."""
+    plan = await _aprepare_content_check(content, poster, date, platform, top_k)
+    return {"stream": _astream_plan(plan), "path": plan["path"]}
+
+
+# Prefetch tasks stay referenced here until done, even after the store drops them
+_prefetch_tasks = set()
+
+
+async def aothers_next_question(history, session_id=None):
+    if prefetch_store.PREFETCH_ENABLED and session_id and history:
+        pending = prefetch_store.take(
+            session_id, prefetch_store.fingerprint(history[:-1], history[-1].get("q", "")), history[-1].get("a", "")
+        )
+        if pending is not None:
+            try:
+                question = await asyncio.wait_for(pending, prefetch_store.PREFETCH_WAIT)
+            except Exception as e:
+                question = f"Error in ai_only: {str(e)}"
+            if not question.startswith("Error"):
+                return question
+    return await aai_only(others_next_question_prompt(history), feature="scenario_others")
+
+
+def aprefetch_others_question(session_id, history, question):
+    """Schedule the question after `question` for each likely short answer; call from the event loop."""
+    if not (prefetch_store.PREFETCH_ENABLED and session_id):
+        return
+    candidates = {}
+    for answer in prefetch_store.LIKELY_ANSWERS:
+        prompt = others_next_question_prompt(history + [{"q": question, "a": answer}])
+        task = asyncio.create_task(aai_only(prompt, feature="scenario_others_prefetch"))
+        _prefetch_tasks.add(task)
+        task.add_done_callback(_prefetch_tasks.discard)
+        candidates[answer] = task
+    prefetch_store.put(session_id, prefetch_store.fingerprint(history, question), candidates)
+
+
+async def arecord_scenario_answers(session_id, topic, answers, complete=False):
+    if session_id:
+        state = await asyncio.to_thread(scenario_store.load, session_id, topic)
+    else:
+        state = scenario_store.empty_state(topic)
+    pending = _scenario_pending(state, answers or {}, complete)
+    if pending:
+        try:
+            vectors = await aembed_many([_scenario_query(q, state["answers"][q]) for q in pending])
+        except Exception as e:
+            print(f"Warning: embedding failed: {str(e)}")
+        else:
+            _scenario_retrieved(state, pending, await _aretrieve_many(vectors, SCENARIO_TOP_K))
+    if session_id:
+        await asyncio.to_thread(scenario_store.save, session_id, state)
+    return state
+
+
+async def _ascenario_messages(topic, user_answers, session_id=None):
+    return _scenario_messages(await arecord_scenario_answers(session_id, topic, user_answers, complete=True))
+
+
+async def aanalyze_scenario_responses(topic, user_answers, session_id=None):
+    messages = await _ascenario_messages(topic, user_answers, session_id)
+    try:
+        return await aai_with_messages(messages, max_tokens=1000, feature="scenario")
+    except Exception as e:
+        return f"Error in ai_only: {str(e)}"
+
+
+async def astream_scenario_analysis(topic, user_answers, session_id=None):
+    messages = await _ascenario_messages(topic, user_answers, session_id)
+    try:
+        async for delta in astream_with_messages(messages, max_tokens=1000, feature="scenario"):
+            yield delta
+    except Exception as e:
+        yield f"Error in ai_only: {str(e)}"
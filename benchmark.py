@@ -0,0 +1,550 @@
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import tempfile
+import threading
+import subprocess
+import http.client
+import urllib.request
+from datetime import datetime
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Offline load test: the app under gunicorn, OpenAI and Pinecone replaced by fake_upstreams.py.
+#   python benchmark.py [results.json]
+# Reports p50/p95/p99 latency, throughput, error rates and worker saturation per endpoint.
+# Upstream latencies are set with the FAKE_* variables of fake_upstreams.py.
+BENCH_DURATION = float(os.getenv("BENCH_DURATION", "60"))  # measured seconds, after the warm-up
+BENCH_WARMUP = float(os.getenv("BENCH_WARMUP", "5"))
+BENCH_CONCURRENCY = int(os.getenv("BENCH_CONCURRENCY", "16"))  # virtual users, each waits for its reply
+BENCH_WORKERS = int(os.getenv("BENCH_WORKERS", "2"))  # gunicorn --workers
+BENCH_THREADS = int(os.getenv("BENCH_THREADS", "4"))  # gunicorn --threads
+BENCH_THINK_MS = float(os.getenv("BENCH_THINK_MS", "0"))  # pause between a user's requests
+# Journey weights; a scenario journey is start -> answer -> next -> analyze
+BENCH_MIX = os.getenv(
+    "BENCH_MIX", "chat=35,content-check=25,scenario=15,generate-quiz=10,random-tip=15"
+)
+BENCH_TIMEOUT = float(os.getenv("BENCH_TIMEOUT", "120"))
+BENCH_RESULTS_DIR = os.getenv("BENCH_RESULTS_DIR", "bench_results")
+SAMPLE_INTERVAL = 0.5
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+# Files the app reads from its working directory
+APP_DATA_FILES = ["knowledge_base.json", "reputation.bin"]
+
+CHAT_MESSAGES = [
+    "Phishing link ကို ဘယ်လို သိနိုင်မလဲ?",
+    "စကားဝှက် ကောင်းကောင်း ဘယ်လို ထားရမလဲ?",
+    "2FA ဆိုတာ ဘာလဲ?",
+    "Facebook account hack ခံရရင် ဘာလုပ်ရမလဲ?",
+    "Public Wi-Fi သုံးတာ လုံခြုံလား?",
+    "OTP ကို ဘယ်သူ့ကိုမှ မပေးရဘူးလား?",
+    "VPN ဘာကြောင့် သုံးသင့်လဲ?",
+    "Mobile banking app ကို ဘယ်လို လုံခြုံအောင် သုံးရမလဲ?",
+]
+CHECK_CONTENTS = [
+    "ဂုဏ်ယူပါတယ်! သင် ကံစမ်းမဲ ၁ သိန်း ပေါက်ပါပြီ။ ဒီ link ကို နှိပ်ပါ http://bit.ly/prize-mm",
+    "KBZPay account ပိတ်ခံရမည်။ OTP ကို 09123456789 သို့ ပို့ပါ",
+    "မနက်ဖြန် ရုံးပိတ်ရက် ဖြစ်ပါတယ်",
+    "အတိုးမဲ့ ချေးငွေ ချက်ချင်းရမည်၊ မှတ်ပုံတင် ဓာတ်ပုံ ပို့ပါ",
+    "Free data 10GB ရယူရန် ဒီ app ကို install လုပ်ပါ",
+]
+SCENARIO_TOPICS = ["phishing", "scam", "hack", "fraud", "threat", "malware"]
+SCENARIO_ANSWERS = ["ဟုတ်ကဲ့", "မဟုတ်ပါ", "မသိပါ", "ဟုတ်", "no", "Link ကို နှိပ်မိပြီး password ထည့်မိတယ်"]
+QUIZ_TOPICS = ["Phishing", "Passwords & 2FA", "Wi-Fi Safety", "Loan & Lottery Scams"]
+QUIZ_DIFFICULTIES = ["easy", "medium", "hard"]
+# Failures the app reports inside a 200 response
+DEGRADED_MARKERS = ["Error in ai_only", "Error in GPT response", "Error creating embedding", '"path": "error"', '"path":"error"']
+
+
+# --------------------
+# Processes
+# --------------------
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_http(url, timeout=60, proc=None):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if proc is not None and proc.poll() is not None:
+            raise RuntimeError(f"{url}: process exited with code {proc.returncode}")
+        try:
+            with urllib.request.urlopen(url, timeout=5) as resp:
+                return json.loads(resp.read() or b"{}")
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up within {timeout}s")
+
+
+def start_fake_upstreams(port):
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, "fake_upstreams.py"), str(port)],
+        cwd=REPO_DIR, stdout=subprocess.DEVNULL,
+    )
+    _wait_http(f"http://127.0.0.1:{port}/health", proc=proc)
+    return proc
+
+
+def start_app(port, upstream_port, workdir):
+    """gunicorn main:app with a fresh working directory, so caches and banks start empty."""
+    upstream = f"http://127.0.0.1:{upstream_port}"
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY="bench",
+        OPENAI_BASE_URL=f"{upstream}/v1",
+        VECTOR_BACKEND="pinecone",
+        PINECONE_API_KEY="bench",
+        PINECONE_HOST=upstream,
+        PINECONE_INDEX="bench",
+        TOKEN_LOG="0",
+    )
+    proc = subprocess.Popen(
+        [
+            sys.executable, "-m", "gunicorn", "main:app",
+            "--bind", f"127.0.0.1:{port}",
+            "--workers", str(BENCH_WORKERS), "--threads", str(BENCH_THREADS),
+            "--chdir", workdir, "--pythonpath", REPO_DIR,
+            "--timeout", str(int(BENCH_TIMEOUT)), "--backlog", "2048",
+            "--log-level", "warning",
+        ],
+        cwd=workdir, env=env,
+    )
+    _wait_http(f"http://127.0.0.1:{port}/stats", timeout=120, proc=proc)
+    return proc
+
+
+def _stop(proc):
+    if proc is None or proc.poll() is not None:
+        return
+    proc.terminate()
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+
+
+# --------------------
+# Virtual users
+# --------------------
+class VirtualUser:
+    """One closed-loop user: sends a request, waits for the whole reply, then picks the next journey."""
+
+    def __init__(self, port, recorder, mix, rng):
+        self.port = port
+        self.recorder = recorder
+        self.mix = mix
+        self.rng = rng
+        self.conn = None
+        self.chat_session = None
+
+    def _request(self, name, method, path, payload=None, stream=False):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        started = time.perf_counter()
+        self.recorder.begin()
+        status, ttfb, text, error = 0, None, "", None
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection("127.0.0.1", self.port, timeout=BENCH_TIMEOUT)
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+            status = resp.status
+            first = resp.read(1) if stream else b""
+            ttfb = time.perf_counter() - started
+            data = first + resp.read()
+            text = data.decode("utf-8", errors="replace")
+            if resp.will_close:
+                self.conn.close()
+                self.conn = None
+        except (OSError, http.client.HTTPException) as e:
+            error = type(e).__name__
+            if self.conn is not None:
+                self.conn.close()
+                self.conn = None
+        finally:
+            self.recorder.end()
+        latency = time.perf_counter() - started
+        if error is None and status >= 400:
+            error = f"HTTP {status}"
+        degraded = error is None and any(marker in text for marker in DEGRADED_MARKERS)
+        self.recorder.record(name, started, latency, ttfb if stream else None, status, error, degraded)
+        if error is not None or stream:
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    def _think(self):
+        if BENCH_THINK_MS > 0:
+            time.sleep(self.rng.expovariate(1000 / BENCH_THINK_MS))
+
+    # Journeys
+    def chat(self, stream=False):
+        payload = {"message": self.rng.choice(CHAT_MESSAGES)}
+        if self.chat_session and self.rng.random() < 0.7:
+            payload["session_id"] = self.chat_session  # a follow-up turn in the same conversation
+        if stream:
+            self._request("chat-stream", "POST", "/chat/stream", payload, stream=True)
+            return
+        reply = self._request("chat", "POST", "/chat", payload)
+        if reply:
+            self.chat_session = reply.get("session_id") or self.chat_session
+
+    def chat_stream(self):
+        self.chat(stream=True)
+
+    def _content_payload(self):
+        return {
+            "content": self.rng.choice(CHECK_CONTENTS),
+            "poster": self.rng.choice(["", "Lucky Draw MM", "KBZ Bank Official"]),
+            "date": "",
+            "platform": self.rng.choice(["Facebook", "Viber", "Telegram"]),
+        }
+
+    def content_check(self):
+        self._request("content-check", "POST", "/content-check", self._content_payload())
+
+    def content_check_stream(self):
+        self._request("content-check-stream", "POST", "/content-check/stream", self._content_payload(), stream=True)
+
+    def scenario(self):
+        topic = self.rng.choice(SCENARIO_TOPICS)
+        start = self._request("scenario-start", "POST", "/scenario/start", {"topic": topic})
+        if not start:
+            return
+        session_id = start.get("session_id")
+        for question in start.get("questions", []):
+            self._think()
+            answers = {question["question"]: self.rng.choice(SCENARIO_ANSWERS)}
+            self._request("scenario-answer", "POST", "/scenario/answer",
+                          {"session_id": session_id, "topic": topic, "answers": answers})
+        following = self._request("scenario-next", "POST", "/scenario/next",
+                                  {"session_id": session_id, "topic": topic, "answers": {}})
+        if not following:
+            return
+        answers = {q["question"]: self.rng.choice(SCENARIO_ANSWERS) for q in following.get("questions", [])}
+        self._think()
+        self._request("scenario-analyze", "POST", "/scenario/analyze/stream",
+                      {"session_id": session_id, "topic": topic, "answers": answers}, stream=True)
+
+    def generate_quiz(self):
+        self._request("generate-quiz", "POST", "/generate-quiz",
+                      {"topic": self.rng.choice(QUIZ_TOPICS), "difficulty": self.rng.choice(QUIZ_DIFFICULTIES)})
+
+    def random_tip(self):
+        self._request("random-tip", "GET", "/random-tip")
+
+    def run(self, stop_at):
+        journeys, weights = zip(*self.mix.items())
+        while time.time() < stop_at:
+            journey = self.rng.choices(journeys, weights)[0]
+            getattr(self, journey.replace("-", "_"))()
+            self._think()
+        if self.conn is not None:
+            self.conn.close()
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if not hasattr(VirtualUser, name.replace("-", "_")) or name == "run":
+            raise ValueError(f"Unknown journey '{name}' in BENCH_MIX")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# --------------------
+# Measurements
+# --------------------
+class Recorder:
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.samples = []
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def end(self):
+        with self._lock:
+            self.in_flight -= 1
+
+    def record(self, name, started, latency, ttfb, status, error, degraded):
+        if started < self.measure_from:
+            return  # warm-up
+        with self._lock:
+            self.samples.append((name, started, latency, ttfb, status, error, degraded))
+
+
+def _listen_queue(port):
+    """Connections waiting in the app's accept queue (rx_queue of the LISTEN socket)."""
+    total = 0
+    for path in ("/proc/net/tcp", "/proc/net/tcp6"):
+        try:
+            with open(path) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    local, state, queues = fields[1], fields[3], fields[4]
+                    if state == "0A" and int(local.rsplit(":", 1)[1], 16) == port:
+                        total += int(queues.split(":")[1], 16)
+        except OSError:
+            return None
+    return total
+
+
+def _children(pid):
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def _cpu_seconds(pid):
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class SaturationSampler(threading.Thread):
+    """
+    Samples, every SAMPLE_INTERVAL: the accept queue, requests in flight against the
+    workers x threads the app can run at once, and each worker's CPU use.
+    """
+
+    def __init__(self, app_proc, port, recorder, capacity):
+        super().__init__(name="saturation-sampler", daemon=True)
+        self.app_pid = app_proc.pid
+        self.port = port
+        self.recorder = recorder
+        self.capacity = capacity
+        self.samples = []
+        self.worker_cpu = {}
+        self._stop_event = threading.Event()
+
+    def run(self):
+        last = {}
+        while not self._stop_event.wait(SAMPLE_INTERVAL):
+            now = time.perf_counter()
+            cpu = {}
+            for pid in _children(self.app_pid):
+                seconds = _cpu_seconds(pid)
+                if seconds is None:
+                    continue
+                if pid in last:
+                    cpu[pid] = (seconds - last[pid][1]) / (now - last[pid][0])
+                last[pid] = (now, seconds)
+            if now < self.recorder.measure_from:
+                continue
+            in_flight = self.recorder.in_flight
+            self.samples.append({
+                "accept_queue": _listen_queue(self.port),
+                "in_flight": in_flight,
+                "busy": min(1.0, in_flight / self.capacity),
+                "worker_cpu": cpu,
+            })
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def summary(self):
+        if not self.samples:
+            return {}
+        queues = [s["accept_queue"] for s in self.samples if s["accept_queue"] is not None]
+        busy = [s["busy"] for s in self.samples]
+        per_worker = {}
+        for sample in self.samples:
+            for pid, share in sample["worker_cpu"].items():
+                per_worker.setdefault(pid, []).append(share)
+        return {
+            "samples": len(self.samples),
+            "capacity": self.capacity,
+            "mean_in_flight": round(sum(s["in_flight"] for s in self.samples) / len(self.samples), 2),
+            # Share of samples with every worker thread taken (or more requests than threads)
+            "saturated_share": round(sum(1 for b in busy if b >= 1.0) / len(busy), 3),
+            "mean_busy": round(sum(busy) / len(busy), 3),
+            "accept_queue_mean": round(sum(queues) / len(queues), 2) if queues else None,
+            "accept_queue_max": max(queues) if queues else None,
+            "worker_cpu_mean": {
+                str(pid): round(sum(shares) / len(shares), 3) for pid, shares in sorted(per_worker.items())
+            },
+        }
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def _latency_summary(values):
+    values = sorted(values)
+    if not values:
+        return {}
+    return {
+        "p50_ms": round(_percentile(values, 50) * 1000, 1),
+        "p95_ms": round(_percentile(values, 95) * 1000, 1),
+        "p99_ms": round(_percentile(values, 99) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1),
+        "mean_ms": round(sum(values) / len(values) * 1000, 1),
+    }
+
+
+def _endpoint_summary(samples, duration):
+    ok = [s for s in samples if s[5] is None]
+    errors = {}
+    for s in samples:
+        if s[5] is not None:
+            errors[s[5]] = errors.get(s[5], 0) + 1
+    degraded = sum(1 for s in samples if s[6])
+    summary = {
+        "requests": len(samples),
+        "rps": round(len(samples) / duration, 2),
+        "errors": sum(errors.values()),
+        "error_rate": round(sum(errors.values()) / len(samples), 4) if samples else 0,
+        "error_kinds": errors,
+        "degraded": degraded,
+        "degraded_rate": round(degraded / len(samples), 4) if samples else 0,
+        "latency": _latency_summary([s[2] for s in ok]),
+    }
+    ttfb = [s[3] for s in ok if s[3] is not None]
+    if ttfb:
+        summary["ttfb"] = _latency_summary(ttfb)
+    return summary
+
+
+def summarize(samples, duration):
+    endpoints = {}
+    for sample in samples:
+        endpoints.setdefault(sample[0], []).append(sample)
+    return {
+        "overall": _endpoint_summary(samples, duration),
+        "endpoints": {name: _endpoint_summary(items, duration) for name, items in sorted(endpoints.items())},
+    }
+
+
+def _app_stats(port):
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/stats", timeout=10) as resp:
+            return json.loads(resp.read())
+    except (OSError, ValueError) as e:
+        return {"error": str(e)}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_DIR, capture_output=True, text=True, timeout=10
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _fake_config():
+    return {key: value for key, value in os.environ.items() if key.startswith("FAKE_")}
+
+
+def print_report(report):
+    rows = [("overall", report["results"]["overall"])] + list(report["results"]["endpoints"].items())
+    print(f"\n{'endpoint':<22}{'reqs':>7}{'rps':>8}{'err%':>7}{'p50':>9}{'p95':>9}{'p99':>9}{'ttfb p50':>10}")
+    for name, row in rows:
+        latency = row.get("latency", {})
+        print(
+            f"{name:<22}{row['requests']:>7}{row['rps']:>8}{row['error_rate'] * 100:>6.1f}%"
+            f"{latency.get('p50_ms', '-'):>9}{latency.get('p95_ms', '-'):>9}{latency.get('p99_ms', '-'):>9}"
+            f"{row.get('ttfb', {}).get('p50_ms', '-'):>10}"
+        )
+    saturation = report["saturation"]
+    if saturation:
+        print(
+            f"\nSaturation: {saturation['mean_busy'] * 100:.0f}% of {saturation['capacity']} worker threads busy on average, "
+            f"all busy {saturation['saturated_share'] * 100:.0f}% of the time, "
+            f"accept queue mean {saturation['accept_queue_mean']} / max {saturation['accept_queue_max']}"
+        )
+
+
+def run_benchmark(output_path=None):
+    mix = parse_mix(BENCH_MIX)
+    upstream_port, app_port = _free_port(), _free_port()
+    workdir = tempfile.mkdtemp(prefix="lannpya-bench-")
+    for name in APP_DATA_FILES:
+        if os.path.exists(os.path.join(REPO_DIR, name)):
+            shutil.copy(os.path.join(REPO_DIR, name), workdir)
+
+    fake_proc = app_proc = None
+    try:
+        fake_proc = start_fake_upstreams(upstream_port)
+        app_proc = start_app(app_port, upstream_port, workdir)
+        print(f"🚀 {BENCH_CONCURRENCY} users against {BENCH_WORKERS} workers x {BENCH_THREADS} threads "
+              f"for {BENCH_WARMUP:.0f}s warm-up + {BENCH_DURATION:.0f}s")
+
+        start = time.perf_counter()
+        recorder = Recorder(measure_from=start + BENCH_WARMUP)
+        sampler = SaturationSampler(app_proc, app_port, recorder, BENCH_WORKERS * BENCH_THREADS)
+        sampler.start()
+        stop_at = time.time() + BENCH_WARMUP + BENCH_DURATION
+        users = [
+            threading.Thread(
+                target=VirtualUser(app_port, recorder, mix, random.Random(i)).run, args=(stop_at,), daemon=True
+            )
+            for i in range(BENCH_CONCURRENCY)
+        ]
+        for user in users:
+            user.start()
+        for user in users:
+            user.join(timeout=BENCH_WARMUP + BENCH_DURATION + BENCH_TIMEOUT)
+        sampler.stop()
+        # Journeys still running at the deadline finish late; rates use the real measured time
+        measured = max(1e-9, time.perf_counter() - recorder.measure_from)
+
+        report = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "config": {
+                "duration_s": BENCH_DURATION, "warmup_s": BENCH_WARMUP, "measured_s": round(measured, 2),
+                "concurrency": BENCH_CONCURRENCY, "workers": BENCH_WORKERS, "threads": BENCH_THREADS,
+                "think_ms": BENCH_THINK_MS, "mix": mix,
+            },
+            "fake_upstreams": _fake_config(),
+            "results": summarize(recorder.samples, measured),
+            "saturation": sampler.summary(),
+            "app_stats": _app_stats(app_port),  # counters of whichever worker answers
+        }
+    finally:
+        _stop(app_proc)
+        _stop(fake_proc)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if output_path is None:
+        os.makedirs(BENCH_RESULTS_DIR, exist_ok=True)
+        output_path = os.path.join(BENCH_RESULTS_DIR, f"bench-{datetime.now():%Y%m%d-%H%M%S}.json")
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print_report(report)
+    print(f"\n🎉 Results written to {output_path}")
+    return report
+
+
+if __name__ == "__main__":
+    run_benchmark(sys.argv[1] if len(sys.argv) > 1 else None)
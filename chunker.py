@@ -0,0 +1,241 @@
+import os
+import re
+from collections import Counter
+from dotenv import load_dotenv
+from tokens import count_tokens
+
+load_dotenv()
+
+# Chunks are packed from whole sentences up to this many tokens
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "600"))
+# Sections shorter than this are merged with their neighbours in the same chapter
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "300"))
+
+BURMESE_DIGITS = "၀၁၂၃၄၅၆၇၈၉"
+_TO_ARABIC = str.maketrans(BURMESE_DIGITS, "0123456789")
+
+# Sentence ends: Burmese ။ (but not the one after a section number like ၃၆။),
+# English . ! ? ; (but not after a digit, e.g. "36.")
+_SENTENCE_END = re.compile(r"(?<=[^၀-၉\s]။)\s*|(?<=[^\d\s][.!?;])\s+")
+# Lines that start a new clause, e.g. (a) (၁) (က)
+_CLAUSE_START = re.compile(r"^\(\s*[\w၀-၉က-အ]{1,4}\s*\)")
+_PARAGRAPH_END = ("။", ".", ":", ";", ":-", "-")
+
+_CHAPTER = re.compile(r"^(?:အခန်း|chapter\s*\(?\s*(?:[ivxlc]+|\d+)\s*\)?\s*$)", re.IGNORECASE)
+_SECTION = re.compile(r"^([၀-၉]+)။|^(\d+)\.\s*\S|^(\d+)$")
+# Table-of-contents lines end with a page number, e.g. "၃။ ရည်ရွယ်ချက် – ၁၀"
+_TOC_LINE = re.compile(r"[–—-]\s*[၀-၉\d]+\s*$")
+_PAGE_NUMBER = re.compile(r"^[-–\s]*[\d၀-၉]+[-–\s]*$")
+
+
+def normalize_numbers(text):
+    """Burmese digits → Arabic digits (၃၆ → 36)."""
+    return text.translate(_TO_ARABIC)
+
+
+# --------------------
+# Sentences and token-budgeted packing
+# --------------------
+def paragraphs(lines):
+    """Re-join lines that a PDF wrapped mid-sentence; keep real paragraph and clause breaks."""
+    paras = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if paras and not _CLAUSE_START.match(line) and not paras[-1].endswith(_PARAGRAPH_END):
+            paras[-1] += " " + line
+        else:
+            paras.append(line)
+    return paras
+
+
+def _split_long(sentence, max_tokens):
+    """Hard-split a single sentence that exceeds the budget, on spaces where possible."""
+    pieces, current = [], ""
+    for word in re.split(r"(?<=\s)", sentence):
+        while count_tokens(word) > max_tokens:
+            # Unspaced Burmese run: cut by characters
+            cut = max(1, len(word) * max_tokens // count_tokens(word))
+            if current:
+                pieces.append(current.strip())
+                current = ""
+            pieces.append(word[:cut].strip())
+            word = word[cut:]
+        if current and count_tokens(current + word) > max_tokens:
+            pieces.append(current.strip())
+            current = ""
+        current += word
+    if current.strip():
+        pieces.append(current.strip())
+    return pieces
+
+
+def sentence_units(lines, max_tokens=CHUNK_MAX_TOKENS):
+    """[(sentence, starts_paragraph)] with every sentence within the token budget."""
+    units = []
+    for para in paragraphs(lines):
+        first = True
+        for sentence in _SENTENCE_END.split(para):
+            sentence = sentence.strip()
+            if not sentence:
+                continue
+            for piece in _split_long(sentence, max_tokens) if count_tokens(sentence) > max_tokens else [sentence]:
+                units.append((piece, first))
+                first = False
+    return units
+
+
+def pack(units, max_tokens=CHUNK_MAX_TOKENS, prefix=""):
+    """Greedily pack whole sentences into chunks of at most max_tokens, without overlap."""
+    chunks, current, current_tokens = [], "", 0
+    for sentence, starts_paragraph in units:
+        sep = "\n" if starts_paragraph else " "
+        tokens = count_tokens(sentence) + 1
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current, current_tokens = "", 0
+        if not current and chunks and prefix:
+            current, current_tokens = prefix, count_tokens(prefix)
+            sep = " "
+        current = f"{current}{sep}{sentence}" if current else sentence
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_plain(text, max_tokens=CHUNK_MAX_TOKENS):
+    """Chunk unstructured text (KB entries, PDFs without detectable sections) by sentences."""
+    return pack(sentence_units(text.splitlines(), max_tokens), max_tokens)
+
+
+# --------------------
+# Legal structure: chapters and numbered sections
+# --------------------
+def strip_page_furniture(pages):
+    """
+    Drop running headers/footers (lines repeated on many pages) and page
+    numbers at the top or bottom of a page, then return all lines in order.
+    """
+    page_lines = [[ln.strip() for ln in page.splitlines() if ln.strip()] for page in pages]
+    seen_on = Counter(ln for lines in page_lines for ln in set(lines))
+    repeated = {ln for ln, n in seen_on.items() if len(pages) >= 4 and n >= max(3, len(pages) // 2)}
+
+    out = []
+    for page_number, lines in enumerate(page_lines, start=1):
+        lines = [ln for ln in lines if ln not in repeated]
+        while lines and _is_page_number(lines[0], page_number):
+            lines = lines[1:]
+        while lines and _is_page_number(lines[-1], page_number):
+            lines = lines[:-1]
+        out.extend(lines)
+    return out
+
+
+def _is_page_number(line, page_number):
+    if not _PAGE_NUMBER.match(line):
+        return False
+    digits = re.sub(r"[^\d]", "", normalize_numbers(line))
+    # "- 2 -" is always a page number; a bare "2" only if it matches the page
+    return not line.strip().isdigit() or abs(int(digits) - page_number) <= 1
+
+
+def split_sections(lines):
+    """
+    Split law text into numbered sections, tracking the current chapter.
+    Handles the Burmese law (အခန်း / ၃၆။) and the English translations
+    (Chapter IV / "36. ..." / a bare "36" line). Section numbers must increase,
+    which keeps page numbers and numbered lists from starting new sections.
+    """
+    sections = []
+    chapter = None
+    expect_title = False
+    current = {"chapter": None, "number": None, "label": None, "lines": []}
+    last_number = 0
+    pending_label = None
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if _TOC_LINE.search(line) and len(line) < 120 and not line.endswith(("။", ".")):
+            continue
+
+        if _CHAPTER.match(line):
+            chapter = line
+            expect_title = True
+            continue
+
+        match = _SECTION.match(line)
+        number = None
+        if match:
+            burmese, dotted, bare = match.groups()
+            candidate = int(normalize_numbers(burmese or dotted or bare))
+            if bare:
+                ok = candidate == last_number + 1
+            else:
+                ok = last_number < candidate <= last_number + 3
+            number = candidate if ok else None
+
+        if expect_title and number is None and len(line) < 80:
+            chapter = f"{chapter} - {line}"
+            expect_title = False
+            continue
+        expect_title = False
+
+        if number is not None:
+            if current["lines"]:
+                sections.append(current)
+            label = f"{match.group(1)}။" if match.group(1) else f"{number}."
+            current = {"chapter": chapter, "number": number, "label": label, "lines": []}
+            last_number = number
+            if match.group(3):  # bare number line: the text starts on the next line
+                pending_label = label
+                continue
+        if pending_label:
+            line = f"{pending_label} {line}"
+            pending_label = None
+        current["lines"].append(line)
+
+    if current["lines"]:
+        sections.append(current)
+    return sections
+
+
+def chunk_sections(sections, max_tokens=CHUNK_MAX_TOKENS, min_tokens=CHUNK_MIN_TOKENS):
+    """
+    [(text, {"chapter", "section", "part"})] for a list of split_sections() sections.
+    Long sections are split at sentence boundaries (continuations repeat the
+    section label); short neighbours in the same chapter are merged. Each chunk
+    starts with its chapter heading, within the token budget, so the model can cite it.
+    """
+    chunks = []
+    for section in sections:
+        chapter = section["chapter"]
+        budget = max_tokens - (count_tokens(chapter) + 1 if chapter else 0)
+        units = sentence_units(section["lines"], budget)
+        prefix = f"{section['label']} …" if section["label"] else ""
+        parts = pack(units, budget, prefix=prefix)
+        number = str(section["number"]) if section["number"] is not None else None
+        for part, text in enumerate(parts, start=1):
+            prev_text, prev_meta = chunks[-1] if chunks else (None, None)
+            if (
+                len(parts) == 1 and prev_meta and prev_meta["single"]
+                and prev_meta["chapter"] == chapter
+                and count_tokens(prev_text) < min_tokens
+                and count_tokens(prev_text) + count_tokens(text) + 1 <= budget
+            ):
+                first = (prev_meta["section"] or "").split("-")[0]
+                merged = {**prev_meta, "section": f"{first}-{number}" if first and number else first or number}
+                chunks[-1] = (f"{prev_text}\n{text}", merged)
+                continue
+            meta = {"chapter": chapter, "section": number, "part": part, "single": len(parts) == 1}
+            chunks.append((text, meta))
+
+    results = []
+    for text, meta in chunks:
+        if meta["chapter"]:
+            text = f"{meta['chapter']}\n{text}"
+        results.append((text, {k: v for k, v in meta.items() if k != "single" and v is not None}))
+    return results
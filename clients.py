@@ -0,0 +1,283 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import httpx
+import openai
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Per-call deadlines (seconds)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+EMBEDDING_TIMEOUT = float(os.getenv("EMBEDDING_TIMEOUT", "10"))
+PINECONE_TIMEOUT = float(os.getenv("PINECONE_TIMEOUT", "5"))
+# Retries on 429 / 5xx / timeouts, with full-jitter exponential backoff
+UPSTREAM_MAX_RETRIES = int(os.getenv("UPSTREAM_MAX_RETRIES", "2"))
+UPSTREAM_BACKOFF_BASE = float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5"))
+UPSTREAM_BACKOFF_MAX = float(os.getenv("UPSTREAM_BACKOFF_MAX", "8"))
+# Circuit breaker: open after N consecutive failures, probe again after the cooldown
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_TIMEOUT = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+# Keep-alive connection pool size per process
+UPSTREAM_POOL_SIZE = int(os.getenv("UPSTREAM_POOL_SIZE", "20"))
+
+
+class CircuitOpenError(Exception):
+    """Raised without calling the upstream while its circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed → open → half-open (one probe) → closed."""
+
+    def __init__(self, name, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_timeout=CIRCUIT_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half-open" and self._probing):
+                raise CircuitOpenError(f"{self.name} circuit is open; failing fast")
+            if state == "half-open":
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                self.opened_at = time.monotonic()
+
+
+breakers = {name: CircuitBreaker(name) for name in ("openai", "pinecone")}
+
+
+def is_retryable(error):
+    """429, 5xx, timeouts and connection errors are worth retrying; 4xx client errors are not."""
+    if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError, httpx.TimeoutException, httpx.NetworkError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if isinstance(status, int):
+        return status == 429 or status >= 500
+    return type(error).__name__ in {"TimeoutError", "ConnectionError", "MaxRetryError", "ProtocolError", "ReadTimeoutError"}
+
+
+def _backoff(attempt):
+    return random.uniform(0, min(UPSTREAM_BACKOFF_MAX, UPSTREAM_BACKOFF_BASE * (2 ** attempt)))
+
+
+def call_upstream(name, fn, *args, **kwargs):
+    """Call fn through the named circuit breaker, retrying transient failures."""
+    breaker = breakers[name]
+    for attempt in range(UPSTREAM_MAX_RETRIES + 1):
+        breaker.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                # The upstream answered (e.g. 400); it is not down
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == UPSTREAM_MAX_RETRIES:
+                raise
+            print(f"Warning: {name} call failed ({str(e)}), retrying")
+            time.sleep(_backoff(attempt))
+        else:
+            breaker.record_success()
+            return result
+
+
+async def acall_upstream(name, fn, *args, **kwargs):
+    """Async version of call_upstream; fn returns an awaitable."""
+    breaker = breakers[name]
+    for attempt in range(UPSTREAM_MAX_RETRIES + 1):
+        breaker.before_call()
+        try:
+            result = await fn(*args, **kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                breaker.record_success()
+                raise
+            breaker.record_failure()
+            if attempt == UPSTREAM_MAX_RETRIES:
+                raise
+            print(f"Warning: {name} call failed ({str(e)}), retrying")
+            await asyncio.sleep(_backoff(attempt))
+        else:
+            breaker.record_success()
+            return result
+
+
+# --------------------
+# OpenAI: one keep-alive pool per process (sync and async), SDK retries off (we retry above)
+# --------------------
+_limits = httpx.Limits(max_connections=UPSTREAM_POOL_SIZE, max_keepalive_connections=UPSTREAM_POOL_SIZE)
+
+openai_client = openai.OpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=0,
+    timeout=OPENAI_TIMEOUT,
+    http_client=httpx.Client(limits=_limits, timeout=OPENAI_TIMEOUT),
+)
+async_openai_client = openai.AsyncOpenAI(
+    api_key=os.getenv("OPENAI_API_KEY"),
+    max_retries=0,
+    timeout=OPENAI_TIMEOUT,
+    http_client=httpx.AsyncClient(limits=_limits, timeout=OPENAI_TIMEOUT),
+)
+
+
+# --------------------
+# Token telemetry: prompt/completion tokens per feature, logged per request
+# --------------------
+TOKEN_LOG = os.getenv("TOKEN_LOG", "1") != "0"
+# Sent as prompt_cache_key so requests sharing a persona prefix land on the same prompt cache
+PROMPT_CACHE_KEY_PREFIX = os.getenv("PROMPT_CACHE_KEY_PREFIX", "lannpya-")
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+def record_usage(feature, usage, messages=None, completion_text=None):
+    """
+    Count one completion's tokens. Uses the API's usage block; if the response
+    has none, falls back to tokenizer counts of the messages and the output.
+    cached_tokens is the part of the prompt served from OpenAI's prompt cache.
+    """
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    cached_tokens = getattr(getattr(usage, "prompt_tokens_details", None), "cached_tokens", None) or 0
+    if prompt_tokens is None:
+        from tokens import count_tokens, CHAT_ENCODING
+
+        prompt_tokens = sum(count_tokens(m.get("content") or "", CHAT_ENCODING) for m in messages or [])
+        completion_tokens = count_tokens(completion_text or "", CHAT_ENCODING)
+    with _usage_lock:
+        stats = _usage.setdefault(feature, {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0})
+        stats["requests"] += 1
+        stats["prompt_tokens"] += prompt_tokens
+        stats["cached_tokens"] += cached_tokens
+        stats["completion_tokens"] += completion_tokens or 0
+    if TOKEN_LOG:
+        print(f"Tokens [{feature}]: prompt={prompt_tokens} cached={cached_tokens} completion={completion_tokens}")
+
+
+def usage_stats():
+    with _usage_lock:
+        return {feature: dict(stats) for feature, stats in _usage.items()}
+
+
+def _track_stream(stream, feature, messages):
+    """Pass stream chunks through, recording usage from the final chunk (include_usage)."""
+    usage, parts = None, []
+    try:
+        for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+    finally:
+        record_usage(feature, usage, messages, "".join(parts))
+
+
+async def _atrack_stream(stream, feature, messages):
+    usage, parts = None, []
+    try:
+        async for chunk in stream:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                parts.append(chunk.choices[0].delta.content)
+            yield chunk
+    finally:
+        record_usage(feature, usage, messages, "".join(parts))
+
+
+def _completion_text(response):
+    try:
+        return response.choices[0].message.content
+    except (AttributeError, IndexError):
+        return ""
+
+
+def chat_completion(feature="other", **kwargs):
+    """
+    openai chat.completions.create with deadline, retries and circuit breaking.
+    feature labels the call in the token telemetry.
+    """
+    kwargs.setdefault("timeout", OPENAI_TIMEOUT)
+    if PROMPT_CACHE_KEY_PREFIX:
+        kwargs.setdefault("prompt_cache_key", PROMPT_CACHE_KEY_PREFIX + feature)
+    if kwargs.get("stream"):
+        kwargs.setdefault("stream_options", {"include_usage": True})
+    response = call_upstream("openai", openai_client.chat.completions.create, **kwargs)
+    if kwargs.get("stream"):
+        return _track_stream(response, feature, kwargs.get("messages"))
+    record_usage(feature, getattr(response, "usage", None), kwargs.get("messages"), _completion_text(response))
+    return response
+
+
+def create_embeddings(**kwargs):
+    kwargs.setdefault("timeout", EMBEDDING_TIMEOUT)
+    return call_upstream("openai", openai_client.embeddings.create, **kwargs)
+
+
+async def achat_completion(feature="other", **kwargs):
+    kwargs.setdefault("timeout", OPENAI_TIMEOUT)
+    if PROMPT_CACHE_KEY_PREFIX:
+        kwargs.setdefault("prompt_cache_key", PROMPT_CACHE_KEY_PREFIX + feature)
+    if kwargs.get("stream"):
+        kwargs.setdefault("stream_options", {"include_usage": True})
+    response = await acall_upstream("openai", async_openai_client.chat.completions.create, **kwargs)
+    if kwargs.get("stream"):
+        return _atrack_stream(response, feature, kwargs.get("messages"))
+    record_usage(feature, getattr(response, "usage", None), kwargs.get("messages"), _completion_text(response))
+    return response
+
+
+async def acreate_embeddings(**kwargs):
+    kwargs.setdefault("timeout", EMBEDDING_TIMEOUT)
+    return await acall_upstream("openai", async_openai_client.embeddings.create, **kwargs)
+
+
+# --------------------
+# Pinecone: one client (and its urllib3 pool) per process
+# --------------------
+_pinecone = None
+_pinecone_lock = threading.Lock()
+
+
+def get_pinecone():
+    global _pinecone
+    with _pinecone_lock:
+        if _pinecone is None:
+            from pinecone import Pinecone
+
+            _pinecone = Pinecone(api_key=os.getenv("PINECONE_API_KEY"), pool_threads=UPSTREAM_POOL_SIZE)
+        return _pinecone
+
+
+def circuit_stats():
+    return {name: {"state": b.state, "consecutive_failures": b.failures} for name, b in breakers.items()}
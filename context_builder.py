@@ -0,0 +1,100 @@
+import os
+import re
+from dotenv import load_dotenv
+from tokens import count_tokens, CHAT_ENCODING
+from chunker import sentence_units
+
+load_dotenv()
+
+# Knowledge-base context tokens allowed per prompt, by feature.
+# Override with e.g. CONTEXT_TOKEN_BUDGETS="general=1500,chat=1000"
+DEFAULT_CONTEXT_BUDGETS = {"general": 1200, "chat": 1200, "content_checker": 1000, "scenario": 1800}
+# Don't start a truncated chunk with less room than this
+MIN_PARTIAL_TOKENS = 80
+# Shorter sentences (labels, headings) are only dropped on an exact repeat
+MIN_OVERLAP_CHARS = 20
+
+
+def _parse_budgets(value):
+    budgets = dict(DEFAULT_CONTEXT_BUDGETS)
+    for item in (value or "").split(","):
+        if "=" in item:
+            feature, budget = item.split("=", 1)
+            budgets[feature.strip()] = int(budget)
+    return budgets
+
+
+CONTEXT_TOKEN_BUDGETS = _parse_budgets(os.getenv("CONTEXT_TOKEN_BUDGETS"))
+
+
+# Whitespace and punctuation (incl. ၊ ။); Burmese vowel signs and asat are combining marks, not \w, and must stay
+_NOT_KEY = re.compile(r"[^\w\u1000-\u1049\u104c-\u109f]+")
+
+
+def _key(sentence):
+    """
+    Sentence text without whitespace and punctuation, for comparing chunks.
+    Sentences differing only in vowel signs stay distinct:
+    >>> _key("ပုဒ်မ ၃၆ ကိုယ်ရေးကိုယ်တာ။") == _key("ပဒမ ၃၆ ကယရကယတ")
+    False
+    >>> _key("ပုဒ်မ ၃၆ ကိုယ်ရေးကိုယ်တာ။")
+    'ပုဒ်မ၃၆ကိုယ်ရေးကိုယ်တာ'
+    """
+    return _NOT_KEY.sub("", sentence).lower()
+
+
+def _dedupe(text, seen_sentences, selected_texts):
+    """
+    Drop the sentences of text that an earlier chunk already contributed.
+    Catches duplicate chunks and the overlapping windows of old-style chunking
+    (a window edge cuts a sentence, so fragments contained in kept text go too).
+    """
+    kept = []
+    for sentence, starts_paragraph in sentence_units(text.splitlines(), max_tokens=10**6):
+        key = _key(sentence)
+        if not key or key in seen_sentences:
+            continue
+        if len(key) >= MIN_OVERLAP_CHARS and any(key in selected for selected in selected_texts):
+            continue
+        seen_sentences.add(key)
+        kept.append(("\n" if starts_paragraph and kept else " " if kept else "") + sentence)
+    return "".join(kept)
+
+
+def _truncate(text, max_tokens):
+    """Longest prefix of whole sentences within max_tokens."""
+    out = ""
+    for sentence, starts_paragraph in sentence_units(text.splitlines(), max_tokens=max_tokens):
+        candidate = out + ("\n" if starts_paragraph and out else " " if out else "") + sentence
+        if count_tokens(candidate, CHAT_ENCODING) > max_tokens:
+            break
+        out = candidate
+    return out
+
+
+def assemble_context(chunks, feature="general", budget=None):
+    """
+    Texts of the ranked chunks to put in the prompt: duplicates and overlapping
+    spans removed, packed best-first into the feature's token budget (the last
+    chunk may be cut at a sentence boundary).
+    """
+    budget = budget or CONTEXT_TOKEN_BUDGETS.get(feature, DEFAULT_CONTEXT_BUDGETS["general"])
+    texts, seen_sentences, selected_keys = [], set(), []
+    used = 0
+    for chunk in chunks:
+        text = _dedupe(chunk["text"] if isinstance(chunk, dict) else chunk, seen_sentences, selected_keys)
+        if not text:
+            continue
+        tokens = count_tokens(text, CHAT_ENCODING)
+        if used + tokens > budget:
+            remaining = budget - used
+            if remaining >= MIN_PARTIAL_TOKENS:
+                partial = _truncate(text, remaining)
+                if partial:
+                    texts.append(partial)
+                    used += count_tokens(partial, CHAT_ENCODING)
+            break
+        texts.append(text)
+        selected_keys.append(_key(text))
+        used += tokens
+    return texts
@@ -0,0 +1,188 @@
+import os
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import unicodedata
+from collections import OrderedDict
+import numpy as np
+from dotenv import load_dotenv
+from clients import create_embeddings, acreate_embeddings
+
+load_dotenv()
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+# Tier 1: per-process LRU (entries). Tier 2: SQLite file shared by all gunicorn workers.
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "2048"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "embedding_cache.sqlite3")
+EMBEDDING_CACHE_DISK_MAX = int(os.getenv("EMBEDDING_CACHE_DISK_MAX", "200000"))
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+_db = None
+_inserts_since_prune = 0
+
+
+def normalize_text(text):
+    """Unicode-normalize and collapse whitespace so trivially different pastes share a key."""
+    text = unicodedata.normalize("NFC", text or "")
+    return " ".join(text.split())
+
+
+def cache_key(text, model=EMBEDDING_MODEL):
+    return hashlib.sha256(f"{model}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def _get_db():
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(EMBEDDING_CACHE_PATH, timeout=5, check_same_thread=False)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute("PRAGMA synchronous=NORMAL")
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            "key TEXT PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+        )
+        _db.execute("CREATE INDEX IF NOT EXISTS embeddings_created_at ON embeddings(created_at)")
+    return _db
+
+
+def _remember(key, vector):
+    """Insert into the in-process LRU, evicting the least recently used entries."""
+    _memory[key] = vector
+    _memory.move_to_end(key)
+    while len(_memory) > EMBEDDING_CACHE_SIZE:
+        _memory.popitem(last=False)
+
+
+def _disk_get(keys):
+    if not keys:
+        return {}
+    try:
+        with _lock:
+            placeholders = ",".join("?" * len(keys))
+            rows = _get_db().execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", list(keys)
+            ).fetchall()
+        return {key: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in rows}
+    except sqlite3.Error as e:
+        print(f"Warning: embedding cache read failed: {str(e)}")
+        return {}
+
+
+def _disk_put(items, model):
+    global _inserts_since_prune
+    try:
+        with _lock:
+            db = _get_db()
+            now = time.time()
+            db.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, created_at) VALUES (?, ?, ?, ?)",
+                [(key, model, np.asarray(vec, dtype=np.float32).tobytes(), now) for key, vec in items],
+            )
+            _inserts_since_prune += len(items)
+            # Keep the shared file bounded: drop the oldest rows once in a while
+            if _inserts_since_prune >= 1000:
+                _inserts_since_prune = 0
+                db.execute(
+                    "DELETE FROM embeddings WHERE key IN ("
+                    "SELECT key FROM embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (EMBEDDING_CACHE_DISK_MAX,),
+                )
+            db.commit()
+    except sqlite3.Error as e:
+        print(f"Warning: embedding cache write failed: {str(e)}")
+
+
+def _lookup(keys):
+    """Resolve keys from the memory LRU, then the shared SQLite store."""
+    found = {}
+    with _lock:
+        for key in keys:
+            if key in _memory:
+                _memory.move_to_end(key)
+                found[key] = _memory[key]
+                _stats["memory_hits"] += 1
+
+    disk_keys = list(dict.fromkeys(k for k in keys if k not in found))
+    from_disk = _disk_get(disk_keys)
+    with _lock:
+        for key, vec in from_disk.items():
+            _remember(key, vec)
+            _stats["disk_hits"] += 1
+    found.update(from_disk)
+    return found
+
+
+def _missing(keys, texts, found):
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in found and key not in missing:
+            missing[key] = normalize_text(text)
+    return missing
+
+
+def _store(fresh, model):
+    with _lock:
+        for key, vec in fresh.items():
+            _remember(key, vec)
+        _stats["misses"] += len(fresh)
+    _disk_put(fresh.items(), model)
+
+
+def embed_many(texts, model=EMBEDDING_MODEL):
+    """
+    Return one embedding per text, in order.
+    Checks the memory LRU, then the shared SQLite store, and sends all
+    remaining misses to OpenAI in a single embeddings request.
+    """
+    keys = [cache_key(t, model) for t in texts]
+    found = _lookup(keys)
+    missing = _missing(keys, texts, found)
+
+    if missing:
+        emb_resp = create_embeddings(model=model, input=list(missing.values()))
+        fresh = {key: item.embedding for key, item in zip(missing.keys(), emb_resp.data)}
+        _store(fresh, model)
+        found.update(fresh)
+
+    return [found[key] for key in keys]
+
+
+async def aembed_many(texts, model=EMBEDDING_MODEL):
+    """
+    Async version of embed_many for the ASGI app (misses go through AsyncOpenAI).
+    The SQLite tier is read and written in a thread, off the event loop.
+    """
+    keys = [cache_key(t, model) for t in texts]
+    found = await asyncio.to_thread(_lookup, keys)
+    missing = _missing(keys, texts, found)
+
+    if missing:
+        emb_resp = await acreate_embeddings(model=model, input=list(missing.values()))
+        fresh = {key: item.embedding for key, item in zip(missing.keys(), emb_resp.data)}
+        await asyncio.to_thread(_store, fresh, model)
+        found.update(fresh)
+
+    return [found[key] for key in keys]
+
+
+async def aembed(text, model=EMBEDDING_MODEL):
+    return (await aembed_many([text], model=model))[0]
+
+
+def embed(text, model=EMBEDDING_MODEL):
+    """Cached replacement for embeddings.create(...).data[0].embedding."""
+    return embed_many([text], model=model)[0]
+
+
+def cache_stats():
+    """Hit/miss counters for this worker plus current tier sizes."""
+    with _lock:
+        stats = dict(_stats)
+        stats["memory_entries"] = len(_memory)
+    lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+    stats["hit_rate"] = round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 4) if lookups else 0.0
+    return stats
@@ -0,0 +1,279 @@
+import os
+import re
+import sys
+import json
+import math
+import time
+import base64
+import random
+import hashlib
+import threading
+import numpy as np
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Local stand-ins for OpenAI (chat, embeddings) and a Pinecone index, for benchmarks:
+#   python fake_upstreams.py [port]
+# then point the app at it with OPENAI_BASE_URL=http://127.0.0.1:<port>/v1 and
+# VECTOR_BACKEND=pinecone PINECONE_HOST=http://127.0.0.1:<port>.
+# Latencies are log-normal around the given medians (milliseconds).
+FAKE_CHAT_TTFT_MS = float(os.getenv("FAKE_CHAT_TTFT_MS", "600"))  # time to first token
+FAKE_CHAT_TOKENS_PER_SEC = float(os.getenv("FAKE_CHAT_TOKENS_PER_SEC", "60"))
+FAKE_CHAT_TOKENS = int(os.getenv("FAKE_CHAT_TOKENS", "200"))  # completion length, when max_tokens allows
+FAKE_EMBED_MS = float(os.getenv("FAKE_EMBED_MS", "120"))
+FAKE_PINECONE_MS = float(os.getenv("FAKE_PINECONE_MS", "50"))
+FAKE_LATENCY_SIGMA = float(os.getenv("FAKE_LATENCY_SIGMA", "0.35"))
+# Share of requests answered with HTTP 500 (every upstream) and 429 (OpenAI only)
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+FAKE_RATE_LIMIT_RATE = float(os.getenv("FAKE_RATE_LIMIT_RATE", "0"))
+FAKE_EMBEDDING_DIMENSIONS = 1536
+FAKE_KB_PATH = os.getenv("FAKE_KB_PATH", "knowledge_base.json")
+
+_WORDS = ["**လုံခြုံရေး**", "စကားဝှက်", "အကောင့်", "link", "OTP", "သတိထားပါ", "✅", "ဖုန်း", "ဘဏ်", "အချက်အလက်", "ကာကွယ်", "2FA"]
+_TOKENS_PER_CHUNK = 4
+
+
+def _sample_ms(median):
+    return median * math.exp(random.gauss(0, FAKE_LATENCY_SIGMA)) if median > 0 else 0.0
+
+
+def _sleep_ms(ms):
+    if ms > 0:
+        time.sleep(ms / 1000)
+
+
+def _load_corpus(path=FAKE_KB_PATH):
+    """KB lines as index records, so retrieved context looks like the real thing."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            kb = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Warning: no knowledge base for the fake index ({str(e)}), using filler text")
+        kb = {"filler": [" ".join(_WORDS)] * 20}
+    return [
+        {"id": f"{topic}-{i}", "metadata": {"text": line, "topic": topic}}
+        for topic, lines in kb.items() for i, line in enumerate(lines)
+    ]
+
+
+_corpus = _load_corpus()
+
+
+# --------------------
+# Canned completions
+# --------------------
+def _prompt_text(body):
+    return "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+
+
+def _quiz_json(count):
+    questions = [
+        {
+            "question": f"မေးခွန်း {i + 1}: ဘယ်အရာက **phishing** လက္ခဏာ ဖြစ်သလဲ?",
+            "options": [f"ရွေးချယ်စရာ {i + 1}{letter}" for letter in "abcd"],
+            "answer_index": random.randrange(4),
+        }
+        for i in range(count)
+    ]
+    return json.dumps({"questions": questions}, ensure_ascii=False)
+
+
+def _completion_text(body):
+    """Text shaped like what the calling feature parses, about FAKE_CHAT_TOKENS long."""
+    prompt = _prompt_text(body)
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        count = re.search(r"Create (\d+) multiple-choice", prompt)
+        return _quiz_json(int(count.group(1)) if count else 10)
+    if "follow-up diagnostic questions" in prompt:
+        return "\n".join(f"{i}. သင့်အကောင့်ကို နောက်ဆုံး ဘယ်တုန်းက စစ်ဆေးခဲ့သလဲ? ({i})" for i in range(1, 6))
+    if re.search(r"Create \d+ different short", prompt):
+        return "\n".join(f"🔐 Tip {i}: စကားဝှက်ကို မျှမဝေပါနဲ့။" for i in range(1, 9))
+    length = min(FAKE_CHAT_TOKENS, int(body.get("max_tokens") or body.get("max_completion_tokens") or FAKE_CHAT_TOKENS))
+    return " ".join(random.choice(_WORDS) for _ in range(max(1, length)))
+
+
+def _usage(prompt, completion_tokens):
+    prompt_tokens = max(1, len(prompt) // 3)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+
+
+def _embedding(text, dimensions):
+    seed = int.from_bytes(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest(), "little")
+    vector = np.random.default_rng(seed).standard_normal(dimensions).astype(np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+# --------------------
+# HTTP handler
+# --------------------
+class FakeUpstreamHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real APIs
+
+    def log_message(self, *args):
+        pass
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def _send_json(self, status, payload, headers=None):
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _injected_error(self, rate_limit):
+        roll = random.random()
+        if roll < FAKE_ERROR_RATE:
+            self._send_json(500, {"error": {"message": "fake upstream error", "type": "server_error"}})
+            return True
+        if rate_limit and roll < FAKE_ERROR_RATE + FAKE_RATE_LIMIT_RATE:
+            self._send_json(429, {"error": {"message": "fake rate limit", "type": "rate_limit_error"}}, {"Retry-After": "1"})
+            return True
+        return False
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"ok": True})
+        else:
+            self._send_json(404, {"error": {"message": f"no fake for GET {self.path}"}})
+
+    def do_POST(self):
+        try:
+            body = self._read_json()
+        except ValueError:
+            self._send_json(400, {"error": {"message": "invalid JSON"}})
+            return
+        routes = {
+            "/v1/chat/completions": self._chat,
+            "/v1/embeddings": self._embeddings,
+            "/query": self._pinecone_query,
+        }
+        handler = routes.get(self.path.split("?")[0])
+        if handler is None:
+            self._send_json(404, {"error": {"message": f"no fake for POST {self.path}"}})
+            return
+        handler(body)
+
+    def _chat(self, body):
+        if self._injected_error(rate_limit=True):
+            return
+        text = _completion_text(body)
+        words = text.split(" ")
+        completion_tokens = len(words)
+        created = int(time.time())
+        completion_id = f"chatcmpl-fake{random.getrandbits(48):x}"
+        _sleep_ms(_sample_ms(FAKE_CHAT_TTFT_MS))
+
+        if not body.get("stream"):
+            _sleep_ms(1000 * completion_tokens / FAKE_CHAT_TOKENS_PER_SEC)
+            self._send_json(200, {
+                "id": completion_id, "object": "chat.completion", "created": created, "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": _usage(_prompt_text(body), completion_tokens),
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(payload):
+            data = f"data: {payload}\n\n".encode("utf-8")
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        def chunk(delta, finish_reason=None, usage=None):
+            return json.dumps({
+                "id": completion_id, "object": "chat.completion.chunk", "created": created, "model": body.get("model"),
+                "choices": [] if usage else [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                "usage": usage,
+            }, ensure_ascii=False)
+
+        try:
+            event(chunk({"role": "assistant", "content": ""}))
+            for i in range(0, len(words), _TOKENS_PER_CHUNK):
+                piece = " ".join(words[i:i + _TOKENS_PER_CHUNK]) + (" " if i + _TOKENS_PER_CHUNK < len(words) else "")
+                event(chunk({"content": piece}))
+                _sleep_ms(1000 * _TOKENS_PER_CHUNK / FAKE_CHAT_TOKENS_PER_SEC)
+            event(chunk({}, finish_reason="stop"))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                event(chunk(None, usage=_usage(_prompt_text(body), completion_tokens)))
+            event("[DONE]")
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # the client stopped reading (e.g. quiz parsing finished early)
+
+    def _embeddings(self, body):
+        if self._injected_error(rate_limit=True):
+            return
+        inputs = body.get("input")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        dimensions = int(body.get("dimensions") or FAKE_EMBEDDING_DIMENSIONS)
+        _sleep_ms(_sample_ms(FAKE_EMBED_MS))
+        data = []
+        for i, text in enumerate(inputs):
+            vector = _embedding(str(text), dimensions)
+            if body.get("encoding_format") == "base64":
+                embedding = base64.b64encode(vector.tobytes()).decode("ascii")
+            else:
+                embedding = vector.tolist()
+            data.append({"object": "embedding", "index": i, "embedding": embedding})
+        tokens = sum(len(str(text)) // 3 for text in inputs)
+        self._send_json(200, {
+            "object": "list", "data": data, "model": body.get("model"),
+            "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+        })
+
+    def _pinecone_query(self, body):
+        if self._injected_error(rate_limit=False):
+            return
+        _sleep_ms(_sample_ms(FAKE_PINECONE_MS))
+        top_k = int(body.get("topK") or 3)
+        picks = random.sample(_corpus, min(top_k, len(_corpus)))
+        scores = sorted((random.uniform(0.3, 0.9) for _ in picks), reverse=True)
+        matches = [
+            {"id": record["id"], "score": score, "values": [],
+             "metadata": record["metadata"] if body.get("includeMetadata") else None}
+            for record, score in zip(picks, scores)
+        ]
+        self._send_json(200, {"matches": matches, "namespace": body.get("namespace", ""), "usage": {"readUnits": 1}})
+
+
+class FakeUpstreamServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 1024  # the app's whole connection pool may connect at once
+
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], ConnectionError):  # clients closing idle keep-alive connections
+            super().handle_error(request, client_address)
+
+
+def serve(port=0, host="127.0.0.1"):
+    """Start the fake upstreams in a background thread; returns the server (server_address has the port)."""
+    server = FakeUpstreamServer((host, port), FakeUpstreamHandler)
+    threading.Thread(target=server.serve_forever, name="fake-upstreams", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    server = serve(int(sys.argv[1]) if len(sys.argv) > 1 else 0)
+    print(f"🧪 Fake OpenAI + Pinecone listening on http://127.0.0.1:{server.server_address[1]}", flush=True)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,160 @@
+import os
+import sys
+import json
+import time
+import sqlite3
+import hashlib
+import itertools
+import threading
+from dotenv import load_dotenv
+from prefetch_store import canonical_answer, LIKELY_ANSWERS
+
+load_dotenv()
+
+# Stage-2 follow-up questions per (topic, stage-1 answer pattern), shared by all workers through one SQLite file.
+# Stage-1 answers are multiple choice, so each topic only has a few hundred patterns.
+FOLLOWUP_CACHE_ENABLED = os.getenv("FOLLOWUP_CACHE_ENABLED", "1") != "0"
+FOLLOWUP_CACHE_PATH = os.getenv("FOLLOWUP_CACHE_PATH", "followup_cache.sqlite3")
+# Regenerate a pattern's questions once they are older than this (seconds)
+FOLLOWUP_CACHE_TTL = float(os.getenv("FOLLOWUP_CACHE_TTL", str(30 * 86400)))
+# Patterns pre-generated per run of `python followup_cache.py`, most requested first
+FOLLOWUP_WARM_LIMIT = int(os.getenv("FOLLOWUP_WARM_LIMIT", "50"))
+FOLLOWUP_COUNT = 5
+
+# One letter per canonical answer in a pattern; "-" is unanswered or free text (dropped)
+_CODES = dict(zip(LIKELY_ANSWERS, "ynu"))
+_ANSWERS = {code: answer for answer, code in _CODES.items()}
+
+_db = None
+_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "stored": 0}
+
+
+def _get_db():
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(FOLLOWUP_CACHE_PATH, timeout=5, check_same_thread=False, isolation_level=None)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute("PRAGMA synchronous=NORMAL")
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS followups ("
+            "key TEXT PRIMARY KEY, topic TEXT NOT NULL, pattern TEXT NOT NULL, questions TEXT, "
+            "requests INTEGER NOT NULL DEFAULT 0, created_at REAL)"
+        )
+        _db.execute("CREATE INDEX IF NOT EXISTS followups_requests ON followups(requests)")
+    return _db
+
+
+def answer_pattern(core_questions, user_answers):
+    """Canonical answer vector over the topic's stage-1 questions, e.g. "yn-uy"."""
+    return "".join(_CODES.get(canonical_answer(user_answers.get(q, "")), "-") for q in core_questions)
+
+
+def pattern_answers(core_questions, pattern):
+    """The answers a pattern stands for, as the {question: answer} the follow-up prompt takes."""
+    return {q: _ANSWERS[code] for q, code in zip(core_questions, pattern) if code in _ANSWERS}
+
+
+def cache_key(topic, core_questions, pattern):
+    # Editing a topic's stage-1 questions starts a fresh set of keys
+    version = hashlib.sha1("\n".join(core_questions).encode("utf-8")).hexdigest()[:8]
+    return f"{topic}|{version}|{pattern}"
+
+
+def lookup(key, topic, pattern):
+    """Cached follow-ups for a pattern, or None. Counts the request either way (for warm-up)."""
+    try:
+        with _lock:
+            db = _get_db()
+            db.execute(
+                "INSERT INTO followups (key, topic, pattern, requests) VALUES (?, ?, ?, 1) "
+                "ON CONFLICT(key) DO UPDATE SET requests = requests + 1",
+                (key, topic, pattern),
+            )
+            row = db.execute(
+                "SELECT questions FROM followups WHERE key = ? AND created_at > ?",
+                (key, time.time() - FOLLOWUP_CACHE_TTL),
+            ).fetchone()
+            _stats["hits" if row and row[0] else "misses"] += 1
+    except sqlite3.Error as e:
+        print(f"Warning: follow-up cache read failed: {str(e)}")
+        return None
+    return json.loads(row[0]) if row and row[0] else None
+
+
+def store(key, topic, pattern, questions):
+    """Keep a complete set only; a short or failed generation is served once and forgotten."""
+    if len(questions) != FOLLOWUP_COUNT:
+        return False
+    try:
+        with _lock:
+            _get_db().execute(
+                "INSERT INTO followups (key, topic, pattern, questions, created_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET questions = excluded.questions, created_at = excluded.created_at",
+                (key, topic, pattern, json.dumps(questions, ensure_ascii=False), time.time()),
+            )
+            _stats["stored"] += 1
+    except sqlite3.Error as e:
+        print(f"Warning: follow-up cache write failed: {str(e)}")
+        return False
+    return True
+
+
+def _due(limit):
+    """Most requested (topic, pattern) pairs with no fresh questions."""
+    with _lock:
+        return _get_db().execute(
+            "SELECT topic, pattern FROM followups WHERE questions IS NULL OR created_at <= ? "
+            "ORDER BY requests DESC LIMIT ?",
+            (time.time() - FOLLOWUP_CACHE_TTL, limit),
+        ).fetchall()
+
+
+def warm(limit=FOLLOWUP_WARM_LIMIT, all_patterns=False):
+    """
+    Pre-generate follow-ups for the most requested patterns that have none (or stale ones).
+    all_patterns=True also covers every fully answered pattern of every topic.
+    """
+    import rag  # rag uses this module for lookups; only the warm-up needs rag's generator
+
+    targets = list(dict.fromkeys(tuple(row) for row in _due(limit)))
+    if all_patterns:
+        for topic, core_questions in rag.PREDEFINED_QUESTIONS.items():
+            for codes in itertools.product("ynu", repeat=len(core_questions)):
+                targets.append((topic, "".join(codes)))
+    added = 0
+    for topic, pattern in dict.fromkeys(targets):
+        core_questions = rag.PREDEFINED_QUESTIONS.get(topic)
+        if not core_questions or len(pattern) != len(core_questions):
+            continue  # the topic's stage-1 questions changed since this pattern was counted
+        key = cache_key(topic, core_questions, pattern)
+        if all_patterns and _fresh(key):
+            continue
+        questions = rag.followups_for_answers(pattern_answers(core_questions, pattern))
+        if store(key, topic, pattern, questions):
+            added += 1
+            print(f"✅ {topic} / {pattern}")
+        else:
+            print(f"⚠️ {topic} / {pattern}: got {len(questions)} questions, not cached")
+    return added
+
+
+def _fresh(key):
+    with _lock:
+        return _get_db().execute(
+            "SELECT 1 FROM followups WHERE key = ? AND questions IS NOT NULL AND created_at > ?",
+            (key, time.time() - FOLLOWUP_CACHE_TTL),
+        ).fetchone() is not None
+
+
+def cache_stats():
+    with _lock:
+        stats = dict(_stats)
+        stats["patterns"] = _get_db().execute("SELECT COUNT(*) FROM followups WHERE questions IS NOT NULL").fetchone()[0]
+    return stats
+
+
+if __name__ == "__main__":
+    # python followup_cache.py [--all]
+    count = warm(all_patterns="--all" in sys.argv[1:])
+    print(f"🎉 Follow-up cache: +{count} patterns ({cache_stats()})")
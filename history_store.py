@@ -0,0 +1,304 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from tokens import count_tokens, CHAT_ENCODING
+
+load_dotenv()
+
+# "memory" (per worker), "sqlite" (shared by all workers on the host) or "redis"
+HISTORY_BACKEND = os.getenv("HISTORY_BACKEND", "memory").lower()
+HISTORY_SQLITE_PATH = os.getenv("HISTORY_SQLITE_PATH", "chat_history.sqlite3")
+HISTORY_REDIS_URL = os.getenv("HISTORY_REDIS_URL", "redis://localhost:6379/0")
+HISTORY_MAX_SESSIONS = int(os.getenv("HISTORY_MAX_SESSIONS", "5000"))
+HISTORY_TTL = float(os.getenv("HISTORY_TTL", "86400"))  # idle seconds before a session is dropped
+# Budget for verbatim turns replayed into each prompt; older turns are rolled into a summary
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "1500"))
+
+
+def estimate_tokens(text):
+    """Token count with the chat model's tokenizer (estimated when it is unavailable)."""
+    return max(1, count_tokens(text, CHAT_ENCODING))
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def _empty_state():
+    # "pending": turns rolled out of "turns", waiting to be folded into the summary
+    return {"summary": "", "pending": [], "turns": []}
+
+
+class MemoryHistoryBackend:
+    """Per-worker store: LRU over sessions with idle expiry."""
+
+    def __init__(self, max_sessions=HISTORY_MAX_SESSIONS, ttl=HISTORY_TTL, empty=_empty_state):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.empty = empty
+        self._sessions = OrderedDict()  # session_id -> (updated_at, state)
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            item = self._sessions.get(session_id)
+            if not item or time.time() - item[0] > self.ttl:
+                self._sessions.pop(session_id, None)
+                return self.empty()
+            self._sessions.move_to_end(session_id)
+            return json.loads(json.dumps(item[1]))
+
+    def save(self, session_id, state):
+        with self._lock:
+            self._put(session_id, state)
+
+    def _put(self, session_id, state):
+        self._sessions[session_id] = (time.time(), state)
+        self._sessions.move_to_end(session_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    def update(self, session_id, change):
+        """Atomically replace the session's state with change(state); returns the new state."""
+        with self._lock:
+            item = self._sessions.get(session_id)
+            fresh = not item or time.time() - item[0] > self.ttl
+            state = self.empty() if fresh else json.loads(json.dumps(item[1]))
+            state = change(state)
+            self._put(session_id, state)
+            return json.loads(json.dumps(state))
+
+    def delete(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+
+class SQLiteHistoryBackend:
+    """Store shared by every gunicorn worker on the host; survives restarts."""
+
+    def __init__(self, path=HISTORY_SQLITE_PATH, ttl=HISTORY_TTL, empty=_empty_state, table="sessions"):
+        self.ttl = ttl
+        self.empty = empty
+        self.table = table  # a trusted identifier, never user input
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "id TEXT PRIMARY KEY, state TEXT NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_updated_at ON {table}(updated_at)")
+        self._writes = 0
+
+    def load(self, session_id):
+        with self._lock:
+            row = self._db.execute(
+                f"SELECT state FROM {self.table} WHERE id = ? AND updated_at > ?",
+                (session_id, time.time() - self.ttl),
+            ).fetchone()
+        return json.loads(row[0]) if row else self.empty()
+
+    def save(self, session_id, state):
+        with self._lock:
+            self._put(session_id, state)
+            self._db.commit()
+
+    def _put(self, session_id, state):
+        now = time.time()
+        self._db.execute(
+            f"INSERT OR REPLACE INTO {self.table} (id, state, updated_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(state, ensure_ascii=False), now),
+        )
+        self._writes += 1
+        if self._writes % 500 == 0:
+            self._db.execute(f"DELETE FROM {self.table} WHERE updated_at <= ?", (now - self.ttl,))
+
+    def update(self, session_id, change):
+        """
+        Atomically replace the session's state with change(state); returns the new state.
+        BEGIN IMMEDIATE takes the write lock up front, so other workers' updates wait.
+        """
+        with self._lock:
+            self._db.commit()  # end any implicit transaction before starting our own
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._db.execute(
+                    f"SELECT state FROM {self.table} WHERE id = ? AND updated_at > ?",
+                    (session_id, time.time() - self.ttl),
+                ).fetchone()
+                state = change(json.loads(row[0]) if row else self.empty())
+                self._put(session_id, state)
+            except Exception:
+                self._db.rollback()
+                raise
+            self._db.commit()
+            return state
+
+    def delete(self, session_id):
+        with self._lock:
+            self._db.execute(f"DELETE FROM {self.table} WHERE id = ?", (session_id,))
+            self._db.commit()
+
+
+class RedisHistoryBackend:
+    """Any Redis-protocol server (Redis, Valkey, KeyDB...) with per-key expiry."""
+
+    def __init__(self, url=HISTORY_REDIS_URL, ttl=HISTORY_TTL, empty=_empty_state, prefix="lannpya:history"):
+        import redis  # optional dependency, only needed for HISTORY_BACKEND=redis
+
+        self.ttl = int(ttl)
+        self.empty = empty
+        self.prefix = prefix
+        self._redis = redis.Redis.from_url(url)
+        self._watch_error = redis.WatchError
+
+    def _key(self, session_id):
+        return f"{self.prefix}:{session_id}"
+
+    def load(self, session_id):
+        raw = self._redis.get(self._key(session_id))
+        return json.loads(raw) if raw else self.empty()
+
+    def save(self, session_id, state):
+        self._redis.set(self._key(session_id), json.dumps(state, ensure_ascii=False), ex=self.ttl)
+
+    def update(self, session_id, change):
+        """Atomically replace the session's state with change(state) (WATCH/MULTI, retried on conflict)."""
+        key = self._key(session_id)
+        with self._redis.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    raw = pipe.get(key)
+                    state = change(json.loads(raw) if raw else self.empty())
+                    pipe.multi()
+                    pipe.set(key, json.dumps(state, ensure_ascii=False), ex=self.ttl)
+                    pipe.execute()
+                    return state
+                except self._watch_error:
+                    continue  # another turn landed in between; apply ours to the new state
+
+    def delete(self, session_id):
+        self._redis.delete(self._key(session_id))
+
+
+_BACKENDS = {
+    "memory": MemoryHistoryBackend,
+    "sqlite": SQLiteHistoryBackend,
+    "redis": RedisHistoryBackend,
+}
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            if HISTORY_BACKEND not in _BACKENDS:
+                raise ValueError(f"Unknown HISTORY_BACKEND '{HISTORY_BACKEND}' (expected one of {sorted(_BACKENDS)})")
+            _backend = _BACKENDS[HISTORY_BACKEND]()
+        return _backend
+
+
+def load(session_id):
+    """Return {"summary": str, "pending": [...], "turns": [{"role", "content"}, ...]} for a session."""
+    return get_backend().load(session_id)
+
+
+def prompt_messages(state):
+    """
+    Messages to replay into the prompt: a summary of older turns, then recent turns verbatim
+    (including rolled-out turns the summary doesn't cover yet).
+    """
+    messages = []
+    if state.get("summary"):
+        messages.append({
+            "role": "system",
+            "content": f"Summary of the earlier conversation with this user:\n{state['summary']}",
+        })
+    messages.extend(state.get("pending", []))
+    messages.extend(state.get("turns", []))
+    return messages
+
+
+def _roll_up(state):
+    """
+    Keep the verbatim turns within HISTORY_TOKEN_BUDGET.
+    When over budget, the oldest turns (down to half the budget, so this runs rarely)
+    move to "pending", to be folded into the summary in the background.
+    """
+    turns = state["turns"]
+    total = sum(estimate_tokens(t["content"]) for t in turns)
+    if total <= HISTORY_TOKEN_BUDGET:
+        return state
+
+    pending = state.setdefault("pending", [])
+    while turns and (total > HISTORY_TOKEN_BUDGET // 2 or turns[0]["role"] != "user"):
+        turn = turns.pop(0)
+        total -= estimate_tokens(turn["content"])
+        pending.append(turn)
+    return state
+
+
+# Summaries are written after the response; one in flight per session in this process
+_summarizer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="history-summary")
+_summarizing = set()
+_summarizing_lock = threading.Lock()
+
+
+def _summarize_pending(session_id, summarize):
+    try:
+        state = get_backend().load(session_id)
+        # Loop: turns rolled out while the model was summarizing are folded in next
+        while state.get("pending"):
+            previous, old_turns = state.get("summary", ""), state["pending"]
+            summary = summarize(previous, old_turns)
+            failed = not summary or summary.startswith("Error")
+
+            def fold(current):
+                # Only if nobody folded these turns meanwhile (another worker, a cleared session)
+                if current.get("summary", "") == previous and current.get("pending", [])[:len(old_turns)] == old_turns:
+                    if not failed:
+                        current["summary"] = summary
+                    # A failed summary drops the turns, as the budget requires either way
+                    current["pending"] = current["pending"][len(old_turns):]
+                return current
+
+            state = get_backend().update(session_id, fold)
+            if failed:
+                break
+    except Exception as e:
+        print(f"Warning: history summary failed: {str(e)}")
+    finally:
+        with _summarizing_lock:
+            _summarizing.discard(session_id)
+
+
+def append(session_id, turns, summarize=None):
+    """
+    Add finished turns to a session (atomically, so concurrent turns are all kept)
+    and enforce the token budget. summarize(previous_summary, old_turns) -> new
+    summary text; it runs in the background, off the request.
+    """
+    def add(state):
+        state["turns"].extend(turns)
+        return _roll_up(state)
+
+    state = get_backend().update(session_id, add)
+    if summarize and state.get("pending"):
+        with _summarizing_lock:
+            if session_id in _summarizing:
+                return
+            _summarizing.add(session_id)
+        _summarizer.submit(_summarize_pending, session_id, summarize)
+
+
+def clear(session_id):
+    get_backend().delete(session_id)
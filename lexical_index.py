@@ -0,0 +1,207 @@
+import os
+import re
+import math
+import json
+import time
+import threading
+from collections import Counter, defaultdict
+import numpy as np
+from dotenv import load_dotenv
+from chunker import normalize_numbers
+from vector_store import LOCAL_VECTOR_STORE_PATH
+
+load_dotenv()
+
+# BM25 over the chunk texts in the local vector snapshot (upload.py always writes it;
+# bin/post_compile exports it from Pinecone at build time, since it is not in git)
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+SECTION_REF_WEIGHT = 3.0
+# Reciprocal rank fusion constant
+RRF_K = int(os.getenv("RRF_K", "60"))
+# Short reference-style queries ("ပုဒ်မ ၃၆", a law name) are answered from BM25 alone
+LEXICAL_SKIP_EMBEDDING = os.getenv("LEXICAL_SKIP_EMBEDDING", "1") != "0"
+LEXICAL_MAX_QUERY_TERMS = int(os.getenv("LEXICAL_MAX_QUERY_TERMS", "6"))
+LEXICAL_MARKERS = ("ပုဒ်မ", "အခန်း", "ဥပဒေ", "section", "chapter", "law", "act")
+# ...and only when the best BM25 hit beats the runner-up by this factor
+LEXICAL_SCORE_MARGIN = float(os.getenv("LEXICAL_SCORE_MARGIN", "1.5"))
+_RELOAD_CHECK_SECONDS = 5
+
+# Burmese syllable breaking (sylbreak rules): a break goes before every consonant
+# that is not stacked (္) and not killed by asat (်, possibly after dot below ့),
+# and around independent vowels, digits, punctuation and Latin runs.
+_SYLLABLE_BREAK = re.compile(
+    r"((?<!္)[က-အ](?!့?[်္])|[ဣဤဥဦဧဩဪဿ၌၍၏၀-၉၊။]|[a-zA-Z0-9]+|[!-/:-@\[-`{-~])"
+)
+# "ပုဒ်မ ၃၆" / "section 36" → the special term §36, also given to the chunks of that section
+_SECTION_REF = re.compile(r"(?:ပုဒ်မ|\bsection|\bsec\.?|\bs\.)\s*(\d+)", re.IGNORECASE)
+
+
+def syllables(text):
+    """Split Burmese text into syllables; Latin words and digit runs stay whole."""
+    broken = _SYLLABLE_BREAK.sub(r" \1", normalize_numbers(text or ""))
+    return [s for s in broken.split() if s.strip()]
+
+
+def tokenize(text):
+    """
+    BM25 terms: Burmese syllables plus adjacent syllable bigrams (most words are
+    2–3 syllables), lower-cased Latin words and digit runs. Punctuation is dropped.
+    """
+    terms = []
+    previous = None
+    for syllable in syllables(text):
+        syllable = re.sub(r"[^\wက-႟]", "", syllable).lower()
+        if not syllable or syllable in "၊။":
+            previous = None
+            continue
+        terms.append(syllable)
+        burmese = "က" <= syllable[0] <= "႟" and not syllable.isdigit()
+        if burmese and previous:
+            terms.append(previous + syllable)
+        previous = syllable if burmese else None
+    terms.extend(f"§{n}" for n in _SECTION_REF.findall(normalize_numbers(text or "")))
+    return terms
+
+
+def section_terms(metadata):
+    """§N terms for every section a chunk covers ("5-8" → §5 … §8)."""
+    section = str(metadata.get("section") or "")
+    bounds = [int(n) for n in re.findall(r"\d+", section)]
+    if not bounds:
+        return []
+    return [f"§{n}" for n in range(bounds[0], bounds[-1] + 1)]
+
+
+class BM25Index:
+    def __init__(self, records=()):
+        self.ids, self.texts, self.metadata = [], [], []
+        self.postings = defaultdict(list)  # term -> [(doc, tf)]
+        self.doc_lengths = []
+        for record in records:
+            self._add(record["id"], record["metadata"])
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        n = len(self.ids)
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+
+    def _add(self, doc_id, metadata):
+        doc = len(self.ids)
+        text = metadata.get("text", "")
+        self.ids.append(doc_id)
+        self.texts.append(text)
+        self.metadata.append(metadata)
+        counts = Counter(tokenize(text))
+        for term in section_terms(metadata):
+            counts[term] += 3
+        self.doc_lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            self.postings[term].append((doc, tf))
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, top_k=5):
+        """[{"id", "score", "text", "metadata"}] ranked by BM25, best first."""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self.idf.get(term)
+            if idf is None:
+                continue
+            # An explicit section reference outweighs the words around it
+            weight = SECTION_REF_WEIGHT if term.startswith("§") else 1.0
+            for doc, tf in self.postings[term]:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_lengths[doc] / self.avg_length)
+                scores[doc] += weight * idf * tf * (BM25_K1 + 1) / (tf + norm)
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+        return [
+            {"id": self.ids[doc], "score": score, "text": self.texts[doc], "metadata": self.metadata[doc]}
+            for doc, score in ranked
+        ]
+
+
+_lock = threading.Lock()
+_state = {"index": BM25Index(), "mtime": None, "checked_at": 0.0, "warned": False}
+
+
+def _warn_empty(reason):
+    # Hybrid retrieval quietly degrades to vectors only, so say so (once)
+    if not _state["warned"]:
+        _state["warned"] = True
+        print(f"Warning: lexical index is empty ({reason}); run python vector_store.py or upload.py to build it")
+
+
+def _load(path):
+    with np.load(path, allow_pickle=False) as snapshot:
+        records = json.loads(str(snapshot["records"]))
+    return BM25Index(records)
+
+
+def get_index(path=LOCAL_VECTOR_STORE_PATH):
+    """The BM25 index, rebuilt when upload.py rewrites the snapshot (checked every few seconds)."""
+    now = time.monotonic()
+    with _lock:
+        if now - _state["checked_at"] < _RELOAD_CHECK_SECONDS:
+            return _state["index"]
+        _state["checked_at"] = now
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            _warn_empty(f"no snapshot at {path}")
+            return _state["index"]
+        if mtime != _state["mtime"]:
+            try:
+                _state["index"] = _load(path)
+                print(f"Built BM25 index over {len(_state['index'])} chunks")
+                _state["warned"] = False
+            except Exception as e:
+                print(f"Warning: could not build lexical index: {str(e)}")
+            _state["mtime"] = mtime
+            if not len(_state["index"]):
+                _warn_empty(f"no chunks in {path}")
+        return _state["index"]
+
+
+def search(query, top_k=5):
+    return get_index().search(query, top_k)
+
+
+def _has_marker(query):
+    """A LEXICAL_MARKERS entry as whole syllables / words ("law" but not "lawyer", "act" but not "fact")."""
+    query_syllables = [s.lower() for s in syllables(query)]
+    for marker in LEXICAL_MARKERS:
+        marker_syllables = syllables(marker)
+        width = len(marker_syllables)
+        if any(query_syllables[i:i + width] == marker_syllables for i in range(len(query_syllables) - width + 1)):
+            return True
+    return False
+
+
+def is_lexical_query(query, lexical_results):
+    """
+    A short query that names a section (§N), chapter or law, and whose best
+    lexical hit clearly beats the rest, is better served by BM25 than by an embedding.
+    """
+    if not LEXICAL_SKIP_EMBEDDING or not lexical_results:
+        return False
+    if len(query.split()) > LEXICAL_MAX_QUERY_TERMS:
+        return False
+    has_section_ref = any(term.startswith("§") for term in tokenize(query))
+    if not (has_section_ref or _has_marker(query)):
+        return False
+    if len(lexical_results) > 1 and lexical_results[0]["score"] < LEXICAL_SCORE_MARGIN * lexical_results[1]["score"]:
+        return False
+    return True
+
+
+def rrf_fuse(result_lists, top_k=3, k=RRF_K):
+    """Reciprocal rank fusion of ranked chunk lists; a chunk keeps the first dict seen for it."""
+    fused, chunks = defaultdict(float), {}
+    for results in result_lists:
+        for rank, chunk in enumerate(results, start=1):
+            fused[chunk["id"]] += 1.0 / (k + rank)
+            chunks.setdefault(chunk["id"], chunk)
+    ranked = sorted(fused.items(), key=lambda item: -item[1])[:top_k]
+    return [{**chunks[chunk_id], "score": score} for chunk_id, score in ranked]
@@ -1,6 +1,20 @@
-from flask import Flask, request, jsonify, render_template
+import json
+from flask import Flask, request, jsonify, render_template, Response, stream_with_context
 from flask_cors import CORS
-from rag import ask_bot_content_checker, get_scenario_questions, analyze_scenario_responses, ai_only, _query_with_context, generate_quiz_from_topic, generate_random_tip
+from rag import get_scenario_questions, analyze_scenario_responses, ai_only, retrieve_context
+from rag import ai_with_messages, stream_with_messages, stream_scenario_analysis, summarize_conversation, chat_messages
+from rag import OTHERS_FIRST_QUESTION, others_next_question, prefetch_others_question, others_final_prompt
+from rag import record_scenario_answers
+from rag import batch_posts, content_check_batch, content_check_result, stream_content_check, CONTENT_CHECK_BATCH_MAX
+from embedding_cache import cache_stats
+from clients import circuit_stats, usage_stats
+import answer_cache
+import history_store
+import quiz_bank
+import tip_store
+import reputation
+import prefetch_store
+import followup_cache
 
 app = Flask(__name__)
 CORS(app)  # allow frontend to call API
@@ -25,88 +39,79 @@ def scenario_simulation_page():
 def interactive_quiz_page():
     return render_template("interactiveQuiz.html")
 
-# Keep in-memory conversation history per session (for example purposes; for production, use Redis or DB)
-conversation_history = []
+
+def sse_response(chunks, on_complete=None):
+    """
+    Stream text chunks as server-sent events: data: {"delta": "..."} per chunk,
+    then data: {"done": true}. on_complete receives the full text once streaming ends.
+    """
+    def events():
+        parts = []
+        for chunk in chunks:
+            parts.append(chunk)
+            yield f"data: {json.dumps({'delta': chunk}, ensure_ascii=False)}\n\n"
+        if on_complete:
+            on_complete("".join(parts).strip())
+        yield f"data: {json.dumps({'done': True})}\n\n"
+
+    return Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+def build_chat_messages(session_id, user_message):
+    """Build the system prompt + this session's summarized history + the new user turn."""
+    # 1️⃣ Load this session's history (summary of older turns + recent turns)
+    history = history_store.load(session_id)
+    
+    # 2️⃣ Get RAG context: ranked chunks only, no extra completion
+    chunks = retrieve_context(user_message, top_k=3)
+    
+    # 3️⃣ Build GPT prompt with conversation + RAG context
+    return chat_messages(history_store.prompt_messages(history), chunks, user_message)
+
+def remember_turn(session_id, user_message, bot_reply):
+    # 5️⃣ Add both turns to the session, rolling old turns into the summary when over budget
+    history_store.append(
+        session_id,
+        [{"role": "user", "content": user_message}, {"role": "assistant", "content": bot_reply}],
+        summarize=summarize_conversation,
+    )
 
 @app.route("/chat", methods=["POST"])
 def chat():
     data = request.json
     user_message = data.get("message", "")
+    session_id = data.get("session_id") or history_store.new_session_id()
+    messages = build_chat_messages(session_id, user_message)
     
-    # 1️⃣ Add user message to history
-    conversation_history.append({"role": "user", "content": user_message})
-    
-    # 2️⃣ Get RAG context from Pinecone
-    rag_context = _query_with_context(user_input=user_message, feature="general", top_k=3)
-    
-    # 3️⃣ Build GPT prompt with conversation + RAG context
-    messages = []
-    system_msg = {
-        "role": "system",
-        "content": (
-            "You are LannPya Bot, a friendly cybersecurity guide for non-tech-savvy users in Myanmar. "
-            "Always use consistent pronouns: Refer to yourself as ကျွန်တော် and the user as သင်\n"
-            "Use consistent pronouns in Burmese: ကျွန်တော် for I (subject). ကျွန်တော့် for me (object). ကျွန်တော့်ရဲ့ for my/mine (possessive). ကျွန်တော်ကိုယ်တိုင် for myself. သင် for you (subject). သင့် for you (object). သင့်ရဲ့  for your/yours (possessive). သင်ကိုယ်တိုင် for yourself.\n"
-            "Always respond in Burmese using short and clear sentences. Explain in simple terms.\n"
-            "Appreciate the user if he knows or can share specific data to help solve the problem.\n"
-            "Always use an encouraging and supportive tone.\n"
-            "Remind the user that they are doing well and that learning step by step is normal.\n"
-            "Use polite particles like 'ပါ', 'မယ်', 'တယ်' to keep a respectful and friendly tone.\n"
-            "Sometimes use 'ကျွန်တော်တို့' (we) to make the user feel included, e.g., 'ကျွန်တော်တို့ အတူတူ လေ့လာကြမယ်။'.\n"
-            "Handle unclear inputs gently: If the user types something confusing, suggest politely what they might mean instead of rejecting directly.\n"
-            "Use simple encouragements like 'အဆင်ပြေမယ်', 'မပူပါနဲ့', 'ကောင်းပါပြီ', 'လုပ်နိုင်မယ်' to motivate the user.\n"
-            "Occasionally use helpful emojis (✅, 🔐, 📱, 👍) to make responses friendlier, but never overuse them.\n"
-            "Separate lines for better understanding and clear format.\n"
-            "Bold the important keywords.\n"
-            "Use Burmese words as much as possible but use English words for tech terms.\n"
-            "Never use any other language except English and Burmese.\n"
-            "All of your response must be either in English or in Burmses. Do not put any other language symbols.\n"
-            "If user shares their name, start every response by calling their name.\n"
-            "Conversation rules:\n"
-            "1. If the user only says short acknowledgments like 'yes', 'ok', 'thanks', 'thank you', "
-            "or emoji responses, respond politely but do not assume they are asking a new question.\n"
-            "2. Only provide detailed guidance if the user asks a clear question about cybersecurity or privacy.\n"
-            "3. If the user asks questions outside your scope (e.g., 'What's life?', general knowledge, or unrelated topics), "
-            "politely refuse (Say ကျွန်တော် တောင်းပန်ပါရစေ) and remind them that you only provide guidance on cybersecurity and privacy.\n"
-            "4. Keep answers short and to the point when the message is clearly an acknowledgment.\n"
-            "Knowledge about laws:\n"
-            "1. You have access to Myanmar Cybersecurity Law and related regulations uploaded in your knowledgebase.\n"
-            "2. Always explain legal information accurately in Burmese using simple sentences.\n"
-            "3. Highlight important **law numbers**, **chapters**, and **key points** in bold.\n"
-            "4. If the user asks for a law reference, provide the **law number** and **chapter** clearly.\n"
-            "5. Avoid giving legal advice beyond what the law text says; always stick to factual legal content.\n\n"
-            f"Knowledge base context:\n{rag_context if rag_context else '[No relevant context]'}\n\n"
-            "Use this knowledgebase to answer the user's question. "
-            "If the answer is not found well enough in the knowledgebase, use your own knowledge—but only for cybersecurity and privacy questions. "
-            "Politely refuse all other questions."
-        )
-    }
-    messages.append(system_msg)
-    
-    # Add entire conversation history
-    for turn in conversation_history:
-        messages.append(turn)
-    
-    # 4️⃣ Call GPT
-    bot_response = ai_only(prompt="", max_tokens=800)  # empty prompt, GPT reads `messages`
-    
-    # Actually, ai_only currently expects a string, so we can make a small helper:
-    def ai_with_messages(messages, max_tokens=800):
-        import openai
-        resp = openai.chat.completions.create(
-            model="gpt-5-chat-latest",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=max_tokens
-        )
-        return resp.choices[0].message.content.strip()
-    
-    bot_reply = ai_with_messages(messages)
+    # 4️⃣ Call GPT (the only completion in this turn)
+    bot_reply = ai_with_messages(messages, feature="chat")
+    remember_turn(session_id, user_message, bot_reply)
     
-    # 5️⃣ Add bot reply to conversation
-    conversation_history.append({"role": "assistant", "content": bot_reply})
-    
-    return jsonify({"reply": bot_reply})
+    return jsonify({"reply": bot_reply, "session_id": session_id})
+
+@app.route("/chat/stream", methods=["POST"])
+def chat_stream():
+    data = request.json
+    user_message = data.get("message", "")
+    session_id = data.get("session_id") or history_store.new_session_id()
+    messages = build_chat_messages(session_id, user_message)
+
+    def remember_reply(bot_reply):
+        if not bot_reply.startswith("Error"):
+            remember_turn(session_id, user_message, bot_reply)
+
+    def chunks():
+        try:
+            yield from stream_with_messages(messages, feature="chat")
+        except Exception as e:
+            yield f"Error in GPT response: {str(e)}"
+
+    response = sse_response(chunks(), on_complete=remember_reply)
+    response.headers["X-Session-Id"] = session_id
+    return response
 
 @app.route("/content-check", methods=["GET", "POST"])
 def content_check():
@@ -115,8 +120,53 @@ def content_check():
     poster = data.get("poster", "")
     date = data.get("date", "")
     platform = data.get("platform", "")
-    result = ask_bot_content_checker(content, poster, date, platform)
-    return jsonify({"result": result})
+    # path: "prescreen" (local rules), "cache", "llm" or "error"
+    return jsonify(content_check_result(content, poster, date, platform))
+
+@app.route("/content-check/stream", methods=["POST"])
+def content_check_stream():
+    data = request.json
+    content = data.get("content", "")
+    poster = data.get("poster", "")
+    date = data.get("date", "")
+    platform = data.get("platform", "")
+    check = stream_content_check(content, poster, date, platform)
+    response = sse_response(check["stream"])
+    response.headers["X-Content-Check-Path"] = check["path"]
+    return response
+
+@app.route("/content-check/batch", methods=["POST"])
+def content_check_batch_route():
+    """
+    {"posts": [{"content", "poster", "date", "platform"}, ...], "stream": false}
+    → {"results": [...], "paths": [...]} in input order, or with "stream": true,
+    one server-sent event {"index", "result", "path"} per post as soon as it is checked.
+    """
+    data = request.json or {}
+    items = data.get("posts") or []
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "No posts provided"}), 400
+    if len(items) > CONTENT_CHECK_BATCH_MAX:
+        return jsonify({"error": f"At most {CONTENT_CHECK_BATCH_MAX} posts per batch"}), 400
+    posts = batch_posts(items)
+
+    if data.get("stream"):
+        def events():
+            for index, result, path in content_check_batch(posts):
+                event = {"index": index, "result": result, "path": path}
+                yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+            yield f"data: {json.dumps({'done': True})}\n\n"
+
+        return Response(
+            stream_with_context(events()),
+            mimetype="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    results, paths = [None] * len(posts), [None] * len(posts)
+    for index, result, path in content_check_batch(posts):
+        results[index], paths[index] = result, path
+    return jsonify({"results": results, "paths": paths})
 
 
 @app.route("/scenario/start", methods=["GET", "POST"])
@@ -125,68 +175,90 @@ def scenario_start():
     topic = data.get("topic", "others")
     # Stage 1: return first 5 core questions
     questions = get_scenario_questions(topic, stage=1)
-    return jsonify({"topic": topic, "questions": questions})
+    # Answers are sent to /scenario/answer (or with the next request) under this id
+    session_id = data.get("session_id") or history_store.new_session_id()
+    return jsonify({"topic": topic, "questions": questions, "session_id": session_id})
+
+@app.route("/scenario/answer", methods=["POST"])
+def scenario_answer():
+    data = request.json
+    session_id = data.get("session_id")
+    if not session_id:
+        return jsonify({"error": "No session_id provided"}), 400
+    # Retrieval for each answer happens now, while the user is still answering
+    state = record_scenario_answers(session_id, data.get("topic"), data.get("answers", {}))
+    return jsonify({"session_id": session_id, "answered": len(state["answers"])})
 
 @app.route("/scenario/next", methods=["GET", "POST"])
 def scenario_next():
     data = request.json
     topic = data.get("topic", "others")
     first_answers = data.get("answers", {})
+    session_id = data.get("session_id")
+    if session_id:
+        # The request carries every stage-1 answer; the session only caches their retrieval
+        record_scenario_answers(session_id, topic, first_answers, complete=True)
     # Stage 2: generate 5 follow-up questions
     questions = get_scenario_questions(topic, stage=2, user_answers=first_answers)
-    return jsonify({"topic": topic, "questions": questions})
+    return jsonify({"topic": topic, "questions": questions, "session_id": session_id})
 
 @app.route("/scenario/analyze", methods=["GET", "POST"])
 def scenario_analyze():
     data = request.json
     topic = data.get("topic", "others")
     answers = data.get("answers", {})  # expects dict {question: answer, ...}
-    result = analyze_scenario_responses(topic, answers)
+    result = analyze_scenario_responses(topic, answers, data.get("session_id"))
     return jsonify({"result": result})
 
+@app.route("/scenario/analyze/stream", methods=["POST"])
+def scenario_analyze_stream():
+    data = request.json
+    topic = data.get("topic", "others")
+    answers = data.get("answers", {})
+    return sse_response(stream_scenario_analysis(topic, answers, data.get("session_id")))
+
 @app.route("/scenario/others", methods=["GET", "POST"])
 def scenario_others():
     data = request.json
     history = data.get("history", [])  # list of {q, a}
     step = data.get("step", 0)
+    # Identifies this run through the questions, so prefetched questions find their way back
+    has_session = bool(data.get("session_id"))
+    session_id = data.get("session_id") or history_store.new_session_id()
+    if has_session and history:
+        # Retrieve context for the new answer now rather than at the final analysis
+        record_scenario_answers(session_id, "others", {h["q"]: h["a"] for h in history}, complete=True)
 
     # Step 0 → always return the fixed first question
     if step == 0:
         return jsonify({
-            "question": "အကြောင်းအရာကို အနည်းငယ်ရှင်းပြပါ",
+            "question": OTHERS_FIRST_QUESTION,
             "step": 1,
             "done": False,
-            "history": []
+            "history": [],
+            "session_id": session_id
         })
 
     # If less than 10 → generate next question using ALL history
     if step < 10:
-        combined = "\n".join([f"Q: {h['q']} → A: {h['a']}" for h in history])
-        prompt = f"""
-        The user has answered these so far:
-        {combined}
-
-        Based on everything so far, generate the NEXT most relevant cybersecurity diagnostic question in Burmese.
-        Keep it short and clear. Only output the question.
-        """
-        next_q = ai_only(prompt)
+        next_q = others_next_question(history, session_id).strip()
+        # While the user answers, generate the question after it for likely short answers
+        if step + 1 < 10:
+            prefetch_others_question(session_id, history, next_q)
         return jsonify({
-            "question": next_q.strip(),
+            "question": next_q,
             "step": step + 1,
             "done": False,
-            "history": history
+            "history": history,
+            "session_id": session_id
         })
 
-    # After 10 → final analysis
-    combined = "\n".join([f"Q: {h['q']} → A: {h['a']}" for h in history])
-    final_prompt = f"""
-    The user answered 10 cybersecurity diagnostic questions:
-    {combined}
+    # After 10 → the page streams the analysis from /scenario/analyze/stream with this session
+    if has_session:
+        return jsonify({"done": True, "history": history, "session_id": session_id})
 
-    Summarize the main RISKS and possible SOLUTIONS for the user.
-    Respond in Burmese, clearly and concisely and produce risks and solutions clearly.
-    """
-    result = ai_only(final_prompt, max_tokens=800)
+    # Sessionless clients get the final analysis here
+    result = ai_only(others_final_prompt(history), max_tokens=800, feature="scenario_others")
 
     return jsonify({
         "done": True,
@@ -201,7 +273,8 @@ def generate_quiz():
     if not topic:
         return jsonify({"error": "No topic provided"}), 400
 
-    questions = generate_quiz_from_topic(topic)
+    # Served from the pre-generated bank; live generation only when the bucket is empty
+    questions = quiz_bank.get_quiz(topic, data.get("difficulty"))
     if not questions:
         return jsonify({"error": "Failed to generate quiz"}), 500
 
@@ -209,7 +282,22 @@ def generate_quiz():
 
 @app.route("/random-tip")
 def random_tip():
-    return jsonify(generate_random_tip())
+    return jsonify(tip_store.random_tip())
+
+@app.route("/stats")
+def stats():
+    # Per-worker cache counters for monitoring
+    return jsonify({
+        "embedding_cache": cache_stats(),
+        "answer_cache": answer_cache.cache_stats(),
+        "upstream_circuits": circuit_stats(),
+        "quiz_bank": quiz_bank.bank_stats(),
+        "tip_store": tip_store.tip_stats(),
+        "token_usage": usage_stats(),
+        "reputation": reputation.reputation_stats(),
+        "prefetch": prefetch_store.prefetch_stats(),
+        "followup_cache": followup_cache.cache_stats(),
+    })
 
 if __name__ == "__main__":
     import os
@@ -0,0 +1,158 @@
+import os
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Per-page OCR results, keyed by PDF hash + page number, so re-runs never OCR a page twice
+OCR_CACHE_DIR = os.getenv("OCR_CACHE_DIR", ".ocr_cache")
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+OCR_LANG = os.getenv("OCR_LANG", "mya+eng")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+# Pages rasterized per task: peak memory is about OCR_WORKERS × OCR_RENDER_WINDOW page images
+OCR_RENDER_WINDOW = int(os.getenv("OCR_RENDER_WINDOW", "2"))
+# A text layer shorter than this, or mostly outside Burmese/ASCII (e.g. legacy font glyphs), gets OCR'd
+MIN_TEXT_LAYER_CHARS = int(os.getenv("MIN_TEXT_LAYER_CHARS", "40"))
+
+
+class OCRFailedError(Exception):
+    """Raised by extract_pages when some pages could not be OCR'd; .pages lists them."""
+
+    def __init__(self, pdf_path, pages):
+        super().__init__(f"OCR failed for {len(pages)} pages of {pdf_path}")
+        self.pages = pages
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def usable_text_layer(text):
+    text = "".join(text.split())
+    if len(text) < MIN_TEXT_LAYER_CHARS:
+        return False
+    readable = sum(1 for ch in text if ch.isascii() or "က" <= ch <= "႟")
+    return readable / len(text) >= 0.9
+
+
+def _cache_path(digest, page_number):
+    return os.path.join(OCR_CACHE_DIR, f"{digest}-{OCR_DPI}-{OCR_LANG}", f"{page_number:05d}.txt")
+
+
+def _read_cache(digest, page_number):
+    try:
+        with open(_cache_path(digest, page_number), "r", encoding="utf-8") as f:
+            return f.read()
+    except OSError:
+        return None
+
+
+def _write_cache(digest, page_number, text):
+    path = _cache_path(digest, page_number)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+def _init_ocr_worker():
+    # One tesseract thread per process; the pool provides the parallelism
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def _ocr_window(pdf_path, first_page, last_page):
+    """Rasterize only pages first_page..last_page (1-based) and OCR them. Runs in a worker process."""
+    import pytesseract
+    from pdf2image import convert_from_path
+
+    images = convert_from_path(pdf_path, dpi=OCR_DPI, first_page=first_page, last_page=last_page)
+    texts = {}
+    for page_number, image in zip(range(first_page, last_page + 1), images):
+        texts[page_number] = pytesseract.image_to_string(image, lang=OCR_LANG)
+        image.close()
+    return texts
+
+
+def _text_layers(pdf_path):
+    """Per-page embedded text via PyMuPDF (page number → text); None if PyMuPDF is unavailable or fails."""
+    try:
+        import fitz
+        with fitz.open(pdf_path) as doc:
+            return {i: page.get_text("text") for i, page in enumerate(doc, start=1)}
+    except Exception as e:
+        print(f"⚠️ PyMuPDF failed for {pdf_path}: {e}")
+        return None
+
+
+def _page_count(pdf_path):
+    from pdf2image import pdfinfo_from_path
+
+    return int(pdfinfo_from_path(pdf_path)["Pages"])
+
+
+def _windows(page_numbers):
+    """Group page numbers into runs of consecutive pages, at most OCR_RENDER_WINDOW long."""
+    run = []
+    for page_number in page_numbers:
+        if run and (page_number != run[-1] + 1 or len(run) >= OCR_RENDER_WINDOW):
+            yield run[0], run[-1]
+            run = []
+        run.append(page_number)
+    if run:
+        yield run[0], run[-1]
+
+
+def extract_pages(pdf_path, digest=None):
+    """
+    Return the text of every page, in order.
+    Pages with a usable text layer skip OCR; the rest are served from the page
+    cache or OCR'd in parallel across a process pool, a few pages at a time.
+    Raises OCRFailedError if any page has neither text nor an OCR result.
+    """
+    digest = digest or file_hash(pdf_path)
+    layers = _text_layers(pdf_path)
+    page_total = len(layers) if layers is not None else _page_count(pdf_path)
+
+    pages = {}
+    to_ocr = []
+    failed = []
+    for page_number in range(1, page_total + 1):
+        layer = (layers or {}).get(page_number, "")
+        if usable_text_layer(layer):
+            pages[page_number] = layer
+            continue
+        cached = _read_cache(digest, page_number)
+        if cached is not None:
+            pages[page_number] = cached
+        else:
+            to_ocr.append(page_number)
+
+    if to_ocr:
+        print(f"🔍 OCR {len(to_ocr)}/{page_total} pages of {os.path.basename(pdf_path)} on {OCR_WORKERS} processes...")
+        with ProcessPoolExecutor(max_workers=OCR_WORKERS, initializer=_init_ocr_worker) as pool:
+            futures = {
+                pool.submit(_ocr_window, pdf_path, first, last): (first, last)
+                for first, last in _windows(to_ocr)
+            }
+            for future in as_completed(futures):
+                first, last = futures[future]
+                try:
+                    texts = future.result()
+                except Exception as e:
+                    # Not cached, so the next run retries these pages
+                    print(f"⚠️ OCR failed for pages {first}-{last} of {pdf_path}: {e}")
+                    failed.extend(range(first, last + 1))
+                    continue
+                for page_number, text in texts.items():
+                    _write_cache(digest, page_number, text)
+                pages.update(texts)
+
+    if failed:
+        raise OCRFailedError(pdf_path, sorted(failed))
+    return [pages.get(page_number, "") for page_number in range(1, page_total + 1)]
@@ -0,0 +1,121 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from dotenv import load_dotenv
+from chunker import normalize_numbers
+
+load_dotenv()
+
+# Speculative next questions for the "others" scenario, per session and per worker.
+# While the user reads question N, question N+1 is generated for each likely
+# short answer; a matching answer then gets its question without waiting.
+PREFETCH_ENABLED = os.getenv("PREFETCH_ENABLED", "1") != "0"
+PREFETCH_TTL = float(os.getenv("PREFETCH_TTL", "600"))  # idle seconds before a session's prefetch is dropped
+PREFETCH_MAX_SESSIONS = int(os.getenv("PREFETCH_MAX_SESSIONS", "2000"))
+PREFETCH_WORKERS = int(os.getenv("PREFETCH_WORKERS", "8"))
+# Longest wait for a prefetch that is already running before asking directly
+PREFETCH_WAIT = float(os.getenv("PREFETCH_WAIT", "15"))
+
+# Canonical short answer -> spellings that count as it (compared after _answer_key)
+LIKELY_ANSWERS = {
+    "ဟုတ်ကဲ့": [
+        "ဟုတ်ကဲ့", "ဟုတ်", "ဟုတ်တယ်", "ဟုတ်ပါတယ်", "ဟုတ်ကဲ့ပါ", "ရှိတယ်", "ရှိပါတယ်", "ရှိ",
+        "yes", "y", "yeah", "yep", "ya",
+    ],
+    "မဟုတ်ပါ": [
+        "မဟုတ်ပါ", "မဟုတ်ဘူး", "မဟုတ်", "မဟုတ်ပါဘူး", "မရှိဘူး", "မရှိပါ", "မရှိပါဘူး", "မရှိ",
+        "no", "n", "nope", "nah",
+    ],
+    "မသိပါ": [
+        "မသိပါ", "မသိဘူး", "မသိ", "မသိပါဘူး", "မသေချာဘူး", "မသေချာပါ", "မသေချာ",
+        "idk", "i dont know", "dont know", "not sure", "unsure",
+    ],
+}
+
+
+def _answer_key(answer):
+    text = normalize_numbers(answer or "").lower().replace("'", "").replace("’", "")
+    return " ".join(re.sub(r"[^\w\s]", " ", text).split())
+
+
+_CANONICAL = {_answer_key(spelling): canonical for canonical, spellings in LIKELY_ANSWERS.items() for spelling in spellings}
+
+
+def canonical_answer(answer):
+    """The LIKELY_ANSWERS key an answer means, or None for anything longer or different."""
+    return _CANONICAL.get(_answer_key(answer))
+
+
+def fingerprint(history, question):
+    """Identifies "question was just asked after these answers"; stale prefetches never match."""
+    payload = json.dumps([[h.get("q", ""), h.get("a", "")] for h in history] + [question], ensure_ascii=False)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+
+class PrefetchStore:
+    """
+    session_id -> (created_at, fingerprint, {canonical answer: pending result}).
+    Pending results are concurrent futures (sync app) or asyncio tasks (ASGI app);
+    candidates that can no longer be used are cancelled. LRU over sessions with idle expiry.
+    """
+
+    def __init__(self, max_sessions=PREFETCH_MAX_SESSIONS, ttl=PREFETCH_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"prefetched": 0, "hits": 0, "misses": 0}
+
+    def put(self, session_id, key, candidates):
+        dropped = []
+        with self._lock:
+            previous = self._sessions.pop(session_id, None)
+            if previous:
+                dropped.append(previous)
+            self._sessions[session_id] = (time.time(), key, candidates)
+            self._stats["prefetched"] += len(candidates)
+            while len(self._sessions) > self.max_sessions:
+                dropped.append(self._sessions.popitem(last=False)[1])
+        for item in dropped:
+            _cancel(item[2].values())
+
+    def take(self, session_id, key, answer):
+        """The pending result for this answer, or None. The session's other candidates are cancelled."""
+        with self._lock:
+            item = self._sessions.pop(session_id, None)
+            pending = None
+            if item and time.time() - item[0] <= self.ttl and item[1] == key:
+                pending = item[2].get(canonical_answer(answer))
+            self._stats["hits" if pending is not None else "misses"] += 1
+        if item:
+            _cancel(candidate for candidate in item[2].values() if candidate is not pending)
+        return pending
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, sessions=len(self._sessions))
+
+
+def _cancel(candidates):
+    # Queued futures and unfinished tasks stop here; a running thread's call still completes
+    for candidate in candidates:
+        candidate.cancel()
+
+
+_store = PrefetchStore()
+
+
+def put(session_id, key, candidates):
+    _store.put(session_id, key, candidates)
+
+
+def take(session_id, key, answer):
+    return _store.take(session_id, key, answer)
+
+
+def prefetch_stats():
+    return _store.stats()
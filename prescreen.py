@@ -0,0 +1,213 @@
+import os
+import re
+import math
+import threading
+from dotenv import load_dotenv
+from lexical_index import syllables
+
+load_dotenv()
+
+# Local scoring in front of the content checker's LLM call.
+# Posts scoring at least PRESCREEN_SCAM_THRESHOLD (0-1) with a conclusive signal,
+# or plain greetings, get a templated verdict at once; everything else goes to the LLM.
+PRESCREEN_ENABLED = os.getenv("PRESCREEN_ENABLED", "1") != "0"
+PRESCREEN_SCAM_THRESHOLD = float(os.getenv("PRESCREEN_SCAM_THRESHOLD", "0.9"))
+# KB entries whose quoted example phrases ('...') become extra rules
+PRESCREEN_KB_TOPICS = ("red_flags_examples", "Content Checker")
+KB_PHRASE_WEIGHT = 0.8
+# A KB phrase shorter than this (and without a space) is a single word, too generic to be a rule
+KB_PHRASE_MIN_SYLLABLES = 4
+
+# (name, weight, [patterns that must all match], Burmese reason shown in the verdict)
+RULES = [
+    (
+        "prize", 1.5,
+        [r"lottery|jackpot|you(?: have|'ve)? won|winner|congratulations|prize|lucky draw"
+         r"|ထီပေါက်|ထီဆု|ဆုမဲ|ဆုကြေး|ဆုရ|ကံထူး|ဆုချီးမြှင့်|ပေါက်ပါပြီ|လက်ဆောင်ရ"],
+        "မမျှော်လင့်ထားသော **ဆုမဲ / ထီပေါက်** ကြောင်း ပြောဆိုထားခြင်း",
+    ),
+    (
+        "credentials", 2.0,
+        [r"\botp\b|one[- ]time (?:password|code)|verification code|\bpin\b|password|စကားဝှက်|အတည်ပြုကုဒ်|ကုဒ်နံပါတ်",
+         r"send|share|give|tell|reply|enter|verify|confirm|update|log ?in|ပို့|ပေး|ပြော|ဖြည့်|ရိုက်ထည့်|အတည်ပြု"],
+        "**OTP / စကားဝှက် / PIN** ကို ပေးပို့ရန် တောင်းဆိုထားခြင်း",
+    ),
+    (
+        "loan_fee", 1.5,
+        [r"loan|instant cash|no collateral|ချေးငွေ|ငွေချေး|အတိုးမဲ့|အာမခံမလို",
+         r"fee|deposit|processing|advance|ကြိုတင်|စရံ|ဝန်ဆောင်ခ|လွှဲ"],
+        "**ချေးငွေ** ရရန် ငွေကြိုလွှဲခိုင်းခြင်း",
+    ),
+    (
+        "loan", 0.6,
+        [r"loan|instant cash|no collateral|ချေးငွေ|ငွေချေး|အတိုးမဲ့|အာမခံမလို"],
+        "လွယ်ကူသော **ချေးငွေ** ကမ်းလှမ်းခြင်း",
+    ),
+    (
+        "urgency", 0.8,
+        [r"urgent|immediately|act now|right now|within \d+ (?:hours?|minutes?)|last chance|limited time|expire"
+         r"|အမြန်|ချက်ချင်း|အခုပဲ|နောက်ဆုံးအခွင့်အရေး|နာရီအတွင်း"],
+        "**အမြန်လုပ်ရန်** ဖိအားပေးခြင်း",
+    ),
+    (
+        "account_threat", 1.2,
+        [r"account (?:will be |has been |is )?(?:suspended|blocked|closed|locked|disabled)"
+         r"|အကောင့်.{0,20}(?:ပိတ်|ဆိုင်း|ဖျက်|ပိတ်ဆို့)"],
+        "**အကောင့်ပိတ်မည်** ဟု ခြိမ်းခြောက်ခြင်း",
+    ),
+    (
+        "payment", 0.6,
+        # Whole words only: a wallet's name ("kbzpay.com", "wavepay", "KPay") is not a payment request
+        [r"\btransfer|\bsend money|\bpay(?:ment)?\b|ငွေလွှဲ|ငွေပေးချေ|ကြိုတင်ငွေ"],
+        "**ငွေလွှဲ / ငွေပေးချေ** ရန် တောင်းဆိုခြင်း",
+    ),
+    (
+        "free_offer", 1.0,
+        [r"(?:free|အခမဲ့).{0,30}(?:data|\d+\s*gb|iphone|gift|card|ဒေတာ|ဖုန်း|ကတ်|ငွေ)"],
+        "**အခမဲ့** ပစ္စည်း / Data ပေးမည်ဟု ဆွဲဆောင်ခြင်း",
+    ),
+    (
+        "short_link", 1.0,
+        [r"\b(?:bit\.ly|tinyurl\.com|t\.co|goo\.gl|ow\.ly|is\.gd|cutt\.ly|rb\.gy|shorturl\.at|t\.ly|tiny\.cc)/"],
+        "**အတိုချုံ့ထားသော link** (bit.ly စသည်) ပါဝင်ခြင်း",
+    ),
+    (
+        "freemail_brand", 1.5,
+        [r"(?:bank|ဘဏ်|official|support|admin|service)[\w.-]*@(?:gmail|yahoo|outlook|hotmail)\."],
+        "တရားဝင်အဖွဲ့အစည်းဟု ဆိုသော်လည်း **အခမဲ့ email** (gmail စသည်) ကို သုံးထားခြင်း",
+    ),
+    (
+        "raw_ip_link", 1.0,
+        [r"https?://\d{1,3}(?:\.\d{1,3}){3}"],
+        "domain အစား **IP address link** ကို သုံးထားခြင်း",
+    ),
+    (
+        "odd_tld", 0.7,
+        [r"https?://[^\s/]+\.(?:xyz|top|click|buzz|live|icu|loan|win|bid|monster|rest)\b"],
+        "သံသယဖြစ်ဖွယ် **domain** ပါဝင်ခြင်း",
+    ),
+]
+
+# Signals that also show up in warnings about scams ("never share your OTP"):
+# a post needs some other strong signal before it is labelled without the LLM
+INCONCLUSIVE_SIGNALS = ("credentials",)
+CONCLUSIVE_MIN_WEIGHT = 1.0
+
+# Advice rather than a request: a bank notice or a friend's warning quoting scam wording
+_ADVISORY = re.compile(
+    r"\b(?:never|don'?t|do not|will not|won'?t|should not|shouldn'?t)\s+(?:\w+\s+){0,3}?"
+    r"(?:share|send|give|tell|reply|enter|ask|click|disclose|reveal)\b"
+    r"|\bbeware\b|\bbe (?:careful|aware)\b|\bscammers?\b|\bfraudsters?\b"
+    r"|မ(?:ပေး|ပို့|မျှဝေ|ပြော|နှိပ်|ဖြည့်)(?:ပါ)?(?:နှင့်|နဲ့)|ဘယ်သူ့ကိုမှ\s*မ|မည်သူ့ကိုမျှ\s*မ"
+    r"|သတိပြုပါ|သတိထားပါ|လိမ်လည်သူ",
+    re.IGNORECASE,
+)
+
+# A post that is only a greeting or acknowledgment needs no analysis
+_GREETING = re.compile(
+    r"^(?:hi|hello|hey|good (?:morning|afternoon|evening|night)|thanks?(?: you)?|ok(?:ay)?"
+    r"|မင်္ဂလာပါ(?:ခင်ဗျာ|ရှင်)?|ဟယ်လို|ကျေးဇူး(?:တင်ပါတယ်|ပါ)?|နေကောင်းလား)"
+    r"[\s!.,။၊?🙏😊👍❤️]*$",
+    re.IGNORECASE,
+)
+_URL = re.compile(r"https?://|www\.|\b[\w-]+\.(?:com|net|org|ly|co|me|io|xyz|top)\b", re.IGNORECASE)
+
+# Logistic model over the rule features: P(scam) = sigmoid(bias + Σ weights + per-link weight).
+# Hand-weighted (no labelled posts exist yet); tune with the thresholds above.
+_BIAS = -2.0
+_LINK_WEIGHT = 0.3
+
+_COMPILED = [
+    (name, weight, [re.compile(p, re.IGNORECASE) for p in patterns], reason)
+    for name, weight, patterns, reason in RULES
+]
+_kb_rules = {"kb": None, "rules": []}
+_kb_lock = threading.Lock()
+
+SCAM_VERDICT = (
+    "မင်္ဂလာပါ။\n\n"
+    "ဤအကြောင်းအရာသည် **လိမ်လည်မှု (Scam) ဖြစ်နိုင်ခြေ အလွန်မြင့်မား** ပါသည်။ ⚠️\n\n"
+    "**တွေ့ရှိသော သတိပေးလက္ခဏာများ:**\n{reasons}\n\n"
+    "**အကြံပြုချက်:**\n"
+    "- ပါဝင်သော **link** များကို မနှိပ်ပါနှင့်။\n"
+    "- **OTP**၊ **စကားဝှက်** နှင့် ဘဏ်အချက်အလက်များကို မည်သူ့ကိုမျှ မပေးပါနှင့်။\n"
+    "- **ငွေကြိုမလွှဲ** ပါနှင့်။\n"
+    "- တရားဝင် ဖုန်းနံပါတ် သို့မဟုတ် ဝက်ဘ်ဆိုဒ်မှတစ်ဆင့် ပြန်လည် စစ်ဆေးပါ။"
+)
+
+BENIGN_VERDICT = (
+    "မင်္ဂလာပါ။\n\n"
+    "ဤစာသားသည် ပုံမှန် **နှုတ်ဆက်စကား** ဖြစ်ပြီး **သံသယဖြစ်ဖွယ် လက္ခဏာ မတွေ့ရပါ**။ ✅\n\n"
+    "စစ်ဆေးလိုသော post၊ message သို့မဟုတ် link ကို ထည့်ပေးပါ။"
+)
+
+
+def _single_word(phrase):
+    return " " not in phrase and len(syllables(phrase)) < KB_PHRASE_MIN_SYLLABLES
+
+
+def _conclusive(name, weight):
+    return weight >= CONCLUSIVE_MIN_WEIGHT and name not in INCONCLUSIVE_SIGNALS and not name.startswith("kb:")
+
+
+def _kb_phrase_rules(kb):
+    """One rule per quoted example phrase in the KB's red-flag entries, rebuilt when the KB changes."""
+    with _kb_lock:
+        if _kb_rules["kb"] is not kb:
+            phrases = []
+            for topic in PRESCREEN_KB_TOPICS:
+                for entry in (kb or {}).get(topic, []):
+                    quoted = (p.strip() for p in re.findall(r"'([^'\n]*)'", entry))
+                    phrases.extend(p for p in quoted if 3 <= len(p) <= 60 and not _single_word(p))
+            _kb_rules["rules"] = [
+                (f"kb:{phrase}", KB_PHRASE_WEIGHT, [re.compile(re.escape(phrase), re.IGNORECASE)],
+                 f"သတိပြုရမည့် စကားစု '{phrase}' ပါဝင်ခြင်း")
+                for phrase in dict.fromkeys(phrases)
+            ]
+            _kb_rules["kb"] = kb
+        return _kb_rules["rules"]
+
+
+def score(content, kb=None):
+    """
+    {"label": "scam" | "benign" | "uncertain", "score": P(scam), "signals": [rule names], "reasons": [...]}
+    "scam" also needs a conclusive signal and no advisory wording; "advisory" is then listed in signals.
+    Pure regex work, well under a millisecond for a normal post.
+    """
+    text = " ".join((content or "").split())
+    signals, reasons, z, conclusive = [], [], _BIAS, False
+    for name, weight, patterns, reason in _COMPILED + _kb_phrase_rules(kb):
+        if all(p.search(text) for p in patterns):
+            signals.append(name)
+            reasons.append(reason)
+            z += weight
+            conclusive = conclusive or _conclusive(name, weight)
+    z += _LINK_WEIGHT * min(len(_URL.findall(text)), 3)
+    probability = 1.0 / (1.0 + math.exp(-z))
+    advisory = bool(signals) and _ADVISORY.search(text) is not None
+    if advisory:
+        signals.append("advisory")
+        reasons.append("သတိပေးချက် / အကြံပြုချက် ပုံစံ ဖြစ်နိုင်ခြင်း")
+
+    if not signals and _GREETING.match(text):
+        label = "benign"
+    elif probability >= PRESCREEN_SCAM_THRESHOLD and conclusive and not advisory:
+        label = "scam"
+    else:
+        label = "uncertain"
+    return {"label": label, "score": round(probability, 4), "signals": signals, "reasons": reasons}
+
+
+def screen(content, kb=None):
+    """Templated verdict for a high-confidence post, or None when the LLM should decide."""
+    if not PRESCREEN_ENABLED:
+        return None
+    result = score(content, kb)
+    if result["label"] == "scam":
+        # The loan rule is implied by loan_fee; don't list both
+        reasons = [r for name, r in zip(result["signals"], result["reasons"])
+                   if not (name == "loan" and "loan_fee" in result["signals"])]
+        return SCAM_VERDICT.format(reasons="\n".join(f"- {r}" for r in reasons))
+    if result["label"] == "benign":
+        return BENIGN_VERDICT
+    return None
@@ -0,0 +1,192 @@
+import os
+import json
+import time
+import queue
+import sqlite3
+import threading
+from dotenv import load_dotenv
+from rag import generate_quiz_from_topic, load_knowledge_base, normalize_difficulty, QUIZ_DIFFICULTIES
+
+load_dotenv()
+
+# Pre-generated quizzes per (topic, difficulty), shared by all gunicorn workers through one SQLite file
+QUIZ_BANK_PATH = os.getenv("QUIZ_BANK_PATH", "quiz_bank.sqlite3")
+# Refill a bucket once it drops below MIN, up to TARGET quizzes
+QUIZ_BANK_MIN_STOCK = int(os.getenv("QUIZ_BANK_MIN_STOCK", "3"))
+QUIZ_BANK_TARGET_STOCK = int(os.getenv("QUIZ_BANK_TARGET_STOCK", "6"))
+# A quiz is retired after this many serves, so the same set rarely comes back
+QUIZ_BANK_MAX_SERVES = int(os.getenv("QUIZ_BANK_MAX_SERVES", "3"))
+QUIZ_BANK_MIN_QUESTIONS = int(os.getenv("QUIZ_BANK_MIN_QUESTIONS", "5"))
+# Set to 0 to disable the background refill thread (e.g. when a cron job runs `python quiz_bank.py`)
+QUIZ_BANK_REFILL = os.getenv("QUIZ_BANK_REFILL", "1") != "0"
+
+_db = None
+_lock = threading.Lock()
+_stats = {"bank_hits": 0, "live_generations": 0, "refilled": 0}
+_refill_queue = queue.Queue()
+_pending = set()
+_worker = None
+
+
+def _get_db():
+    global _db
+    if _db is None:
+        _db = sqlite3.connect(QUIZ_BANK_PATH, timeout=5, check_same_thread=False, isolation_level=None)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.execute("PRAGMA synchronous=NORMAL")
+        _db.execute(
+            "CREATE TABLE IF NOT EXISTS quizzes ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, difficulty TEXT NOT NULL, "
+            "questions TEXT NOT NULL, served INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL)"
+        )
+        _db.execute("CREATE INDEX IF NOT EXISTS quizzes_bucket ON quizzes(topic, difficulty, served)")
+    return _db
+
+
+def _valid_quiz(questions):
+    """Only bank quizzes the page can render: enough questions, 4 options, answer among them."""
+    if not isinstance(questions, list) or len(questions) < QUIZ_BANK_MIN_QUESTIONS:
+        return False
+    return all(
+        q.get("question") and len(q.get("options", [])) == 4 and q.get("answer") in q["options"]
+        for q in questions
+    )
+
+
+def stock(topic, difficulty):
+    with _lock:
+        return _get_db().execute(
+            "SELECT COUNT(*) FROM quizzes WHERE topic = ? AND difficulty = ?", (topic, difficulty)
+        ).fetchone()[0]
+
+
+def add_quiz(topic, difficulty, questions):
+    if not _valid_quiz(questions):
+        return False
+    with _lock:
+        _get_db().execute(
+            "INSERT INTO quizzes (topic, difficulty, questions, created_at) VALUES (?, ?, ?, ?)",
+            (topic, difficulty, json.dumps(questions, ensure_ascii=False), time.time()),
+        )
+    return True
+
+
+def _take(topic, difficulty):
+    """
+    Pick a random quiz among the least-served ones in the bucket and count the serve.
+    BEGIN IMMEDIATE makes pick + update atomic across workers sharing the file.
+    """
+    with _lock:
+        db = _get_db()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT id, questions, served FROM quizzes WHERE topic = ? AND difficulty = ? "
+                "AND served = (SELECT MIN(served) FROM quizzes WHERE topic = ? AND difficulty = ?) "
+                "ORDER BY RANDOM() LIMIT 1",
+                (topic, difficulty, topic, difficulty),
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            quiz_id, questions, served = row
+            if served + 1 >= QUIZ_BANK_MAX_SERVES:
+                db.execute("DELETE FROM quizzes WHERE id = ?", (quiz_id,))
+            else:
+                db.execute("UPDATE quizzes SET served = served + 1 WHERE id = ?", (quiz_id,))
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+    return json.loads(questions)
+
+
+def refill(topic, difficulty, target=QUIZ_BANK_TARGET_STOCK, max_attempts=None):
+    """Generate quizzes until the bucket holds `target` of them. Returns how many were added."""
+    added = 0
+    attempts = max_attempts or target * 2
+    for _ in range(attempts):
+        if stock(topic, difficulty) >= target:
+            break
+        if add_quiz(topic, difficulty, generate_quiz_from_topic(topic, difficulty)):
+            added += 1
+    with _lock:
+        _stats["refilled"] += added
+    return added
+
+
+def _refill_worker():
+    while True:
+        topic, difficulty = _refill_queue.get()
+        try:
+            refill(topic, difficulty)
+        except Exception as e:
+            print(f"Warning: quiz bank refill failed for {topic}/{difficulty}: {str(e)}")
+        finally:
+            with _lock:
+                _pending.discard((topic, difficulty))
+
+
+def request_refill(topic, difficulty):
+    """Queue a background top-up for one bucket (no-op if one is already queued)."""
+    global _worker
+    if not QUIZ_BANK_REFILL:
+        return
+    with _lock:
+        if (topic, difficulty) in _pending:
+            return
+        _pending.add((topic, difficulty))
+        if _worker is None:
+            _worker = threading.Thread(target=_refill_worker, name="quiz-bank-refill", daemon=True)
+            _worker.start()
+    _refill_queue.put((topic, difficulty))
+
+
+def get_quiz(topic, difficulty=None):
+    """
+    Serve a banked quiz for the topic, falling back to live generation when
+    the bucket is empty. Schedules a refill whenever stock runs low.
+    """
+    difficulty = normalize_difficulty(difficulty)
+    if topic not in load_knowledge_base():
+        return generate_quiz_from_topic(topic, difficulty)
+
+    try:
+        questions = _take(topic, difficulty)
+        low_stock = stock(topic, difficulty) < QUIZ_BANK_MIN_STOCK
+    except sqlite3.Error as e:
+        print(f"Warning: quiz bank read failed: {str(e)}")
+        questions, low_stock = None, False
+
+    if low_stock:
+        request_refill(topic, difficulty)
+    if questions:
+        with _lock:
+            _stats["bank_hits"] += 1
+        return questions
+
+    with _lock:
+        _stats["live_generations"] += 1
+    return generate_quiz_from_topic(topic, difficulty)
+
+
+def warm(topics=None, difficulties=QUIZ_DIFFICULTIES):
+    """Fill every topic × difficulty bucket up to the target stock."""
+    for topic in topics or list(load_knowledge_base().keys()):
+        for difficulty in difficulties:
+            added = refill(topic, difficulty)
+            print(f"✅ {topic} / {difficulty}: +{added} (stock {stock(topic, difficulty)})")
+
+
+def bank_stats():
+    with _lock:
+        stats = dict(_stats)
+        rows = _get_db().execute("SELECT COUNT(*), COUNT(DISTINCT topic || '|' || difficulty) FROM quizzes").fetchone()
+        stats["pending_refills"] = len(_pending)
+    stats["quizzes"], stats["stocked_buckets"] = rows
+    return stats
+
+
+if __name__ == "__main__":
+    warm()
+    print(f"🎉 Quiz bank ready: {bank_stats()}")
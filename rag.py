@@ -1,23 +1,40 @@
 import os
-import openai
-from pinecone import Pinecone
 from dotenv import load_dotenv
 import json
 import random
+import re
+import threading
+import openai
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from vector_store import get_vector_store
+from embedding_cache import embed, embed_many, normalize_text
+from clients import chat_completion
+import answer_cache
+import lexical_index
+import prescreen
+import prefetch_store
+import scenario_store
+import followup_cache
+import reputation
+from context_builder import assemble_context
+from prompts import build_messages, scenario_user_message
 
 load_dotenv()
 
-openai.api_key = os.getenv("OPENAI_API_KEY")
+# Vector search backend: Pinecone (remote) or in-process NumPy, chosen by VECTOR_BACKEND
+index = get_vector_store()
 
-# Initialize Pinecone (new way)
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index_name = os.getenv("PINECONE_INDEX")
-index = pc.Index(index_name)
+# /content-check/batch: posts per request, and completions running at once per request
+CONTENT_CHECK_BATCH_MAX = int(os.getenv("CONTENT_CHECK_BATCH_MAX", "200"))
+CONTENT_CHECK_BATCH_CONCURRENCY = int(os.getenv("CONTENT_CHECK_BATCH_CONCURRENCY", "8"))
+# Chunks retrieved per scenario answer, as the answer arrives
+SCENARIO_TOP_K = int(os.getenv("SCENARIO_TOP_K", "3"))
 
 # AI-only helper
-def ai_only(prompt: str, max_tokens=600):
+def ai_only(prompt: str, max_tokens=600, feature="other"):
     try:
-        chat_resp = openai.chat.completions.create(
+        chat_resp = chat_completion(
+            feature=feature,
             model="gpt-5-chat-latest",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
@@ -27,6 +44,45 @@ def ai_only(prompt: str, max_tokens=600):
     except Exception as e:
         return f"Error in ai_only: {str(e)}"
 
+def ai_with_messages(messages, max_tokens=800, temperature=0.7, feature="other"):
+    """Chat completion over a full message list. Raises on API errors."""
+    chat_resp = chat_completion(
+        feature=feature,
+        model="gpt-5-chat-latest",
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens
+    )
+    return chat_resp.choices[0].message.content.strip()
+
+def stream_with_messages(messages, max_tokens=800, temperature=0.7, feature="other"):
+    """Like ai_with_messages, but yields text deltas as soon as OpenAI sends them."""
+    stream = chat_completion(
+        feature=feature,
+        model="gpt-5-chat-latest",
+        messages=messages,
+        temperature=temperature,
+        max_tokens=max_tokens,
+        stream=True
+    )
+    for chunk in stream:
+        if chunk.choices and chunk.choices[0].delta.content:
+            yield chunk.choices[0].delta.content
+
+def summarize_conversation(previous_summary, turns):
+    """Fold older chat turns into a short running summary (used by history_store)."""
+    transcript = "\n".join(f"{t['role']}: {t['content']}" for t in turns)
+    prompt = (
+        "Update the running summary of a conversation between a user and LannPya Bot, "
+        "a cybersecurity guide for users in Myanmar.\n"
+        "Keep the user's name (if shared), their problem, facts they gave, and advice already given.\n"
+        "Write at most 80 words, in the same language the conversation uses (Burmese or English).\n\n"
+        f"Current summary:\n{previous_summary or '[none]'}\n\n"
+        f"New turns to fold in:\n{transcript}\n\n"
+        "Output only the updated summary."
+    )
+    return ai_only(prompt, max_tokens=250, feature="summary")
+
 def ask_bot(user_input, top_k=3):
     """
     General RAG chatbot for Burmese + English answers.
@@ -47,190 +103,322 @@ def content_checker(content, poster="", date="", platform="", top_k=3):
     return _query_with_context(user_input=user_input_with_meta, feature="content_checker", top_k=top_k)
 
 
-def _query_with_context(user_input, feature="general", top_k=3):
+def retrieve_context(user_input, top_k=3):
     """
-    Internal helper to query Pinecone and build GPT prompt.
-    Uses default namespace for all features.
+    Retrieval only, no LLM call: BM25 plus one (cached) embedding + one vector
+    query, fused by reciprocal rank. Reference-style queries skip the embedding.
+    Returns ranked chunks as [{"id", "score", "text", "metadata"}], best first.
     """
-    # 1️⃣ Embed user input
+    lexical, lexical_only = _lexical_candidates(user_input, top_k)
+    if lexical_only:
+        return lexical[:top_k]
     try:
-        emb_resp = openai.embeddings.create(
-            model="text-embedding-3-small",
-            input=user_input
-        )
-        query_vector = emb_resp.data[0].embedding
+        query_vector = embed(user_input)
     except Exception as e:
-        return f"Error creating embedding: {str(e)}"
+        print(f"Warning: embedding failed: {str(e)}")
+        return lexical[:top_k]
+    return _fuse(_retrieve(query_vector, _candidate_count(lexical, top_k)), lexical, top_k)
+
+
+def _lexical_candidates(user_input, top_k):
+    """BM25 candidates, and whether they are enough on their own (no embedding needed)."""
+    lexical = lexical_index.search(user_input, top_k * 2)
+    return lexical, lexical_index.is_lexical_query(user_input, lexical)
+
 
-    # 2️⃣ Query Pinecone
+def _candidate_count(lexical, top_k):
+    # Fusion needs a deeper vector list than the final top_k
+    return top_k * 2 if lexical else top_k
+
+
+def _fuse(vector_chunks, lexical, top_k):
+    if not lexical:
+        return vector_chunks[:top_k]
+    return lexical_index.rrf_fuse([vector_chunks, lexical], top_k)
+
+
+def _retrieve(query_vector, top_k=3):
     try:
-        result = index.query(
-            vector=query_vector,
-            top_k=top_k,
-            include_metadata=True,
-        )
-        context_texts = [match.metadata["text"] for match in result.matches]
+        matches = index.query(query_vector, top_k=top_k)
     except Exception as e:
-        context_texts = []
-        print(f"Warning: Pinecone query failed: {str(e)}")
-
-    # 3️⃣ Build system prompt
-    if feature == "general":
-        system_prompt = (
-            "You are LannPya Bot, a friendly cybersecurity guide for non-tech-savvy users in Myanmar. "
-            "Always respond in Burmese using short and clear sentences. Explain in simple terms.\n"
-            "Always use consistent pronouns: Refer to yourself as ကျွန်တော် and the user as သင်\n"
-            "Use consistent pronouns in Burmese: ကျွန်တော် for I (subject). ကျွန်တော့် for me (object). ကျွန်တော့်ရဲ့ for my/mine (possessive). ကျွန်တော်ကိုယ်တိုင် for myself. သင် for you (subject). သင့် for you (object). သင့်ရဲ့  for your/yours (possessive). သင်ကိုယ်တိုင် for yourself.\n"
-            "Appreciate the user if he knows or can share specific data to help solve the problem.\n"
-            "Always use an encouraging and supportive tone.\n"
-            "Remind the user that they are doing well and that learning step by step is normal.\n"
-            "Use polite particles like 'ပါ', 'မယ်', 'တယ်' to keep a respectful and friendly tone.\n"
-            "Sometimes use 'ကျွန်တော်တို့' (we) to make the user feel included, e.g., 'ကျွန်တော်တို့ အတူတူ လေ့လာကြမယ်။'.\n"
-            "Handle unclear inputs gently: If the user types something confusing, suggest politely what they might mean instead of rejecting directly.\n"
-            "Use simple encouragements like 'အဆင်ပြေမယ်', 'မပူပါနဲ့', 'ကောင်းပါပြီ', 'လုပ်နိုင်မယ်' to motivate the user.\n"
-            "Occasionally use helpful emojis (✅, 🔐, 📱, 👍) to make responses friendlier, but never overuse them.\n"
-            "Separate lines for better understanding and clear format.\n"
-            "Bold the important keywords.\n"
-            "Use Burmese words as much as possible but use English words for tech terms.\n"
-            "Never use any other language except English and Burmese.\n"
-            "All of your response must be either in English or in Burmses. Do not put any other language symbols.\n"
-            "If user shares their name, start every response by calling their name.\n"
-            "Conversation rules:\n"
-            "1. If the user only says short acknowledgments like 'yes', 'ok', 'thanks', 'thank you', "
-            "or emoji responses, respond politely but do not assume they are asking a new question.\n"
-            "2. Only provide detailed guidance if the user asks a clear question about cybersecurity or privacy.\n"
-            "3. If the user asks questions outside your scope (e.g., 'What's life?', general knowledge, or unrelated topics), "
-            "politely refuse and remind them that you only provide guidance on cybersecurity and privacy.\n"
-            "4. Keep answers short and to the point when the message is clearly an acknowledgment.\n"
-            "Knowledge about laws:\n"
-            "1. You have access to Myanmar Cybersecurity Law and related regulations uploaded in your knowledgebase.\n"
-            "2. Always explain legal information accurately in Burmese using simple sentences.\n"
-            "3. Highlight important **law numbers**, **chapters**, and **key points** in bold.\n"
-            "4. If the user asks for a law reference, provide the **law number** and **chapter** clearly.\n"
-            "5. Avoid giving legal advice beyond what the law text says; always stick to factual legal content.\n\n"
-            "Knowledge base context:\n"
-            + ("\n".join(context_texts) if context_texts else "[No relevant knowledgebase context]") +
-            "\n\nUse this knowledgebase to analyze the content. "
-            "If the answer is not found well enough in the knowledgebase, use your own knowledge."
-        )
-    else:  # content_checker
-        system_prompt = (
-            "You are LannPya Bot’s Content Checker. "
-            "Analyze whether the given content is trustworthy or suspicious. "
-            "Respond in Burmese with short, clear sentences. "
-            "Greeting should always start with 'မင်္ဂလာပါ' and polite tone in Burmese. "
-            "Separate lines for better understanding and clear format. "
-            "Your tone must sound as an educator or guide. "
-            "Bold the important keywords. "
-            "Use Burmese words as much but use English words for tech terms. "
-            "Never use any other language except English and Burmese."
-            "If user shares his name, start every response by calling his name."
-            "Respond only with analysis; do NOT ask follow-up questions or continue the conversation."
-            "Do NOT ask any follow-up questions, suggest extra steps, or engage in conversation.\n"
-            "Knowledge about laws:\n"
-            "- You have access to Myanmar Cybersecurity Law and related regulations uploaded in your knowledgebase.\n"
-            "- If the content is related to legal matters, mention the relevant **law numbers**, **chapters**, or **key points**.\n"
-            "- Always explain legal information accurately in Burmese using simple, clear sentences.\n"
-            "- Avoid giving legal advice; stick to factual information from the law texts.\n\n"
-            "Knowledge base context:\n"
-            + ("\n".join(context_texts) if context_texts else "[No relevant knowledgebase context]") +
-            "Use this knowledgebase to analyze the content. "
-            "If the answer is not found well enough in the knowledgebase, use your own knowledge."
-        )
+        print(f"Warning: vector query failed: {str(e)}")
+        return []
+    return _chunks(matches)
 
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": user_input}
+
+def _chunks(matches):
+    return [
+        {"id": m["id"], "score": m["score"], "text": m["metadata"].get("text", ""), "metadata": m["metadata"]}
+        for m in matches
     ]
 
-    # 4️⃣ GPT completion
+
+def _retrieve_many(query_vectors, top_k=3):
+    """_retrieve for several vectors at once; a failed query gives an empty context."""
     try:
-        chat_resp = openai.chat.completions.create(
-            model="gpt-5-chat-latest",
-            messages=messages,
-            temperature=0.7,
-            max_tokens=800
-        )
-        return chat_resp.choices[0].message.content.strip()
+        results = index.query_many(query_vectors, top_k=top_k)
+    except Exception as e:
+        print(f"Warning: vector query failed: {str(e)}")
+        return [[] for _ in query_vectors]
+    return [_query_result_chunks(result) for result in results]
+
+
+def _query_result_chunks(result):
+    if isinstance(result, Exception):
+        print(f"Warning: vector query failed: {str(result)}")
+        return []
+    return _chunks(result)
+
+
+def chat_messages(history_messages, chunks, user_message):
+    """
+    GPT messages for one /chat turn: the fixed persona, then the session's
+    (summarized) history, then the retrieved chunks and the new user message.
+    """
+    return build_messages("chat", assemble_context(chunks, "chat"), user_message, history_messages)
+
+
+def _query_with_context(user_input, feature="general", top_k=3):
+    """
+    Internal helper to query the vector store (Pinecone or local) and build GPT prompt.
+    Uses default namespace for all features.
+    """
+    return _answer_plan(_prepare_query(user_input, feature, top_k))
+
+
+def _answer_plan(plan):
+    """Run the completion for a plan from _prepare_query / _prepare_content_check."""
+    if "answer" in plan:
+        return plan["answer"]
+    try:
+        answer = ai_with_messages(plan["messages"], temperature=plan["temperature"], feature=plan["feature"])
     except Exception as e:
         return f"Error in GPT response: {str(e)}"
 
-    
-def ask_bot_content_checker(content, poster, date, platform, top_k=3):
+    answer_cache.store(plan["feature"], plan["query_vector"], answer, context_key=plan["cache_context"])
+    return answer
+
+
+def _stream_plan(plan):
+    """Streaming counterpart of _answer_plan; caches the full answer once the stream ends."""
+    if "answer" in plan:
+        yield plan["answer"]
+        return
+    parts = []
+    try:
+        for delta in stream_with_messages(plan["messages"], temperature=plan["temperature"], feature=plan["feature"]):
+            parts.append(delta)
+            yield delta
+    except Exception as e:
+        yield f"Error in GPT response: {str(e)}"
+        return
+
+    answer_cache.store(plan["feature"], plan["query_vector"], "".join(parts).strip(), context_key=plan["cache_context"])
+
+
+def _prepare_query(user_input, feature="general", top_k=3):
+    """
+    Embed, check the answer cache, retrieve context and build the GPT messages.
+    Returns {"answer": ...} for a cache hit or an error, otherwise the completion plan.
+    """
+    # 1️⃣ Lexical (BM25) search: cheap, and enough on its own for "ပုဒ်မ ၃၆"-style queries
+    cache_context = f"top_k={top_k}"
+    lexical, lexical_only = _lexical_candidates(user_input, top_k)
+    if lexical_only:
+        context_texts = assemble_context(lexical[:top_k], feature)
+        return _query_plan(user_input, feature, None, cache_context, context_texts)
+
+    # 2️⃣ Embed user input
+    try:
+        query_vector = embed(user_input)
+    except Exception as e:
+        return {"answer": f"Error creating embedding: {str(e)}"}
+
+    # Serve a near-identical earlier question from the semantic answer cache
+    cached_answer = answer_cache.lookup(feature, query_vector, context_key=cache_context)
+    if cached_answer is not None:
+        return {"answer": cached_answer}
+
+    # 3️⃣ Query vector store and fuse with the lexical hits
+    vector_chunks = _retrieve(query_vector, _candidate_count(lexical, top_k))
+    context_texts = assemble_context(_fuse(vector_chunks, lexical, top_k), feature)
+    return _query_plan(user_input, feature, query_vector, cache_context, context_texts)
+
+
+def _query_plan(user_input, feature, query_vector, cache_context, context_texts):
+    """Build the completion plan once embedding and retrieval are done (shared with async_rag)."""
+    # 4️⃣ GPT completion happens in _answer_plan / _stream_plan
+    return {
+        "messages": build_messages(feature, context_texts, user_input),
+        "temperature": 0.7,
+        "feature": feature,
+        "query_vector": query_vector,
+        "cache_context": cache_context,
+    }
+
+
+def content_check_result(content, poster, date, platform, top_k=3):
     """
     Content Checker using RAG + GPT.
-    1️⃣ Query Pinecone for top_k most relevant context.
+    1️⃣ Query the vector store for top_k most relevant context.
     2️⃣ Include metadata (poster/platform/date) in reasoning.
     3️⃣ GPT uses knowledgebase first, falls back to its own knowledge if needed.
+    Returns {"result", "path"}; path is what produced the verdict: prescreen, cache, llm or error.
     """
+    plan = _prepare_content_check(content, poster, date, platform, top_k)
+    return {"result": _answer_plan(plan), "path": plan["path"]}
+
+
+def stream_content_check(content, poster, date, platform, top_k=3):
+    """Streaming content_check_result: {"stream": text deltas, "path"}, the path known before the first delta."""
+    plan = _prepare_content_check(content, poster, date, platform, top_k)
+    return {"stream": _stream_plan(plan), "path": plan["path"]}
+
+
+def _prescreen_plan(content):
+    """Obvious scams and plain greetings are answered locally, without embedding or the LLM."""
+    try:
+        kb = load_knowledge_base()
+    except (OSError, ValueError) as e:
+        print(f"Warning: knowledge base unavailable for prescreen: {str(e)}")
+        kb = None
+    verdict = prescreen.screen(content, kb)
+    return {"answer": verdict, "path": "prescreen"} if verdict is not None else None
+
+
+def _prepare_content_check(content, poster, date, platform, top_k=3):
+    """Retrieval + prompt building for the content checker (see _prepare_query)."""
+    # 0️⃣ Local pre-screen
+    plan = _prescreen_plan(content)
+    if plan is not None:
+        return plan
+
     # 1️⃣ Embed user content
     try:
-        emb_resp = openai.embeddings.create(
-            model="text-embedding-3-small",
-            input=content
-        )
-        query_vector = emb_resp.data[0].embedding
+        query_vector = embed(content)
     except Exception as e:
-        return f"Error creating embedding: {str(e)}"
+        return {"answer": f"Error creating embedding: {str(e)}", "path": "error"}
+
+    # Same post with the same metadata (and reputation hits) seen before → reuse its verdict
+    hits = reputation.check(content)
+    cache_context = _content_check_cache_context(poster, date, platform, top_k, hits)
+    cached_answer = answer_cache.lookup("content_checker", query_vector, context_key=cache_context)
+    if cached_answer is not None:
+        return {"answer": cached_answer, "path": "cache"}
 
-    # 2️⃣ Query Pinecone (default namespace)
+    # 2️⃣ Query vector store (default namespace)
+    context_texts = assemble_context(_retrieve(query_vector, top_k), "content_checker")
+    return _content_check_plan(content, query_vector, cache_context, context_texts, reputation.facts(hits))
+
+
+def _content_check_cache_context(poster, date, platform, top_k, hits=()):
+    # A domain or number listed after a verdict was cached must not be served the old verdict
+    listed = ",".join(f"{key}={category}" for key, category in hits)
+    return f"{poster}|{date}|{platform}|top_k={top_k}|rep={listed}"
+
+
+def batch_posts(items):
+    """Normalize /content-check/batch input: dicts with content/poster/date/platform, or bare strings."""
+    posts = []
+    for item in items:
+        if not isinstance(item, dict):
+            item = {"content": item}
+        posts.append({field: str(item.get(field) or "") for field in ("content", "poster", "date", "platform")})
+    return posts
+
+
+def _unique_posts(posts, top_k):
+    """
+    Group identical posts (same normalized content and metadata) so each
+    distinct post is checked once: ([post], [[positions]]).
+    """
+    groups = {}
+    for position, post in enumerate(posts):
+        cache_context = _content_check_cache_context(post["poster"], post["date"], post["platform"], top_k)
+        groups.setdefault((normalize_text(post["content"]), cache_context), []).append(position)
+    return [posts[positions[0]] for positions in groups.values()], list(groups.values())
+
+
+def _prepare_content_checks(posts, top_k=3):
+    """_prepare_content_check for many posts: one embeddings request, one batched vector search."""
+    plans = [_prescreen_plan(post["content"]) for post in posts]
+    to_embed = [i for i, plan in enumerate(plans) if plan is None]
     try:
-        result = index.query(
-            vector=query_vector,
-            top_k=top_k,
-            include_metadata=True,
-        )
-        context_texts = [match.metadata["text"] for match in result.matches]
+        query_vectors = embed_many([posts[i]["content"] for i in to_embed]) if to_embed else []
     except Exception as e:
-        context_texts = []
-        print(f"Warning: Pinecone query failed: {str(e)}")
-
-# 3️⃣ Build system prompt for Content Checker (English)
-    system_prompt = (
-        "You are LannPya Bot’s Content Checker. "
-        "Analyze whether the given content is trustworthy or suspicious. "
-        "Respond in Burmese with short, clear sentences. "
-        "Greeting should always start with 'မင်္ဂလာပါ' and polite tone in Burmese. "
-        "Separate lines for better understanding and clear format. "
-        "Your tone must sound as an educator or guide. "
-        "Bold the important keywords. "
-        "Use Burmese words as much but use English words for tech terms. "
-        "Never use any other language except English and Burmese. "
-        "If user shares his name, start every response by calling his name."
-        "- Respond only with analysis; do NOT ask follow-up questions or continue the conversation."
-        "- Do NOT ask any follow-up questions, suggest extra steps, or engage in conversation.\n"
-        "Knowledge about laws:\n"
-        "- You have access to Myanmar Cybersecurity Law and related regulations uploaded in your knowledgebase.\n"
-        "- If the content is related to legal matters, mention the relevant **law numbers**, **chapters**, or **key points**.\n"
-        "- Always explain legal information accurately in Burmese using simple, clear sentences.\n"
-        "- Avoid giving legal advice; stick to factual information from the law texts.\n\n"
-        "Knowledge base context:\n"
-        + (
-            "\n".join(context_texts)
-            if context_texts
-            else "[No relevant knowledgebase context]"
-        )
-        + 
-        "Use this knowledgebase to analyze the content. "
-        "If the answer is not found well enough in the knowledgebase, use your own knowledge."
-    )
+        return _embedding_failed(plans, e)
+    batch = _content_check_batch_lookup(posts, plans, to_embed, query_vectors, top_k)
+    retrieved = _retrieve_many([batch["query_vectors"][i] for i in batch["pending"]], top_k)
+    return _content_check_batch_plans(batch, retrieved)
 
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": content}
-    ]
 
-    # 4️⃣ GPT completion
-    try:
-        chat_resp = openai.chat.completions.create(
-            model="gpt-5-chat-latest",
-            messages=messages,
-            temperature=0.6,
-            max_tokens=800
+def _embedding_failed(plans, error):
+    failed = {"answer": f"Error creating embedding: {str(error)}", "path": "error"}
+    return [plan or failed for plan in plans]
+
+
+def _content_check_batch_lookup(posts, plans, to_embed, query_vectors, top_k):
+    """
+    Answer-cache lookups for the embedded posts of a batch (positions to_embed);
+    the positions still needing retrieval are in "pending".
+    """
+    batch = {"posts": posts, "query_vectors": {}, "cache_contexts": {}, "facts": {}, "plans": plans, "pending": []}
+    for i, query_vector in zip(to_embed, query_vectors):
+        post = posts[i]
+        hits = reputation.check(post["content"])
+        cache_context = _content_check_cache_context(post["poster"], post["date"], post["platform"], top_k, hits)
+        batch["query_vectors"][i] = query_vector
+        batch["cache_contexts"][i] = cache_context
+        batch["facts"][i] = reputation.facts(hits)
+        cached_answer = answer_cache.lookup("content_checker", query_vector, context_key=cache_context)
+        if cached_answer is not None:
+            plans[i] = {"answer": cached_answer, "path": "cache"}
+        else:
+            batch["pending"].append(i)
+    return batch
+
+
+def _content_check_batch_plans(batch, retrieved):
+    """Fill in the plans of the cache misses from their retrieved chunks (shared with async_rag)."""
+    plans = batch["plans"]
+    for i, chunks in zip(batch["pending"], retrieved):
+        context_texts = assemble_context(chunks, "content_checker")
+        plans[i] = _content_check_plan(
+            batch["posts"][i]["content"], batch["query_vectors"][i], batch["cache_contexts"][i], context_texts,
+            batch["facts"][i],
         )
-        return chat_resp.choices[0].message.content.strip()
-    except Exception as e:
-        return f"Error in GPT response: {str(e)}"
+    return plans
+
+
+def content_check_batch(posts, top_k=3, concurrency=CONTENT_CHECK_BATCH_CONCURRENCY):
+    """
+    Check many posts (see batch_posts) and yield (position, result, path) as
+    each verdict finishes, not in input order. Pre-screened posts come first;
+    embedding and retrieval are batched; completions run `concurrency` at a
+    time, and duplicate posts share one.
+    """
+    unique, positions = _unique_posts(posts, top_k)
+    plans = _prepare_content_checks(unique, top_k)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(_answer_plan, plan): i for i, plan in enumerate(plans)}
+        for future in as_completed(futures):
+            i = futures[future]
+            result = future.result()
+            for position in positions[i]:
+                yield position, result, plans[i]["path"]
+
+
+def _content_check_plan(content, query_vector, cache_context, context_texts, facts=()):
+    """Build the content-check completion plan (shared with async_rag)."""
+    # 4️⃣ GPT completion happens in _answer_plan / _stream_plan
+    return {
+        "messages": build_messages("content_checker", context_texts, content, facts=facts),
+        "temperature": 0.6,
+        "feature": "content_checker",
+        "path": "llm",
+        "query_vector": query_vector,
+        "cache_context": cache_context,
+    }
     
 PREDEFINED_QUESTIONS = {
     "phishing": [
@@ -279,8 +467,24 @@ PREDEFINED_QUESTIONS = {
 
 def generate_followup_questions(topic, user_answers):
     """
-    Given first 5 answers, generate 5 more questions dynamically using OpenAI.
+    Given first 5 answers, return 5 more questions: cached per topic and MCQ
+    answer pattern (free text is left out of the prompt), generated on a miss.
     """
+    core_questions = PREDEFINED_QUESTIONS.get(topic)
+    if not (core_questions and followup_cache.FOLLOWUP_CACHE_ENABLED):
+        return followups_for_answers(user_answers)
+
+    pattern = followup_cache.answer_pattern(core_questions, user_answers)
+    key = followup_cache.cache_key(topic, core_questions, pattern)
+    questions = followup_cache.lookup(key, topic, pattern)
+    if questions is None:
+        questions = followups_for_answers(followup_cache.pattern_answers(core_questions, pattern))
+        followup_cache.store(key, topic, pattern, questions)
+    return questions
+
+
+def followups_for_answers(user_answers):
+    """Generate 5 follow-up questions for {question: answer} with OpenAI."""
     combined_text = "\n".join([f"Q: {q} → A: {a}" for q, a in user_answers.items()])
     prompt = f"""
     Based on the user's answers to the following core cybersecurity questions:
@@ -289,7 +493,7 @@ def generate_followup_questions(topic, user_answers):
     Generate 5 follow-up diagnostic questions for the same topic in Burmese.
     Output as a numbered list, short questions only.
     """
-    followup_qs = ai_only(prompt).split("\n")
+    followup_qs = ai_only(prompt, feature="scenario_followup").split("\n")
     questions = []
     for q in followup_qs:
         q = q.strip()
@@ -319,67 +523,187 @@ def get_scenario_questions(topic, stage=1, user_answers=None):
     else:
         # Fully AI-generated 10 questions (text input)
         prompt = "Generate 10 short cybersecurity diagnostic questions in Burmese for a general unknown threat."
-        text_qs = ai_only(prompt).split("\n")[:10]
+        text_qs = ai_only(prompt, feature="scenario_followup").split("\n")[:10]
         for q in text_qs:
             questions.append({"question": q, "type": "text"})
         questions.append({"question": "Any additional details?", "type": "text"})
     return questions
 
 
-def analyze_scenario_responses(topic, user_answers):
+# "Others" scenario: free-form diagnostic questions, one per step
+OTHERS_FIRST_QUESTION = "အကြောင်းအရာကို အနည်းငယ်ရှင်းပြပါ"
+
+
+def others_next_question_prompt(history):
+    """Prompt for the next question, given history = [{"q", "a"}, ...]."""
+    combined = "\n".join([f"Q: {h['q']} → A: {h['a']}" for h in history])
+    return f"""
+        The user has answered these so far:
+        {combined}
+
+        Based on everything so far, generate the NEXT most relevant cybersecurity diagnostic question in Burmese.
+        Keep it short and clear. Only output the question.
+        """
+
+
+# Background generation of upcoming "others" questions (see prefetch_store)
+_prefetch_executor = ThreadPoolExecutor(max_workers=prefetch_store.PREFETCH_WORKERS, thread_name_prefix="prefetch")
+# Jobs submitted and not finished; a new prefetch is skipped rather than queued behind them
+_prefetch_jobs = [0]
+_prefetch_jobs_lock = threading.Lock()
+
+
+def _prefetch_job_done(future):
+    with _prefetch_jobs_lock:
+        _prefetch_jobs[0] -= 1
+
+
+def others_next_question(history, session_id=None):
+    """Next question after history; taken from the session's prefetch when the last answer matches one."""
+    if prefetch_store.PREFETCH_ENABLED and session_id and history:
+        pending = prefetch_store.take(
+            session_id, prefetch_store.fingerprint(history[:-1], history[-1].get("q", "")), history[-1].get("a", "")
+        )
+        # cancel() only succeeds for a job still queued: then asking directly is faster
+        if pending is not None and not pending.cancel():
+            try:
+                question = pending.result(timeout=prefetch_store.PREFETCH_WAIT)
+            except Exception as e:
+                question = f"Error in ai_only: {str(e)}"
+            if not question.startswith("Error"):
+                return question
+    return ai_only(others_next_question_prompt(history), feature="scenario_others")
+
+
+def prefetch_others_question(session_id, history, question):
+    """Start generating the question after `question`, once per likely short answer to it."""
+    if not (prefetch_store.PREFETCH_ENABLED and session_id):
+        return
+    with _prefetch_jobs_lock:
+        if _prefetch_jobs[0] + len(prefetch_store.LIKELY_ANSWERS) > prefetch_store.PREFETCH_WORKERS:
+            return  # backlogged: these would wait behind other sessions' jobs
+        _prefetch_jobs[0] += len(prefetch_store.LIKELY_ANSWERS)
+    candidates = {}
+    for answer in prefetch_store.LIKELY_ANSWERS:
+        future = _prefetch_executor.submit(
+            ai_only,
+            others_next_question_prompt(history + [{"q": question, "a": answer}]),
+            feature="scenario_others_prefetch",
+        )
+        future.add_done_callback(_prefetch_job_done)
+        candidates[answer] = future
+    prefetch_store.put(session_id, prefetch_store.fingerprint(history, question), candidates)
+
+
+def others_final_prompt(history):
+    combined = "\n".join([f"Q: {h['q']} → A: {h['a']}" for h in history])
+    return f"""
+    The user answered 10 cybersecurity diagnostic questions:
+    {combined}
+
+    Summarize the main RISKS and possible SOLUTIONS for the user.
+    Respond in Burmese, clearly and concisely and produce risks and solutions clearly.
+    """
+
+
+def analyze_scenario_responses(topic, user_answers, session_id=None):
     """
     Analyze user answers:
-    1️⃣ Pinecone retrieval
+    1️⃣ Retrieval for any answers the session hasn't seen yet
     2️⃣ OpenAI analysis
     Returns risks + solutions
     """
-    # Prepare combined text
-    combined_text = "\n".join([f"Q: {q} → A: {a}" for q, a in user_answers.items()])
+    messages = _build_scenario_messages(topic, user_answers, session_id)
+    try:
+        return ai_with_messages(messages, max_tokens=1000, feature="scenario")
+    except Exception as e:
+        return f"Error in ai_only: {str(e)}"
 
-    # Step 1: Pinecone + OpenAI
-    pinecone_context = _query_with_context(combined_text, feature="general", top_k=5)
 
-    # Step 2: Refined OpenAI analysis
-    final_prompt = f"""
-    You are LannPya Bot, a Scenario Simulation Assistant.
+def stream_scenario_analysis(topic, user_answers, session_id=None):
+    """Streaming version of analyze_scenario_responses."""
+    messages = _build_scenario_messages(topic, user_answers, session_id)
+    try:
+        yield from stream_with_messages(messages, max_tokens=1000, feature="scenario")
+    except Exception as e:
+        yield f"Error in ai_only: {str(e)}"
 
-    User Topic: {topic}
 
-    User's Responses:
-    {combined_text}
+def _build_scenario_messages(topic, user_answers, session_id=None):
+    """Final risks/solutions messages over the request's answers, reusing context the session already retrieved."""
+    state = record_scenario_answers(session_id, topic, user_answers, complete=True)
+    return _scenario_messages(state)
+
 
-    Pinecone Context:
-    {pinecone_context}
-
-    Instructions:
-    - Analyze the above information and summarize the main **RISKS** and actionable **SOLUTIONS**.
-    - If any risks or solutions are related to legal requirements, mention the relevant **Myanmar Cybersecurity Law numbers**, **chapters**, or **key points**.
-    - Respond in **Burmese**, clearly and concisely.
-    - Never use any other language except English and Burmese.
-    - Use line breaks to separate each risk and solution for clarity.
-    - Bold the most important keywords.
-    - Use Burmese words as much as possible, and English words for technical terms.
-    - Respond only with analysis; do NOT ask follow-up questions or continue the conversation.
-    - Do NOT ask any follow-up questions, suggest extra steps, or engage in conversation.
-    - Polite, professional, and educator-like tone.
-    - Use few emojis to emphasize meanings of keywords (not too many).
-
-    Output Format Example:
-    **RISKS (အန္တရာယ်):**
-    1. <risk description>
-    2. <risk description>
-
-    **SOLUTIONS (ဖြေရှင်းချက်):**
-    1. <solution description>
-    2. <solution description>
-
-    **LEGAL REFERENCES (ဥပဒေညွှန်ကြားချက်) [if relevant]:**
-    - Mention relevant **law numbers** and **chapters** from the Myanmar Cybersecurity Law as needed.
-    - Only include factual information from the law; do not give legal advice.
+def record_scenario_answers(session_id, topic, answers, complete=False):
     """
-    
-    final_result = ai_only(final_prompt, max_tokens=1000)
-    return final_result
+    Add answers to a scenario session (a throwaway one without session_id) and
+    retrieve context for the new or changed ones: one embedding request and
+    one batched vector query, however many answers arrive together.
+    complete=True: answers is the full set and replaces the session's (the
+    session may live in another worker's memory, so it is only a retrieval cache).
+    """
+    state = scenario_store.load(session_id, topic) if session_id else scenario_store.empty_state(topic)
+    pending = _scenario_pending(state, answers or {}, complete)
+    if pending:
+        try:
+            vectors = embed_many([_scenario_query(q, state["answers"][q]) for q in pending])
+        except Exception as e:
+            print(f"Warning: embedding failed: {str(e)}")
+        else:
+            _scenario_retrieved(state, pending, _retrieve_many(vectors, SCENARIO_TOP_K))
+    if session_id:
+        scenario_store.save(session_id, state)
+    return state
+
+
+def _scenario_pending(state, answers, complete=False):
+    """Merge answers into state (or replace them); the questions whose current answer has no retrieved context yet."""
+    if complete:
+        state["answers"] = {}
+    state["answers"].update({q: (a or "").strip() for q, a in answers.items()})
+    return [
+        q for q, a in state["answers"].items()
+        if a and state["retrieved"].get(q, {}).get("answer") != a
+    ]
+
+
+def _scenario_query(question, answer):
+    # "Yes" alone retrieves nothing useful; the question carries the meaning
+    return f"{question} {answer}"
+
+
+def _scenario_retrieved(state, questions, chunk_lists):
+    for q, chunks in zip(questions, chunk_lists):
+        state["retrieved"][q] = {
+            "answer": state["answers"][q],
+            "chunks": [{"id": c["id"], "score": c["score"], "text": c["text"]} for c in chunks],
+        }
+
+
+def scenario_context(state):
+    """Context for the current answers: chunks merged across answers (best score per id), budgeted."""
+    best = {}
+    for q, a in state["answers"].items():
+        entry = state["retrieved"].get(q)
+        if not entry or entry["answer"] != a:
+            continue
+        for chunk in entry["chunks"]:
+            if chunk["id"] not in best or chunk["score"] > best[chunk["id"]]["score"]:
+                best[chunk["id"]] = chunk
+    ranked = sorted(best.values(), key=lambda c: c["score"], reverse=True)
+    return assemble_context(ranked, "scenario")
+
+
+def scenario_answers_text(user_answers):
+    return "\n".join([f"Q: {q} → A: {a}" for q, a in user_answers.items()])
+
+
+def _scenario_messages(state):
+    """Shared with async_rag."""
+    return build_messages(
+        "scenario", scenario_context(state), scenario_user_message(state["topic"] or "others", scenario_answers_text(state["answers"]))
+    )
 
 def load_quiz_data(path="your_data.json"):
     """Load quiz data JSON safely."""
@@ -390,6 +714,26 @@ def load_quiz_data(path="your_data.json"):
         return json.loads(data)
 
 
+KNOWLEDGE_BASE_PATH = "knowledge_base.json"
+QUIZ_DIFFICULTIES = ("easy", "medium", "hard")
+_kb_cache = {"mtime": None, "data": {}}
+
+
+def load_knowledge_base(path=KNOWLEDGE_BASE_PATH):
+    """Parsed knowledge_base.json, re-read only when the file changes."""
+    mtime = os.path.getmtime(path)
+    if _kb_cache["mtime"] != mtime:
+        with open(path, "r", encoding="utf-8") as f:
+            _kb_cache["data"] = json.load(f)
+        _kb_cache["mtime"] = mtime
+    return _kb_cache["data"]
+
+
+def normalize_difficulty(difficulty):
+    diff_text = (difficulty or "medium").lower()
+    return diff_text if diff_text in QUIZ_DIFFICULTIES else "medium"
+
+
 def parse_quiz_text(ai_text):
     """
     Converts AI output into a structured list of questions.
@@ -410,7 +754,7 @@ def parse_quiz_text(ai_text):
         text = ai_text.replace("\r\n", "\n").replace("\r", "\n").strip()
 
         # Primary split by blank lines or lines of dashes
-        raw_blocks = [b for b in re.split(r"\n\s*(?:\n|[-=]{3,,}\n)+", text) if b.strip()]
+        raw_blocks = [b for b in re.split(r"\n\s*(?:\n|[-=]{3,}\n)+", text) if b.strip()]
         for block in raw_blocks:
             try:
                 lines = [ln.strip() for ln in block.split("\n") if ln.strip()]
@@ -477,29 +821,144 @@ def parse_quiz_text(ai_text):
 
     return questions[:10]
 
-def generate_quiz_from_topic(topic_name, difficulty: str | None = None):
+QUIZ_QUESTION_COUNT = 10
+# Output budget per question (Burmese text is token-heavy); also sizes the top-up request
+QUIZ_TOKENS_PER_QUESTION = 180
+# Structured output: the completion is a JSON document of exactly this shape
+QUIZ_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "quiz",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "questions": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "question": {"type": "string"},
+                            "options": {"type": "array", "items": {"type": "string"}},
+                            "answer_index": {"type": "integer"},
+                        },
+                        "required": ["question", "options", "answer_index"],
+                        "additionalProperties": False,
+                    },
+                }
+            },
+            "required": ["questions"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+def _quiz_prompt(topic_text, difficulty, count, existing=()):
+    prompt = f"""
+    You are an expert quiz creator.
+    Create {count} multiple-choice questions (1 correct + 3 wrong answers each) from the following text:
+
+    {topic_text}
+
+    Difficulty: {difficulty}
+
+    Write each question and its 4 options in Burmese.
+    answer_index is the position (0-3) of the correct option in options.
     """
-    Generate quiz from JSON topic using OpenAI.
+    if existing:
+        prompt += "\nThe quiz already has these questions; do not repeat them:\n" + "\n".join(f"- {q}" for q in existing)
+    return prompt
+
+
+def _quiz_item(item):
+    """A structured-output question in the page's format, or None if it is unusable."""
+    try:
+        question = item["question"].strip()
+        options = [str(option).strip() for option in item["options"]]
+        answer_index = int(item["answer_index"])
+    except (KeyError, TypeError, ValueError, AttributeError):
+        return None
+    if not question or len(options) != 4 or len(set(options)) != 4 or not all(options) or not 0 <= answer_index < 4:
+        return None
+    return {"question": question, "options": options, "answer": options[answer_index]}
+
+
+def _json_array_items(deltas):
     """
-    with open("knowledge_base.json", "r", encoding="utf-8") as f:
-        quiz_data = json.load(f)
-        
-    if topic_name not in quiz_data:
-        print(f"Topic '{topic_name}' not found in JSON.")
-        return []
+    Yield the raw text of each object in the document's top-level array
+    ({"questions": [{...}, ...]}) as soon as it is complete in the stream.
+    """
+    buffer, scanned = "", 0
+    depth, in_string, escaped, start = 0, False, False, None
+    for delta in deltas:
+        buffer += delta
+        for i in range(scanned, len(buffer)):
+            ch = buffer[i]
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "{[":
+                depth += 1
+                if depth == 3 and ch == "{":
+                    start = i
+            elif ch in "}]":
+                if depth == 3 and ch == "}" and start is not None:
+                    yield buffer[start:i + 1]
+                    start = None
+                depth -= 1
+        scanned = len(buffer)
 
-    topic_text = "\n".join(quiz_data[topic_name])  # all lines for that topic
-    diff_text = (difficulty or "medium").lower()
-    if diff_text not in {"easy", "medium", "hard"}:
-        diff_text = "medium"
 
-    base_prompt = f"""
+def _stream_quiz_questions(prompt, count, seen):
+    """
+    Valid, new questions from one structured-output completion, parsed while it
+    streams. Whatever completed before a cut-off or error is kept.
+    Returns (questions, error).
+    """
+    questions = []
+    try:
+        stream = chat_completion(
+            feature="quiz",
+            model="gpt-5-chat-latest",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.5,
+            max_tokens=QUIZ_TOKENS_PER_QUESTION * count + 100,
+            response_format=QUIZ_RESPONSE_FORMAT,
+            stream=True,
+        )
+        deltas = (c.choices[0].delta.content for c in stream if c.choices and c.choices[0].delta.content)
+        for raw in _json_array_items(deltas):
+            try:
+                question = _quiz_item(json.loads(raw))
+            except ValueError:
+                question = None
+            if question and normalize_text(question["question"]) not in seen:
+                seen.add(normalize_text(question["question"]))
+                questions.append(question)
+                if len(questions) >= count:
+                    break
+    except Exception as e:
+        print(f"Warning: quiz generation stopped after {len(questions)} questions: {str(e)}")
+        return questions, e
+    return questions, None
+
+
+def _text_quiz_questions(topic_text, difficulty):
+    """Plain-text format, for when the structured-output request itself is rejected."""
+    prompt = f"""
     You are an expert quiz creator.
-    Create 10 multiple-choice questions (1 correct + 3 wrong answers each) from the following text:
+    Create {QUIZ_QUESTION_COUNT} multiple-choice questions (1 correct + 3 wrong answers each) from the following text:
 
     {topic_text}
 
-    Difficulty: {diff_text}
+    Difficulty: {difficulty}
 
     Return questions in EXACTLY this format, with a blank line between questions, no extra commentary:
     1. Question text in Burmese?
@@ -509,57 +968,111 @@ def generate_quiz_from_topic(topic_name, difficulty: str | None = None):
        d) Option 4
        Answer: a
     """
+    try:
+        response = chat_completion(
+            feature="quiz",
+            model="gpt-5-chat-latest",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.5,
+            max_tokens=1500
+        )
+        return parse_quiz_text(response.choices[0].message.content.strip())
+    except Exception as e:
+        print("Error generating quiz:", e)
+        return []
 
-    prompts = [
-        base_prompt,
-        base_prompt + "\nOnly output the items in the specified format. Do not add explanations, headings, or anything else.",
-        base_prompt + "\nAbsolutely do not include any text outside the 10 questions in the specified format.",
-    ]
 
-    for attempt, prompt in enumerate(prompts, start=1):
-        try:
-            response = openai.chat.completions.create(
-                model="gpt-5-chat-latest",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.5,
-                max_tokens=1500
-            )
-            ai_text = response.choices[0].message.content.strip()
-            questions = parse_quiz_text(ai_text)
-            if questions:
-                return questions
-            else:
-                print(f"Warning: attempt {attempt} parsed 0 questions.")
-        except Exception as e:
-            print(f"Error generating quiz on attempt {attempt}:", e)
+def generate_quiz_from_topic(topic_name, difficulty: str | None = None):
+    """
+    Generate quiz from JSON topic using OpenAI structured output.
+    Valid questions are kept; only the missing ones are asked for again,
+    in one small top-up request.
+    """
+    quiz_data = load_knowledge_base()
+
+    if topic_name not in quiz_data:
+        print(f"Topic '{topic_name}' not found in JSON.")
+        return []
+
+    topic_text = "\n".join(quiz_data[topic_name])  # all lines for that topic
+    diff_text = normalize_difficulty(difficulty)
+
+    seen = set()
+    questions, error = _stream_quiz_questions(_quiz_prompt(topic_text, diff_text, QUIZ_QUESTION_COUNT), QUIZ_QUESTION_COUNT, seen)
+    if not questions and isinstance(error, openai.BadRequestError):
+        # e.g. a model without json_schema support
+        return _text_quiz_questions(topic_text, diff_text)
+
+    missing = QUIZ_QUESTION_COUNT - len(questions)
+    if missing:
+        print(f"Warning: quiz for '{topic_name}' has {len(questions)} valid questions, topping up {missing}.")
+        prompt = _quiz_prompt(topic_text, diff_text, missing, [q["question"] for q in questions])
+        questions += _stream_quiz_questions(prompt, missing, seen)[0]
+    return questions
+
+TIP_STYLE_RULES = (
+    "Use Burmese, but use English technical terms where needed.\n"
+    "Never use any other language except English and Burmese.\n"
+    "Keep it under 20 words.\n"
+    "Make it sound polite, clear, and encouraging.\n"
+    "Add polite particles like 'ပါ', 'မယ်', 'တယ်' to keep a friendly tone.\n"
+    "Optionally add one helpful emoji (✅, 🔐, 📱, 👍) if it makes the tip clearer."
+)
+
+
+def generate_tips(topic, count=8):
+    """
+    Generate several distinct tips for one KB topic in a single completion.
+    Used to fill the tip store (tip_store.py); returns a list of strings.
+    """
+    kb = load_knowledge_base()
+    if topic not in kb:
+        return []
+    content = "\n".join(kb[topic])
+
+    prompt = (
+        f"Create {count} different short, practical cybersecurity tips from the following information:\n"
+        f"{content}\n"
+        + TIP_STYLE_RULES
+        + "\nEach tip must cover a different point."
+        "\nOutput one tip per line, with no numbering, headings, or extra commentary."
+    )
+
+    try:
+        response = chat_completion(
+            feature="tip",
+            model="gpt-5-chat-latest",
+            messages=[{"role": "user", "content": prompt}],
+            temperature=0.9,
+            max_tokens=80 * count
+        )
+        text = response.choices[0].message.content.strip()
+    except Exception as e:
+        print(f"Error generating tips for {topic}:", e)
+        return []
+
+    tips = [re.sub(r"^\s*(?:\d+[\.)]|[-*•])\s*", "", line).strip() for line in text.split("\n")]
+    return [tip for tip in tips if tip]
 
-    # If still nothing, return empty list (caller may decide how to handle)
-    return []
 
 def generate_random_tip():
     """
     Returns a random cybersecurity tip using AI from the knowledge base.
     """
-    # Load knowledge base once
-    with open("knowledge_base.json", "r", encoding="utf-8") as f:
-        kb = json.load(f)
-    
+    kb = load_knowledge_base()
+
     topic = random.choice(list(kb.keys()))
     content = "\n".join(kb[topic])
 
     prompt = (
         f"Create a short, practical cybersecurity tip from the following information:\n"
         f"{content}\n"
-        "Use Burmese, but use English technical terms where needed.\n"
-        "Never use any other language except English and Burmese.\n"
-        "Keep it under 20 words.\n"
-        "Make it sound polite, clear, and encouraging.\n"
-        "Add polite particles like 'ပါ', 'မယ်', 'တယ်' to keep a friendly tone.\n"
-        "Optionally add one helpful emoji (✅, 🔐, 📱, 👍) if it makes the tip clearer."
+        + TIP_STYLE_RULES
     )
 
     try:
-        response = openai.chat.completions.create(
+        response = chat_completion(
+            feature="tip",
             model="gpt-5-chat-latest",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
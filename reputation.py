@@ -0,0 +1,310 @@
+import os
+import re
+import sys
+import json
+import time
+import hashlib
+import threading
+from urllib.parse import unquote
+import numpy as np
+from dotenv import load_dotenv
+from chunker import normalize_numbers
+
+load_dotenv()
+
+# Known scam domains, phone numbers, Telegram handles and Viber links, built by `python reputation.py <lists...>`.
+# The file is memory-mapped: a Bloom filter rejects most lookups, then a sorted
+# array of 64-bit key hashes confirms hits by binary search.
+REPUTATION_PATH = os.getenv("REPUTATION_PATH", "reputation.bin")
+REPUTATION_FALSE_POSITIVE_RATE = float(os.getenv("REPUTATION_FALSE_POSITIVE_RATE", "0.01"))
+REPUTATION_DEFAULT_CATEGORY = "scam"
+_MAGIC = b"LPREP1\n"
+_RELOAD_CHECK_SECONDS = 5
+
+_URL = re.compile(
+    r"(?:https?://)?(?:www\.)?((?:[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?\.)+[a-z]{2,24})\b(?::\d+)?(/[^\s]*)?",
+    re.IGNORECASE,
+)
+_EMAIL = re.compile(r"[\w.+-]+@((?:[a-z0-9-]+\.)+[a-z]{2,24})", re.IGNORECASE)
+_PHONE = re.compile(r"(?<![\d+])(?:\+|00)?\d[\d\s().-]{6,18}\d(?!\d)")
+_TELEGRAM = re.compile(r"(?:t\.me|telegram\.me)/(?:joinchat/)?([a-z0-9_+-]{3,64})", re.IGNORECASE)
+# A bare "@handle" (Telegram usernames are 5-32 characters); not the @ of an email address
+_HANDLE = re.compile(r"(?<![\w.@/])@([a-z][a-z0-9_]{4,31})\b", re.IGNORECASE)
+# viber://chat?number=…, viber://pa?chatURI=…, invite.viber.com/?g2=… group invites
+_VIBER = re.compile(
+    r"viber://[a-z]+/?\?(number|chatURI|g2?)=([^\s&]+)|invite\.viber\.com/?\?(g2?)=([^\s&]+)",
+    re.IGNORECASE,
+)
+
+
+# --------------------
+# Indicator extraction and normalization
+# --------------------
+def normalize_phone(raw):
+    """Canonical +<country><number>; Myanmar 09… / 959… numbers become +959…. None if not a phone."""
+    digits = re.sub(r"\D", "", normalize_numbers(raw))
+    if raw.strip().startswith("+"):
+        pass  # already international
+    elif digits.startswith("00"):
+        digits = digits[2:]
+    elif digits.startswith("09"):
+        digits = "95" + digits[1:]
+    elif not digits.startswith("959"):
+        return None
+    return f"+{digits}" if 9 <= len(digits) <= 15 else None
+
+
+def normalize_domain(raw):
+    host = raw.strip().lower().rstrip(".")
+    host = re.sub(r"^[a-z]+://", "", host).split("/")[0].split(":")[0]
+    return host[4:] if host.startswith("www.") else host
+
+
+def _parent_domains(host):
+    """example.co.uk → itself and its parents down to two labels."""
+    labels = host.split(".")
+    return [".".join(labels[i:]) for i in range(len(labels) - 1)]
+
+
+def _viber_key(param, value):
+    """viber:<invite code or public account> key, or the phone key of a chat link."""
+    value = unquote(value)
+    if param.lower() == "number":
+        phone = normalize_phone(value)
+        return f"phone:{phone}" if phone else None
+    # Invite codes are case-sensitive; public account names are not
+    return f"viber:{value.lower() if param.lower() == 'chaturi' else value}"
+
+
+def extract_indicators(text):
+    """
+    Keys to look up for a post: "domain:<host>" (plus parent domains),
+    "phone:+959…", "telegram:<handle>" (t.me links and bare @handles) and
+    "viber:<invite or account>", in order of appearance.
+    """
+    text = normalize_numbers(text or "")
+    keys = []
+    for match in _TELEGRAM.finditer(text):
+        keys.append(f"telegram:{match.group(1).lower()}")
+    for match in _HANDLE.finditer(text):
+        keys.append(f"telegram:{match.group(1).lower()}")
+    for match in _VIBER.finditer(text):
+        key = _viber_key(match.group(1) or match.group(3), match.group(2) or match.group(4))
+        if key:
+            keys.append(key)
+    for match in _EMAIL.finditer(text):
+        keys.extend(f"domain:{d}" for d in _parent_domains(normalize_domain(match.group(1))))
+    for match in _URL.finditer(_EMAIL.sub(" ", text)):
+        keys.extend(f"domain:{d}" for d in _parent_domains(normalize_domain(match.group(1))))
+    for match in _PHONE.finditer(text):
+        phone = normalize_phone(match.group(0))
+        if phone:
+            keys.append(f"phone:{phone}")
+    return list(dict.fromkeys(keys))
+
+
+def indicator_key(value):
+    """Key for one entry of a reputation list: a URL/domain, phone number, t.me link / @handle or Viber link."""
+    value = value.strip()
+    viber = _VIBER.search(value)
+    if viber:
+        return _viber_key(viber.group(1) or viber.group(3), viber.group(2) or viber.group(4))
+    telegram = _TELEGRAM.search(value)
+    if telegram:
+        return f"telegram:{telegram.group(1).lower()}"
+    if value.startswith("@"):
+        return f"telegram:{value[1:].lower()}"
+    phone = normalize_phone(value) if not re.search(r"[a-zA-Z]", value) else None
+    if phone:
+        return f"phone:{phone}"
+    domain = normalize_domain(value)
+    return f"domain:{domain}" if "." in domain else None
+
+
+# --------------------
+# Compact store: Bloom filter + sorted 64-bit hashes, memory-mapped
+# --------------------
+_MASK64 = (1 << 64) - 1
+
+
+def _key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _step(h):
+    # Second Bloom hash (double hashing), derived from the stored 64-bit hash
+    return (h >> 17) | 1
+
+
+def _bloom_size(n, rate):
+    bits = max(64, int(-n * np.log(rate) / (np.log(2) ** 2)))
+    bits = (bits + 63) // 64 * 64
+    k = max(1, round(bits / max(n, 1) * np.log(2)))
+    return bits, k
+
+
+def build(entries, path=REPUTATION_PATH, rate=REPUTATION_FALSE_POSITIVE_RATE):
+    """
+    Write a store from (key, category) pairs, atomically: readers keep using
+    the old mapping until they notice the new file.
+    """
+    categories, by_hash = {}, {}
+    for key, category in entries:
+        by_hash[_key_hash(key)] = categories.setdefault(category, len(categories))
+    if len(categories) > 255:
+        raise ValueError("at most 255 reputation categories")
+
+    n = len(by_hash)
+    bits, k = _bloom_size(n, rate)
+    hashes = np.fromiter(sorted(by_hash), dtype=np.uint64, count=n)
+    codes = np.fromiter((by_hash[h] for h in hashes.tolist()), dtype=np.uint8, count=n)
+    bloom = np.zeros(bits // 8, dtype=np.uint8)
+    steps = (hashes >> np.uint64(17)) | np.uint64(1)
+    for i in range(k):
+        # uint64 arithmetic wraps like the & _MASK64 in ReputationStore.lookup
+        positions = (hashes + np.uint64(i) * steps) % np.uint64(bits)
+        np.bitwise_or.at(bloom, (positions >> np.uint64(3)).astype(np.int64),
+                         (np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)))
+
+    header = json.dumps({"count": n, "bits": bits, "k": k, "categories": list(categories), "built_at": time.time()}).encode()
+    header += b" " * (-(len(_MAGIC) + 8 + len(header)) % 8)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_MAGIC)
+        f.write(len(header).to_bytes(8, "little"))
+        f.write(header)
+        f.write(bloom.tobytes())
+        f.write(hashes.tobytes())
+        f.write(codes.tobytes())
+    os.replace(tmp_path, path)
+    return n
+
+
+class ReputationStore:
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path} is not a reputation store")
+            header_length = int.from_bytes(f.read(8), "little")
+            self.header = json.loads(f.read(header_length))
+        offset = len(_MAGIC) + 8 + header_length
+        n, bits = self.header["count"], self.header["bits"]
+        self.bits, self.k = bits, self.header["k"]
+        self.categories = self.header["categories"]
+        # Plain ndarray views of the mapping: memmap's subclass overhead dominates single-item reads
+        self.bloom = self._map(path, np.uint8, offset, bits // 8)
+        offset += bits // 8
+        self.hashes = self._map(path, np.uint64, offset, n)
+        offset += 8 * n
+        self.codes = self._map(path, np.uint8, offset, n)
+
+    @staticmethod
+    def _map(path, dtype, offset, count):
+        if not count:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", offset=offset, shape=(count,)).view(np.ndarray)
+
+    def __len__(self):
+        return len(self.hashes)
+
+    def lookup(self, key):
+        """Category of a listed key, or None. A few microseconds either way."""
+        h = _key_hash(key)
+        step = _step(h)
+        bloom = self.bloom
+        for i in range(self.k):
+            position = ((h + i * step) & _MASK64) % self.bits
+            if not bloom[position >> 3] & (1 << (position & 7)):
+                return None
+        i = int(np.searchsorted(self.hashes, np.uint64(h)))
+        if i < len(self.hashes) and int(self.hashes[i]) == h:
+            return self.categories[self.codes[i]]
+        return None
+
+
+_lock = threading.Lock()
+_state = {"store": None, "mtime": None, "checked_at": 0.0}
+_stats = {"checks": 0, "hits": 0}
+
+
+def get_store(path=REPUTATION_PATH):
+    """The current store (None if there is none), reopened when the file is replaced."""
+    now = time.monotonic()
+    with _lock:
+        if now - _state["checked_at"] < _RELOAD_CHECK_SECONDS:
+            return _state["store"]
+        _state["checked_at"] = now
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            _state["store"], _state["mtime"] = None, None
+            return None
+        if mtime != _state["mtime"]:
+            try:
+                _state["store"] = ReputationStore(path)
+                print(f"Loaded reputation store with {len(_state['store'])} entries")
+            except (OSError, ValueError) as e:
+                print(f"Warning: could not load reputation store: {str(e)}")
+            _state["mtime"] = mtime
+        return _state["store"]
+
+
+def check(text):
+    """[(indicator, category)] for the listed domains, numbers and handles in text."""
+    store = get_store()
+    if store is None or not len(store):
+        return []
+    hits = []
+    for key in extract_indicators(text):
+        category = store.lookup(key)
+        if category is not None:
+            hits.append((key, category))
+    with _lock:
+        _stats["checks"] += 1
+        _stats["hits"] += bool(hits)
+    return hits
+
+
+def facts(hits):
+    """Hits as plain sentences for the content-checker prompt."""
+    return [
+        f"The {key.split(':', 1)[0]} {key.split(':', 1)[1]} is listed in LannPya's reputation database as: {category}."
+        for key, category in hits
+    ]
+
+
+def reputation_stats():
+    store = get_store()
+    with _lock:
+        stats = dict(_stats)
+    stats["entries"] = len(store) if store is not None else 0
+    return stats
+
+
+# --------------------
+# Bulk loader
+# --------------------
+def read_list(path):
+    """
+    Entries from a text/CSV list: one "value[,category]" per line, where value is
+    a domain or URL, a phone number, a t.me link / @handle or a Viber link. # starts a comment.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            value, _, category = line.partition(",")
+            key = indicator_key(value)
+            if key:
+                yield key, (category.strip().lower() or REPUTATION_DEFAULT_CATEGORY)
+            else:
+                print(f"⚠️ Skipping unrecognized entry in {path}: {value}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit("usage: python reputation.py <list.txt|list.csv> [...]")
+    started = time.time()
+    count = build(entry for source in sys.argv[1:] for entry in read_list(source))
+    print(f"🎉 Built {REPUTATION_PATH} with {count} entries in {time.time() - started:.1f}s")
@@ -0,0 +1,58 @@
+import os
+import threading
+from dotenv import load_dotenv
+import history_store
+
+load_dotenv()
+
+# Server-side scenario sessions: the answers so far and the knowledge base
+# chunks retrieved for each, so /scenario/analyze only runs the final completion.
+# Same backends as the chat history ("memory", "sqlite" or "redis"), in their own table / keys.
+SCENARIO_BACKEND = os.getenv("SCENARIO_BACKEND", history_store.HISTORY_BACKEND).lower()
+SCENARIO_TTL = float(os.getenv("SCENARIO_TTL", "3600"))  # idle seconds before a scenario is dropped
+SCENARIO_MAX_SESSIONS = int(os.getenv("SCENARIO_MAX_SESSIONS", "5000"))
+
+
+def empty_state(topic=""):
+    """{"topic", "answers": {question: answer}, "retrieved": {question: {"answer", "chunks"}}}"""
+    return {"topic": topic, "answers": {}, "retrieved": {}}
+
+
+def _backend_options():
+    return {
+        "memory": {"max_sessions": SCENARIO_MAX_SESSIONS},
+        "sqlite": {"table": "scenario_sessions"},
+        "redis": {"prefix": "lannpya:scenario"},
+    }
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            options = _backend_options()
+            if SCENARIO_BACKEND not in options:
+                raise ValueError(f"Unknown SCENARIO_BACKEND '{SCENARIO_BACKEND}' (expected one of {sorted(options)})")
+            _backend = history_store._BACKENDS[SCENARIO_BACKEND](
+                ttl=SCENARIO_TTL, empty=empty_state, **options[SCENARIO_BACKEND]
+            )
+        return _backend
+
+
+def load(session_id, topic=""):
+    """The session's state (a fresh one when it is unknown or expired); a given topic replaces the stored one."""
+    state = get_backend().load(session_id)
+    state["topic"] = topic or state["topic"]
+    return state
+
+
+def save(session_id, state):
+    get_backend().save(session_id, state)
+
+
+def delete(session_id):
+    get_backend().delete(session_id)
@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import random
+import tempfile
+import threading
+from contextlib import contextmanager
+from dotenv import load_dotenv
+from rag import generate_tips, generate_random_tip, load_knowledge_base
+from embedding_cache import normalize_text
+
+try:
+    import fcntl
+except ImportError:  # Windows dev machines: a single process, nothing to coordinate
+    fcntl = None
+
+load_dotenv()
+
+# Tips per KB topic, generated in bulk and served from memory (no LLM call on /random-tip)
+TIP_STORE_PATH = os.getenv("TIP_STORE_PATH", "tips.json")
+TIPS_PER_TOPIC = int(os.getenv("TIPS_PER_TOPIC", "8"))
+# Regenerate a topic's tips once they are older than this (seconds); a few topics per cycle
+TIP_REFRESH_INTERVAL = float(os.getenv("TIP_REFRESH_INTERVAL", str(6 * 3600)))
+TIP_REFRESH_TOPICS = int(os.getenv("TIP_REFRESH_TOPICS", "2"))
+# Set to 0 to disable the background thread (e.g. when a cron job runs `python tip_store.py`)
+TIP_STORE_REFRESH = os.getenv("TIP_STORE_REFRESH", "1") != "0"
+_RELOAD_CHECK_SECONDS = 5
+_IDLE_SECONDS = 60
+
+_lock = threading.Lock()
+_state = {"topics": {}, "tips": [], "mtime": None, "checked_at": 0.0}
+_worker = None
+
+
+def _dedupe_key(tip):
+    return normalize_text(tip).casefold()
+
+
+def load():
+    """Read the persisted store and flatten it into the list served by random_tip."""
+    try:
+        mtime = os.path.getmtime(TIP_STORE_PATH)
+        with open(TIP_STORE_PATH, "r", encoding="utf-8") as f:
+            topics = json.load(f).get("topics", {})
+    except (OSError, ValueError) as e:
+        if os.path.exists(TIP_STORE_PATH):
+            print(f"Warning: could not read tip store: {str(e)}")
+        return
+    tips = [{"tip": tip, "topic": topic} for topic, entry in topics.items() for tip in entry.get("tips", [])]
+    with _lock:
+        _state.update(topics=topics, tips=tips, mtime=mtime)
+
+
+def _reload_if_changed():
+    """Pick up tips written by another worker or the CLI; stat at most every few seconds."""
+    now = time.monotonic()
+    if now - _state["checked_at"] < _RELOAD_CHECK_SECONDS:
+        return
+    _state["checked_at"] = now
+    try:
+        mtime = os.path.getmtime(TIP_STORE_PATH)
+    except OSError:
+        return
+    if mtime != _state["mtime"]:
+        load()
+
+
+def _save(topics):
+    # A temp file of our own: another process may be saving at the same moment
+    directory = os.path.dirname(os.path.abspath(TIP_STORE_PATH))
+    with tempfile.NamedTemporaryFile(
+        "w", encoding="utf-8", dir=directory, prefix=os.path.basename(TIP_STORE_PATH) + ".", suffix=".tmp", delete=False
+    ) as f:
+        tmp_path = f.name
+        try:
+            json.dump({"topics": topics}, f, ensure_ascii=False, indent=2)
+        except Exception:
+            f.close()
+            os.unlink(tmp_path)
+            raise
+    os.replace(tmp_path, TIP_STORE_PATH)
+
+
+@contextmanager
+def _refresh_lock(blocking=False):
+    """
+    Whether this process may refresh: an flock on TIP_STORE_PATH.lock, held for the
+    whole refresh so only one gunicorn worker (or the CLI) calls the LLM for tips at a time.
+    """
+    if fcntl is None:
+        yield True
+        return
+    with open(TIP_STORE_PATH + ".lock", "a") as lock_file:
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def refresh_topic(topic):
+    """Replace one topic's tips with a fresh, deduplicated batch. Returns how many were kept."""
+    fresh = generate_tips(topic, TIPS_PER_TOPIC)
+    if not fresh:
+        return 0
+
+    load()  # merge with whatever other workers wrote meanwhile
+    with _lock:
+        topics = dict(_state["topics"])
+    seen = {_dedupe_key(tip) for other, entry in topics.items() if other != topic for tip in entry.get("tips", [])}
+    tips = []
+    for tip in fresh:
+        key = _dedupe_key(tip)
+        if key not in seen:
+            seen.add(key)
+            tips.append(tip)
+    if not tips:
+        return 0
+
+    topics[topic] = {"generated_at": time.time(), "tips": tips[:TIPS_PER_TOPIC]}
+    _save(topics)
+    load()
+    return len(topics[topic]["tips"])
+
+
+def due_topics():
+    """KB topics without tips first, then those older than TIP_REFRESH_INTERVAL, oldest first."""
+    with _lock:
+        topics = _state["topics"]
+        ages = {t: topics.get(t, {}).get("generated_at", 0) for t in load_knowledge_base()}
+    cutoff = time.time() - TIP_REFRESH_INTERVAL
+    return sorted((t for t, generated_at in ages.items() if generated_at < cutoff), key=ages.get)
+
+
+def refresh(topics=None):
+    """Regenerate the given topics (default: the most overdue few). Returns topics updated."""
+    updated = 0
+    for topic in topics if topics is not None else due_topics()[:TIP_REFRESH_TOPICS]:
+        if refresh_topic(topic):
+            updated += 1
+    return updated
+
+
+def _refresh_worker():
+    # Every worker runs one; the lock lets a single one refresh while the others just reload
+    time.sleep(random.uniform(0, 5))
+    while True:
+        try:
+            with _refresh_lock() as owner:
+                load()
+                if owner and refresh():
+                    continue
+        except Exception as e:
+            print(f"Warning: tip refresh failed: {str(e)}")
+        time.sleep(_IDLE_SECONDS + random.uniform(0, _IDLE_SECONDS))
+
+
+def start_background_refresh():
+    global _worker
+    if not TIP_STORE_REFRESH:
+        return
+    with _lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_refresh_worker, name="tip-refresh", daemon=True)
+            _worker.start()
+
+
+def random_tip():
+    """A random stored tip as {"tip", "topic"}; live generation only while the store is empty."""
+    _reload_if_changed()
+    start_background_refresh()
+    with _lock:
+        tips = _state["tips"]
+        if tips:
+            return dict(random.choice(tips))
+    return generate_random_tip()
+
+
+def tip_stats():
+    with _lock:
+        return {"tips": len(_state["tips"]), "topics": len(_state["topics"])}
+
+
+load()
+
+
+if __name__ == "__main__":
+    with _refresh_lock(blocking=True):
+        load()
+        updated = refresh(due_topics())
+    print(f"🎉 Refreshed {updated} topics: {tip_stats()}")
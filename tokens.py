@@ -0,0 +1,71 @@
+import os
+import sys
+import threading
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# tiktoken's BPE files are downloaded on first use; keep them next to the app so a
+# build step (`python tokens.py`, run by bin/post_compile on Heroku) can pre-fetch them
+TIKTOKEN_CACHE_DIR = os.getenv(
+    "TIKTOKEN_CACHE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".tiktoken_cache")
+)
+os.environ["TIKTOKEN_CACHE_DIR"] = TIKTOKEN_CACHE_DIR
+
+# Tokenizer of text-embedding-3-small (chunking, embedding batches)
+TOKEN_ENCODING = "cl100k_base"
+# Tokenizer of the gpt-4o / gpt-5 chat models (prompt budgets, telemetry)
+CHAT_ENCODING = "o200k_base"
+
+_encodings = {}
+_lock = threading.Lock()
+_fallback_logged = False
+
+
+def _get_encoding(name):
+    """tiktoken encoding, or None when tiktoken or its BPE file is unavailable (e.g. offline)."""
+    global _fallback_logged
+    with _lock:
+        if name not in _encodings:
+            try:
+                import tiktoken
+
+                _encodings[name] = tiktoken.get_encoding(name)
+            except Exception as e:
+                _encodings[name] = None
+                if not _fallback_logged:
+                    # Once per process rather than once per encoding
+                    print(f"Warning: tiktoken unavailable ('{name}'), estimating token counts: {str(e)}")
+                    _fallback_logged = True
+        return _encodings[name]
+
+
+def tokenizer_name(encoding=TOKEN_ENCODING):
+    """What count_tokens(…, encoding) actually uses: "tiktoken:<encoding>" or "estimate"."""
+    return f"tiktoken:{encoding}" if _get_encoding(encoding) is not None else "estimate"
+
+
+def estimate_tokens(text):
+    """
+    Offline estimate: ~4 ASCII characters per token, and one token per
+    non-ASCII character (Burmese syllables split into several BPE tokens).
+    """
+    text = text or ""
+    ascii_chars = sum(1 for ch in text if ch.isascii())
+    return (ascii_chars + 3) // 4 + (len(text) - ascii_chars)
+
+
+def count_tokens(text, encoding=TOKEN_ENCODING):
+    enc = _get_encoding(encoding)
+    if enc is None:
+        return estimate_tokens(text)
+    return len(enc.encode(text or "", disallowed_special=()))
+
+
+if __name__ == "__main__":
+    # Pre-fetch the BPE files into TIKTOKEN_CACHE_DIR (build step); fails when they can't be loaded
+    missing = [name for name in (TOKEN_ENCODING, CHAT_ENCODING) if _get_encoding(name) is None]
+    if missing:
+        print(f"⚠️ Could not load tokenizers {missing} into {TIKTOKEN_CACHE_DIR}")
+        sys.exit(1)
+    print(f"✅ Tokenizers cached in {TIKTOKEN_CACHE_DIR}")
@@ -1,81 +1,118 @@
 import os
 import json
 import re
-from openai import OpenAI
-from pinecone import Pinecone
+import time
+import queue
+import hashlib
+import threading
 from dotenv import load_dotenv
-import pytesseract
-from pdf2image import convert_from_path
+from pdf_text import extract_pages, file_hash, OCRFailedError
+from vector_store import get_vector_store, LocalVectorStore
+from clients import create_embeddings
+from answer_cache import mark_kb_updated
+from tokens import count_tokens, tokenizer_name
+from chunker import normalize_numbers, chunk_plain, chunk_sections, split_sections, strip_page_furniture, CHUNK_MAX_TOKENS, CHUNK_MIN_TOKENS
 
 # --------------------
 # Load environment variables
 # --------------------
 load_dotenv()
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
-index = pc.Index(os.getenv("PINECONE_INDEX"))
+index = get_vector_store()
+# Always keep a local snapshot too, so VECTOR_BACKEND=local can serve the same data
+local_store = index if isinstance(index, LocalVectorStore) else LocalVectorStore()
 
 # --------------------
 # Helpers
 # --------------------
-def chunk_text(text, chunk_size=1000, overlap=200):
-    chunks = []
-    start = 0
-    while start < len(text):
-        end = start + chunk_size
-        chunks.append(text[start:end])
-        start += chunk_size - overlap
-    return chunks
-
-def extract_text_from_pdf(pdf_path, use_ocr=True):
-    text = ""
-    if not use_ocr:
-        try:
-            import fitz
-            with fitz.open(pdf_path) as doc:
-                for page in doc:
-                    text += page.get_text("text")
-        except Exception as e:
-            print(f"⚠️ PyMuPDF failed for {pdf_path}: {e}")
-            use_ocr = True
-
-    if use_ocr:
-        print("🔍 Using OCR for PDF...")
-        pages = convert_from_path(pdf_path, dpi=300)
-        for page in pages:
-            page_text = pytesseract.image_to_string(page, lang="mya+eng")
-            text += page_text + "\n"
-
-    return text.strip()
-
-def batch_upsert(entries, source):
-    """entries = [(id, text, metadata)]"""
-    if not entries:
-        return
-
-    texts = [text for _, text, _ in entries]
-    response = client.embeddings.create(
+def embed_batch(entries):
+    """entries = [(id, text, metadata)] → vectors ready for upsert"""
+    response = create_embeddings(
         model="text-embedding-3-small",
-        input=texts
+        input=[text for _, text, _ in entries]
     )
+    return [
+        (entry_id, emb.embedding, {"text": text, **metadata})
+        for (entry_id, text, metadata), emb in zip(entries, response.data)
+    ]
 
-    vectors = []
-    for (entry_id, text, metadata), emb in zip(entries, response.data):
-        vectors.append((entry_id, emb.embedding, {"text": text, **metadata}))
-
+def upsert_vectors(vectors):
     index.upsert(vectors)
-    print(f"✅ Upserted {len(vectors)} entries from {source}")
+    if local_store is not index:
+        local_store.upsert(vectors)
 
 # --------------------
-# Burmese number normalization
+# Pipelined embed + upsert
 # --------------------
-BURMESE_NUMS = "၀၁၂၃၄၅၆၇၈၉"
-ARABIC_NUMS = "0123456789"
-TRANS_TABLE = str.maketrans(BURMESE_NUMS, ARABIC_NUMS)
+# The producer (parsing / OCR) fills a bounded queue with token-sized batches;
+# INGEST_CONCURRENCY workers each embed and upsert a batch, so several
+# requests are in flight at once. A failed batch is retried on its own and,
+# if it keeps failing, skipped: the checkpoint lets the next run resume.
+EMBED_BATCH_TOKENS = int(os.getenv("EMBED_BATCH_TOKENS", "50000"))
+EMBED_BATCH_MAX_ITEMS = int(os.getenv("EMBED_BATCH_MAX_ITEMS", "256"))
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+INGEST_BATCH_RETRIES = int(os.getenv("INGEST_BATCH_RETRIES", "3"))
+
+def token_batches(entries, max_tokens=EMBED_BATCH_TOKENS, max_items=EMBED_BATCH_MAX_ITEMS):
+    batch, batch_tokens = [], 0
+    for entry in entries:
+        tokens = count_tokens(entry[1])
+        if batch and (batch_tokens + tokens > max_tokens or len(batch) >= max_items):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(entry)
+        batch_tokens += tokens
+    if batch:
+        yield batch
 
-def normalize_numbers(text):
-    return text.translate(TRANS_TABLE)
+def _process_batch(batch, source):
+    for attempt in range(INGEST_BATCH_RETRIES + 1):
+        try:
+            upsert_vectors(embed_batch(batch))
+            print(f"✅ Upserted {len(batch)} entries from {source}")
+            return True
+        except Exception as e:
+            if attempt == INGEST_BATCH_RETRIES:
+                print(f"❌ Giving up on a batch of {len(batch)} from {source}: {e}")
+                return False
+            delay = min(60, 2 ** attempt)
+            print(f"⚠️ Batch of {len(batch)} from {source} failed ({e}), retrying in {delay}s")
+            time.sleep(delay)
+
+def pipeline_upsert(entries, source, on_batch_done):
+    """
+    Embed and upsert entries concurrently. on_batch_done(ids) is called
+    (from a worker thread, one at a time) after each batch is stored.
+    Returns the number of batches that failed.
+    """
+    batches = queue.Queue(maxsize=INGEST_CONCURRENCY * 2)
+    done_lock = threading.Lock()
+    failed = [0]
+
+    def worker():
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            ok = _process_batch(batch, source)
+            with done_lock:
+                if ok:
+                    on_batch_done([entry_id for entry_id, _, _ in batch])
+                else:
+                    failed[0] += 1
+
+    workers = [threading.Thread(target=worker, daemon=True) for _ in range(INGEST_CONCURRENCY)]
+    for t in workers:
+        t.start()
+    try:
+        for batch in token_batches(entries):
+            batches.put(batch)  # blocks while the workers are behind
+    finally:
+        for _ in workers:
+            batches.put(None)
+        for t in workers:
+            t.join()
+    return failed[0]
 
 # --------------------
 # Sanitize vector IDs
@@ -87,125 +124,245 @@ def sanitize_id(text):
     return re.sub(r'[^\x00-\x7F]+', '-', text)
 
 # --------------------
-# Parser for Cybersecurity Law.txt
+# Parser for the law texts: chapters and numbered sections, token-budgeted chunks
 # --------------------
-def parse_law_text(filepath):
-    with open(filepath, "r", encoding="utf-8") as f:
-        content = f.read()
-
-    lines = content.splitlines()
-    chapter = None
-    law_number = None
-    buffer = []
+def parse_law_lines(lines, source):
+    """[(entry_id, text, metadata)] for law text split at chapter/section boundaries."""
     entries = []
-
-    def save_entry():
-        if law_number and buffer:
-            text = "\n".join(buffer).strip()
-            # Chunk long texts
-            chunks = chunk_text(text, chunk_size=1000, overlap=200)
-            for idx, chunk in enumerate(chunks, start=1):
-                entries.append((
-                    f"{law_number}-part{idx}",
-                    chunk,
-                    {
-                        "chapter": chapter,
-                        "law_number_burmese": law_number,
-                        "law_number_arabic": normalize_numbers(law_number),
-                        "source": os.path.basename(filepath)
-                    }
-                ))
-
-    for line in lines:
-        line = line.strip()
-        if not line:
-            continue
-
-        # Detect chapters (e.g. အခန်း (၁))
-        if line.startswith("အခန်း"):
-            chapter = line
-            continue
-
-        # Detect law sections (e.g. ၃၆။ )
-        match = re.match(r"^([၀၁၂၃၄၅၆၇၈၉]+)။", line)
-        if match:
-            save_entry()  # save previous
-            law_number = match.group(1)  # Burmese number only
-            buffer = [line]
-        else:
-            buffer.append(line)
-
-    save_entry()
+    for text, metadata in chunk_sections(split_sections(lines)):
+        label = f"s{metadata['section']}-p{metadata['part']}" if "section" in metadata else f"p{metadata['part']}"
+        entries.append((label, text, {**metadata, "source": source}))
     return entries
 
-# --------------------
-# Clear index
-# --------------------
-index.delete(delete_all=True)
-print("🧹 Cleared all previous entries from the index.")
+def parse_law_text(filepath):
+    with open(filepath, "r", encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    return parse_law_lines(lines, os.path.basename(filepath))
 
 # --------------------
-# Step 1: Upload JSON
+# Incremental sync: a manifest of file hashes and chunk ids
 # --------------------
-json_file = "knowledge_base.json"
-if os.path.exists(json_file):
+# Chunk ids embed a hash of the chunk's text + metadata, so an unchanged chunk
+# keeps its id and is never re-embedded; a changed one gets a new id and the
+# old vector is deleted after the new one is live (no delete_all, no downtime).
+MANIFEST_PATH = os.getenv("INGEST_MANIFEST_PATH", "ingest_manifest.json")
+# Bump (or change the budgets) to re-chunk unchanged files; unchanged chunks still skip embedding.
+# The tokenizer is part of it: tiktoken and the offline estimate put chunk boundaries in different places.
+CHUNKING = f"sections-v1:{CHUNK_MAX_TOKENS}:{CHUNK_MIN_TOKENS}:{tokenizer_name()}"
+
+def chunk_id(prefix, text, metadata):
+    content = json.dumps([text, metadata], ensure_ascii=False, sort_keys=True)
+    return sanitize_id(f"{prefix}-{hashlib.sha256(content.encode('utf-8')).hexdigest()[:16]}")
+
+def load_manifest():
+    if not os.path.exists(MANIFEST_PATH):
+        return None
+    with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+def delete_vectors(ids):
+    if not ids:
+        return
+    ids = sorted(ids)
+    index.delete(ids=ids)
+    if local_store is not index:
+        local_store.delete(ids=ids)
+    print(f"🗑️ Deleted {len(ids)} stale entries")
+
+CHECKPOINT_EVERY = 10  # batches between checkpoint writes
+
+def checkpoint(manifest):
+    """Persist progress; the local snapshot first, so it is never behind the manifest."""
+    local_store.save()
+    save_manifest(manifest)
+
+def sync_source(source, file_path, build_entries, manifest):
+    """
+    Bring one source file's vectors in line with its current content.
+    build_entries(digest) is only called (OCR, parsing) when the file hash changed
+    or the local snapshot lacks some of the file's chunks (deleted, or a new host).
+    Chunks stored by an interrupted run of the same file version are not re-embedded.
+    Returns (chunk ids now live for this source, whether anything changed, batches failed).
+    """
+    digest = file_hash(file_path)
+    previous = manifest["files"].get(source)
+    local_ids = set(local_store.list_ids())
+    if previous and previous["hash"] == digest and previous.get("chunking") == CHUNKING:
+        if local_ids.issuperset(previous["chunks"]):
+            print(f"⏭️ {source} unchanged, skipping")
+            return set(previous["chunks"]), False, 0
+        print(f"🔁 {source} unchanged but missing from {local_store.path}, restoring it")
+
+    old_ids = set(previous["chunks"]) if previous else set()
+    resumed = manifest.setdefault("in_progress", {}).get(source) or {}
+    # Chunks an interrupted run stored for an older version of the file are live
+    # in the index too: treat them like the previous chunks (kept if still current, else deleted)
+    stale = set(resumed.get("stale", ()))
+    if resumed.get("hash") == digest:
+        done = set(resumed["done"])
+    else:
+        done = set()
+        stale |= set(resumed.get("done", ()))
+    old_ids |= stale
+    if done:
+        print(f"↩️ Resuming {source}: {len(done)} chunks already stored")
+    progress = manifest["in_progress"][source] = {"hash": digest, "done": sorted(done), "stale": sorted(stale)}
+    batches_since_checkpoint = [0]
+
+    def on_batch_done(ids):
+        done.update(ids)
+        batches_since_checkpoint[0] += 1
+        if batches_since_checkpoint[0] >= CHECKPOINT_EVERY:
+            batches_since_checkpoint[0] = 0
+            progress["done"] = sorted(done)
+            checkpoint(manifest)
+
+    entries = {}
+
+    def fresh_entries():
+        # Streams new chunks into the pipeline while parsing continues
+        for entry_id, text, metadata in build_entries(digest):
+            if entry_id in entries:
+                continue
+            # True when (re-)embedded: new, or missing from the local snapshot
+            entries[entry_id] = entry_id not in local_ids or (entry_id not in old_ids and entry_id not in done)
+            if entries[entry_id]:
+                yield entry_id, text, metadata
+
+    try:
+        failed = pipeline_upsert(fresh_entries(), source, on_batch_done)
+    except OCRFailedError as e:
+        # Raised before the first entry: keep the previous version and leave the hash
+        # uncommitted, so the next run OCRs the missing pages (the rest are cached)
+        progress["done"] = sorted(done)
+        checkpoint(manifest)
+        print(f"⚠️ {source}: {e} (pages {e.pages}); re-run to retry")
+        return old_ids | done, False, 1
+    new_ids = set(entries) - old_ids
+    if failed:
+        progress["done"] = sorted(done)
+        checkpoint(manifest)
+        print(f"⚠️ {source}: {failed} batches failed; re-run to resume")
+        return old_ids | (done & new_ids), True, failed
+
+    removed = old_ids - entries.keys()
+    delete_vectors(removed)
+    manifest["files"][source] = {"hash": digest, "chunking": CHUNKING, "chunks": sorted(entries)}
+    manifest["in_progress"].pop(source, None)
+    checkpoint(manifest)
+    print(f"📌 {source}: {len(new_ids)} new, {len(removed)} removed, {len(entries)} total")
+    return set(entries), any(entries.values()) or bool(removed), 0
+
+def json_entries(json_file):
     with open(json_file, "r", encoding="utf-8") as f:
         data = json.load(f)
-
-    batch = []
     for topic, entries in data.items():
-        for i, entry in enumerate(entries, start=1):
-            entry_id = sanitize_id(f"{topic}-{i}")
-            batch.append((entry_id, entry, {"source": "json"}))
-
-            if len(batch) >= 50:
-                batch_upsert(batch, "json")
-                batch = []
-
-    if batch:
-        batch_upsert(batch, "json")
-else:
-    print("⚠️ No knowledge_base.json found, skipping JSON upload.")
-
-# --------------------
-# Step 2: Upload PDFs and TXTs
-# --------------------
-pdf_folder = "knowledgebase"
-for filename in os.listdir(pdf_folder):
-    file_path = os.path.join(pdf_folder, filename)
-    file_name = sanitize_id(os.path.splitext(filename)[0].replace(" ", "-"))
-
-    if filename.endswith(".pdf"):
-        print(f"\n📄 Processing PDF: {filename}...")
-        text = extract_text_from_pdf(file_path, use_ocr=True)
-        chunks = chunk_text(text, chunk_size=1000, overlap=200)
-
-        batch = []
-        for i, chunk in enumerate(chunks, start=1):
-            entry_id = sanitize_id(f"{file_name}-{i}")
-            batch.append((entry_id, chunk, {"source": filename}))
-
-            if len(batch) >= 50:
-                batch_upsert(batch, filename)
-                batch = []
-
-        if batch:
-            batch_upsert(batch, filename)
-
-    elif filename.endswith(".txt") and "Cybersecurity" in filename:
-        print(f"\n📄 Processing TXT Law File: {filename}...")
-        entries = parse_law_text(file_path)
-
-        batch = []
-        for i, (entry_id, text, metadata) in enumerate(entries, start=1):
-            full_id = sanitize_id(f"{file_name}-{entry_id}")
-            batch.append((full_id, text, metadata))
-
-            if len(batch) >= 50:
-                batch_upsert(batch, filename)
-                batch = []
-
-        if batch:
-            batch_upsert(batch, filename)
+        metadata = {"source": "json", "topic": topic}
+        for entry in entries:
+            for chunk in chunk_plain(entry):
+                yield chunk_id(topic, chunk, metadata), chunk, metadata
+
+def pdf_entries(file_path, filename, file_name, digest):
+    print(f"\n📄 Processing PDF: {filename}...")
+    # The gazettes follow the same chapter/section layout as the Burmese law text
+    lines = strip_page_furniture(extract_pages(file_path, digest))
+    for entry_id, text, metadata in parse_law_lines(lines, filename):
+        yield chunk_id(f"{file_name}-{entry_id}", text, metadata), text, metadata
+
+def law_entries(file_path, filename, file_name):
+    print(f"\n📄 Processing TXT Law File: {filename}...")
+    for entry_id, text, metadata in parse_law_text(file_path):
+        yield chunk_id(f"{file_name}-{entry_id}", text, metadata), text, metadata
+
+def main():
+    manifest = load_manifest() or {"files": {}}
+    # Until one complete run has finished, the index may still hold vectors from the old id scheme
+    first_sync = not manifest.get("full_sync_done")
+    if first_sync:
+        print("🆕 No complete sync yet: embedding everything once, then pruning old ids.")
+
+    live_ids = set()
+    seen_sources = set()
+    changed = False
+    failed = 0
+
+    # --------------------
+    # Step 1: Upload JSON
+    # --------------------
+    json_file = "knowledge_base.json"
+    if os.path.exists(json_file):
+        ids, did_change, did_fail = sync_source(json_file, json_file, lambda digest: json_entries(json_file), manifest)
+        live_ids |= ids
+        seen_sources.add(json_file)
+        changed |= did_change
+        failed += did_fail
+    else:
+        print("⚠️ No knowledge_base.json found, skipping JSON upload.")
+
+    # --------------------
+    # Step 2: Upload PDFs and TXTs
+    # --------------------
+    pdf_folder = "knowledgebase"
+    for filename in sorted(os.listdir(pdf_folder)):
+        file_path = os.path.join(pdf_folder, filename)
+        file_name = sanitize_id(os.path.splitext(filename)[0].replace(" ", "-"))
+
+        if filename.endswith(".pdf"):
+            build = lambda digest: pdf_entries(file_path, filename, file_name, digest)
+        elif filename.endswith(".txt") and "Cybersecurity" in filename:
+            build = lambda digest: law_entries(file_path, filename, file_name)
+        else:
+            continue
 
-print("\n🎉 All knowledgebase data uploaded successfully!")
+        ids, did_change, did_fail = sync_source(filename, file_path, build, manifest)
+        live_ids |= ids
+        seen_sources.add(filename)
+        changed |= did_change
+        failed += did_fail
+
+    # --------------------
+    # Step 3: Drop vectors of removed files (and, on the first sync, of the old id scheme)
+    # --------------------
+    for source in set(manifest["files"]) - seen_sources:
+        print(f"\n🧹 {source} was removed")
+        delete_vectors(set(manifest["files"].pop(source)["chunks"]) - live_ids)
+        changed = True
+
+    for source in set(manifest.get("in_progress", {})) - seen_sources:
+        abandoned = manifest["in_progress"].pop(source)
+        delete_vectors((set(abandoned["done"]) | set(abandoned.get("stale", ()))) - live_ids)
+
+    if first_sync and not failed:
+        try:
+            stale = set(index.list_ids()) - live_ids
+        except Exception as e:
+            # Listing ids only works on serverless Pinecone indexes
+            print(f"⚠️ Could not list the index's ids ({e}); vectors from the old id scheme are not pruned")
+            stale = set()
+        if local_store is not index:
+            local_store.delete(ids=set(local_store.list_ids()) - live_ids)
+        delete_vectors(stale)
+        manifest["full_sync_done"] = True
+        changed = True
+
+    save_manifest(manifest)
+    if changed:
+        local_store.save()
+        # Tell serving workers to drop cached answers built on the old knowledge base
+        mark_kb_updated()
+        print("\n🎉 Knowledge base changes uploaded successfully!")
+    else:
+        print("\n✅ Knowledge base already up to date.")
+    if failed:
+        print(f"⚠️ {failed} batches failed; run upload.py again to resume.")
+
+
+# Guarded so OCR worker processes never re-run the ingestion
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,296 @@
+import os
+import json
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from clients import get_pinecone, call_upstream, acall_upstream, PINECONE_TIMEOUT
+
+load_dotenv()
+
+# "pinecone" (remote, default) or "local" (in-process NumPy search)
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone").lower()
+LOCAL_VECTOR_STORE_PATH = os.getenv("LOCAL_VECTOR_STORE_PATH", "vector_store.npz")
+# Pinecone has no multi-vector query: query_many runs this many single queries at once
+VECTOR_QUERY_CONCURRENCY = int(os.getenv("VECTOR_QUERY_CONCURRENCY", "8"))
+
+
+class LocalVectorStore:
+    """
+    In-process cosine search over every chunk vector.
+    All vectors live in one contiguous float32 matrix with L2-normalized rows,
+    so a query is a single matrix-vector product plus a top-k partition.
+    The snapshot is a single .npz file written by upload.py (or exported from Pinecone).
+    """
+
+    def __init__(self, path=LOCAL_VECTOR_STORE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()  # one np.load per rewrite, however many callers notice it
+        self._ids = []
+        self._metadata = []
+        self._rows = []  # pending float32 rows, only used while writing
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._dirty = False
+        self._mtime = None
+        self.load()
+
+    def load(self):
+        """Load the snapshot from disk (empty store if it does not exist yet)."""
+        if not os.path.exists(self.path):
+            return
+        with np.load(self.path, allow_pickle=False) as snapshot:
+            matrix = np.ascontiguousarray(snapshot["vectors"], dtype=np.float32)
+            records = json.loads(str(snapshot["records"]))
+        with self._lock:
+            self._matrix = matrix
+            self._ids = [r["id"] for r in records]
+            self._metadata = [r["metadata"] for r in records]
+            self._rows = list(matrix)
+            self._dirty = False
+            self._mtime = os.path.getmtime(self.path)
+        print(f"Loaded {len(self._ids)} vectors from {self.path}")
+
+    def _changed(self):
+        try:
+            return os.path.getmtime(self.path) != self._mtime
+        except OSError:
+            return False
+
+    def reload_if_changed(self):
+        """Pick up a snapshot rewritten by upload.py without restarting the worker."""
+        if self._changed():
+            with self._reload_lock:
+                if self._changed():
+                    self.load()
+
+    async def _areload_if_changed(self):
+        # The stat is cheap; loading a rewritten snapshot is not, so that runs off the event loop
+        if self._changed():
+            await asyncio.to_thread(self.reload_if_changed)
+
+    def __len__(self):
+        return len(self._ids)
+
+    @staticmethod
+    def _normalize(values):
+        vec = np.asarray(values, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm else vec
+
+    def _ensure_matrix(self):
+        if self._dirty:
+            self._matrix = np.ascontiguousarray(np.vstack(self._rows)) if self._rows else np.zeros((0, 0), dtype=np.float32)
+            self._dirty = False
+        return self._matrix
+
+    def query(self, vector, top_k=3):
+        """Return the top_k matches as [{"id", "score", "metadata"}], best first."""
+        self.reload_if_changed()
+        return self._search(vector, top_k)
+
+    def _search(self, vector, top_k):
+        with self._lock:
+            matrix = self._ensure_matrix()
+            if not len(self._ids):
+                return []
+            scores = matrix @ self._normalize(vector)
+            k = min(top_k, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                {"id": self._ids[i], "score": float(scores[i]), "metadata": self._metadata[i]}
+                for i in top
+            ]
+
+    async def aquery(self, vector, top_k=3):
+        # In-process search is sub-millisecond; no need to leave the event loop
+        await self._areload_if_changed()
+        return self._search(vector, top_k)
+
+    def query_many(self, vectors, top_k=3):
+        """query() for several vectors with one matrix-matrix product; one result list per vector."""
+        self.reload_if_changed()
+        return self._search_many(vectors, top_k)
+
+    def _search_many(self, vectors, top_k):
+        with self._lock:
+            matrix = self._ensure_matrix()
+            if not len(self._ids) or not len(vectors):
+                return [[] for _ in vectors]
+            scores = np.vstack([self._normalize(v) for v in vectors]) @ matrix.T
+            k = min(top_k, scores.shape[1])
+            tops = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            results = []
+            for row, top in zip(scores, tops):
+                top = top[np.argsort(-row[top])]
+                results.append([
+                    {"id": self._ids[i], "score": float(row[i]), "metadata": self._metadata[i]}
+                    for i in top
+                ])
+            return results
+
+    async def aquery_many(self, vectors, top_k=3):
+        await self._areload_if_changed()
+        return self._search_many(vectors, top_k)
+
+    def upsert(self, vectors):
+        """vectors = [(id, values, metadata)], same shape as Pinecone's upsert."""
+        with self._lock:
+            positions = {vid: i for i, vid in enumerate(self._ids)}
+            for vid, values, metadata in vectors:
+                row = self._normalize(values)
+                if vid in positions:
+                    i = positions[vid]
+                    self._rows[i] = row
+                    self._metadata[i] = metadata
+                else:
+                    positions[vid] = len(self._ids)
+                    self._ids.append(vid)
+                    self._rows.append(row)
+                    self._metadata.append(metadata)
+            self._dirty = True
+
+    def delete(self, ids=None, delete_all=False):
+        with self._lock:
+            if delete_all:
+                self._ids, self._rows, self._metadata = [], [], []
+            else:
+                drop = set(ids or [])
+                keep = [i for i, vid in enumerate(self._ids) if vid not in drop]
+                self._ids = [self._ids[i] for i in keep]
+                self._rows = [self._rows[i] for i in keep]
+                self._metadata = [self._metadata[i] for i in keep]
+            self._dirty = True
+
+    def list_ids(self):
+        with self._lock:
+            return list(self._ids)
+
+    def save(self):
+        """Write the snapshot atomically so serving workers never read a partial file."""
+        with self._lock:
+            matrix = self._ensure_matrix()
+            records = [{"id": vid, "metadata": meta} for vid, meta in zip(self._ids, self._metadata)]
+            tmp_path = self.path + ".tmp.npz"
+            np.savez(tmp_path, vectors=matrix, records=np.array(json.dumps(records, ensure_ascii=False)))
+            os.replace(tmp_path, self.path)
+            self._mtime = os.path.getmtime(self.path)
+        print(f"💾 Saved {len(self._ids)} vectors to {self.path}")
+
+
+class PineconeVectorStore:
+    """Remote backend: thin wrapper around the Pinecone index with the same interface."""
+
+    def __init__(self, index_name=None):
+        self.pc = get_pinecone()
+        self.index_name = index_name or os.getenv("PINECONE_INDEX")
+        # PINECONE_HOST skips the control-plane lookup (e.g. http://127.0.0.1:5081 for a local or fake index)
+        self.host = os.getenv("PINECONE_HOST")
+        self.index = self.pc.Index(host=self.host) if self.host else self.pc.Index(self.index_name)
+        self._async_index = None
+
+    @staticmethod
+    def _matches(result):
+        return [
+            {"id": match.id, "score": match.score, "metadata": match.metadata or {}}
+            for match in result.matches
+        ]
+
+    def query(self, vector, top_k=3):
+        result = call_upstream(
+            "pinecone", self.index.query,
+            vector=list(vector), top_k=top_k, include_metadata=True, _request_timeout=PINECONE_TIMEOUT,
+        )
+        return self._matches(result)
+
+    async def aquery(self, vector, top_k=3):
+        """Non-blocking query for the ASGI app, over Pinecone's asyncio client."""
+        if self._async_index is None:
+            from pinecone import PineconeAsyncio
+
+            host = self.host or self.pc.describe_index(self.index_name).host
+            self._async_index = PineconeAsyncio(api_key=os.getenv("PINECONE_API_KEY")).IndexAsyncio(host=host)
+        result = await acall_upstream(
+            "pinecone", self._async_index.query,
+            vector=list(vector), top_k=top_k, include_metadata=True, _request_timeout=PINECONE_TIMEOUT,
+        )
+        return self._matches(result)
+
+    def query_many(self, vectors, top_k=3):
+        """
+        Concurrent single queries, one result list per vector (in order).
+        A failed query gives an exception in its slot instead of failing the batch.
+        """
+        def one(vector):
+            try:
+                return self.query(vector, top_k)
+            except Exception as e:
+                return e
+
+        with ThreadPoolExecutor(max_workers=max(1, min(VECTOR_QUERY_CONCURRENCY, len(vectors)))) as pool:
+            return list(pool.map(one, vectors))
+
+    async def aquery_many(self, vectors, top_k=3):
+        semaphore = asyncio.Semaphore(VECTOR_QUERY_CONCURRENCY)
+
+        async def one(vector):
+            async with semaphore:
+                return await self.aquery(vector, top_k)
+
+        return await asyncio.gather(*(one(v) for v in vectors), return_exceptions=True)
+
+    def upsert(self, vectors):
+        call_upstream("pinecone", self.index.upsert, vectors)
+
+    def delete(self, ids=None, delete_all=False):
+        if delete_all:
+            call_upstream("pinecone", self.index.delete, delete_all=True)
+        elif ids:
+            ids = list(ids)
+            # Pinecone accepts at most 1000 ids per delete
+            for start in range(0, len(ids), 1000):
+                call_upstream("pinecone", self.index.delete, ids=ids[start:start + 1000])
+
+    def list_ids(self):
+        return [vid for id_page in self.index.list() for vid in id_page]
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_vector_store(backend=None):
+    """Return the shared store for the given backend (defaults to VECTOR_BACKEND)."""
+    backend = (backend or VECTOR_BACKEND).lower()
+    with _stores_lock:
+        if backend not in _stores:
+            if backend == "local":
+                _stores[backend] = LocalVectorStore()
+            elif backend == "pinecone":
+                _stores[backend] = PineconeVectorStore()
+            else:
+                raise ValueError(f"Unknown VECTOR_BACKEND '{backend}' (expected 'local' or 'pinecone')")
+        return _stores[backend]
+
+
+def export_pinecone_to_local(path=LOCAL_VECTOR_STORE_PATH, batch_size=100):
+    """Snapshot every vector in the Pinecone index into the local store file."""
+    remote = PineconeVectorStore()
+    local = LocalVectorStore(path)
+    local.delete(delete_all=True)
+    ids = remote.list_ids()
+    for start in range(0, len(ids), batch_size):
+        fetched = remote.index.fetch(ids=ids[start:start + batch_size])
+        local.upsert([
+            (vid, vec.values, vec.metadata or {})
+            for vid, vec in fetched.vectors.items()
+        ])
+    local.save()
+    return len(local)
+
+
+if __name__ == "__main__":
+    count = export_pinecone_to_local()
+    print(f"🎉 Exported {count} vectors from Pinecone to {LOCAL_VECTOR_STORE_PATH}")